@@ -1,40 +1,152 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
-from app.core.database import get_db, User
-from app.core.security import verify_token, get_password_hash
-from app.schemas.user import UserCreate, UserResponse
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db, User, Vendor
+from app.core.security import get_password_hash_async
+from app.core.dependencies import get_admin_user_dependency
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.core.responses import SchemaSerializer, list_response
+from app.schemas.user import UserCreate, UserResponse, Principal
+from app.schemas.vendor import VendorCreate, VendorResponse, VendorUpdate
+from app.services.pickups import build_manifests
+from app.services.receipt_export import stream_receipts_zip
+from app.services.receipts import receipt_formats
+from app.services.stats import get_stats
+from app.services.user_export import stream_users, users_query
+from datetime import date, datetime, timezone
+from typing import List, Optional
 
 router = APIRouter()
 
-def get_admin_user(authorization: str = Header(None), db: Session = Depends(get_db)):
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Please login to access admin panel")
-    
-    token = authorization.split(" ")[1]
-    email = verify_token(token)
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not user.is_admin:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    return user
+get_admin_user = get_admin_user_dependency()
+
+DEFAULT_USER_PAGE_SIZE = 100
+MAX_USER_PAGE_SIZE = 1000
+
+user_serializer = SchemaSerializer(UserResponse)
 
 @router.get("/users", response_model=List[UserResponse])
-async def get_all_users(admin_user: User = Depends(get_admin_user), db: Session = Depends(get_db)):
-    users = db.query(User).all()
-    return users
+async def get_all_users(
+    response: Response,
+    is_admin: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    prefix: Optional[str] = Query(None, max_length=255, description="Email or username prefix"),
+    limit: int = Query(DEFAULT_USER_PAGE_SIZE, ge=1, le=MAX_USER_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    admin_user: Principal = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    query = users_query(is_admin, created_after, created_before, prefix)
+    if cursor:
+        after_id = decode_cursor(cursor).get("id")
+        if not isinstance(after_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(User.id > after_id)
+    # One extra row tells us whether another page exists
+    users = (await db.execute(query.order_by(User.id).limit(limit + 1))).scalars().all()
+    if len(users) > limit:
+        users = users[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor({"id": users[-1].id})
+    return list_response(users, user_serializer, response)
+
+@router.get("/users/export")
+async def export_users(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    is_admin: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    prefix: Optional[str] = Query(None, max_length=255, description="Email or username prefix"),
+    admin_user: Principal = Depends(get_admin_user)
+):
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_users(users_query(is_admin, created_after, created_before, prefix), export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=ECycle_Users.{export_format}"}
+    )
+
+@router.get("/stats")
+async def get_admin_stats(admin_user: Principal = Depends(get_admin_user), db: AsyncSession = Depends(get_db)):
+    return await get_stats(db)
+
+@router.post("/vendors", response_model=VendorResponse)
+async def create_vendor(vendor: VendorCreate, admin_user: Principal = Depends(get_admin_user), db: AsyncSession = Depends(get_db)):
+    db_vendor = Vendor(**vendor.model_dump())
+    db.add(db_vendor)
+    await db.commit()
+    await db.refresh(db_vendor)
+    return db_vendor
+
+@router.put("/vendors/{vendor_id}", response_model=VendorResponse)
+async def update_vendor(
+    vendor_id: int,
+    vendor: VendorUpdate,
+    admin_user: Principal = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    db_vendor = await db.get(Vendor, vendor_id)
+    if not db_vendor:
+        raise HTTPException(status_code=404, detail="Vendor not found")
+    for field, value in vendor.model_dump(exclude_unset=True).items():
+        setattr(db_vendor, field, value)
+    await db.commit()
+    await db.refresh(db_vendor)
+    return db_vendor
+
+@router.delete("/vendors/{vendor_id}")
+async def deactivate_vendor(vendor_id: int, admin_user: Principal = Depends(get_admin_user), db: AsyncSession = Depends(get_db)):
+    # Deactivated rather than deleted, so past disposals keep their vendor
+    db_vendor = await db.get(Vendor, vendor_id)
+    if not db_vendor:
+        raise HTTPException(status_code=404, detail="Vendor not found")
+    db_vendor.is_active = False
+    await db.commit()
+    return {"message": "Vendor deactivated"}
+
+@router.post("/pickup-manifests")
+async def create_pickup_manifests(
+    day: Optional[date] = None,
+    close: bool = Query(True, description="Close the day's slots to further bookings"),
+    admin_user: Principal = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    day = day or datetime.now(timezone.utc).date()
+    return await build_manifests(db, day, close)
+
+@router.get("/receipts/export")
+async def export_receipts(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    seller: Optional[str] = Query(None, description="Seller name as shown on the listing"),
+    receipt_format: str = Query("pdf", alias="format", pattern="^(txt|pdf)$"),
+    admin_user: Principal = Depends(get_admin_user)
+):
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    if receipt_format not in receipt_formats():
+        raise HTTPException(status_code=400, detail="PDF receipts are not available")
+    
+    filename = f"ECycle_Receipts_{start_date or 'start'}_{end_date or 'today'}.zip"
+    return StreamingResponse(
+        stream_receipts_zip(start_date, end_date, seller, receipt_format),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
 
 @router.post("/create-admin", response_model=UserResponse)
 async def create_admin_user(
     user: UserCreate,
-    admin_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    admin_user: Principal = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = (await db.execute(select(User).filter(User.email == user.email))).scalars().first()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = User(
         email=user.email,
         username=user.username,
@@ -45,19 +157,19 @@ async def create_admin_user(
         is_admin=True
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @router.post("/init-admin")
-async def initialize_admin(db: Session = Depends(get_db)):
+async def initialize_admin(db: AsyncSession = Depends(get_db)):
     # Check if any admin exists
-    admin_exists = db.query(User).filter(User.is_admin == True).first()
+    admin_exists = (await db.execute(select(User).filter(User.is_admin == True))).scalars().first()
     if admin_exists:
         raise HTTPException(status_code=400, detail="Admin already exists")
     
     # Create initial admin
-    hashed_password = get_password_hash("admin123")
+    hashed_password = await get_password_hash_async("admin123")
     admin_user = User(
         email="admin@ecycle.com",
         username="admin",
@@ -66,7 +178,7 @@ async def initialize_admin(db: Session = Depends(get_db)):
         is_admin=True
     )
     db.add(admin_user)
-    db.commit()
-    db.refresh(admin_user)
+    await db.commit()
+    await db.refresh(admin_user)
     
     return {"message": "Initial admin created", "email": "admin@ecycle.com", "password": "admin123"}
\ No newline at end of file
@@ -1,38 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db, User
-from app.core.security import verify_password, get_password_hash, create_access_token, create_refresh_token, verify_token
-from app.schemas.user import UserCreate, UserLogin, UserResponse, Token, TokenRefresh
-from typing import Optional
+from app.core.security import verify_password_async, get_password_hash_async, password_needs_rehash, create_access_token, create_refresh_token, verify_token
+from app.core.dependencies import get_current_user_dependency, token_claims
+from app.schemas.user import UserCreate, UserLogin, UserResponse, Token, TokenRefresh, Principal
 
 router = APIRouter()
 
-def get_current_user(authorization: Optional[str] = Header(None), db: Session = Depends(get_db)):
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Please login to access your account")
-    
-    token = authorization.split(" ")[1]
-    email = verify_token(token)
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+get_current_user = get_current_user_dependency()
 
 @router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     try:
         # Check if email exists
-        existing_user = db.query(User).filter(User.email == user.email).first()
+        existing_user = (await db.execute(select(User).filter(User.email == user.email))).scalars().first()
         if existing_user:
             raise HTTPException(status_code=400, detail="Email already registered")
         
         # Check if username exists
-        existing_username = db.query(User).filter(User.username == user.username).first()
+        existing_username = (await db.execute(select(User).filter(User.username == user.username))).scalars().first()
         if existing_username:
             raise HTTPException(status_code=400, detail="Username already taken")
         
         # Hash password
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await get_password_hash_async(user.password)
         
         # Create user
         db_user = User(
@@ -46,30 +38,35 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
         
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         return db_user
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Registration failed")
 
 @router.post("/login", response_model=Token)
-def login(user: UserLogin, db: Session = Depends(get_db)):
+async def login(user: UserLogin, db: AsyncSession = Depends(get_db)):
     try:
         # Find user
-        db_user = db.query(User).filter(User.email == user.email).first()
+        db_user = (await db.execute(select(User).filter(User.email == user.email))).scalars().first()
         if not db_user:
             raise HTTPException(status_code=401, detail="Incorrect email or password")
         
         # Verify password
-        if not verify_password(user.password, db_user.hashed_password):
+        if not await verify_password_async(user.password, db_user.hashed_password):
             raise HTTPException(status_code=401, detail="Incorrect email or password")
         
+        # Upgrade hashes stored with outdated cost parameters while we have the plain password
+        if password_needs_rehash(db_user.hashed_password):
+            db_user.hashed_password = await get_password_hash_async(user.password)
+            await db.commit()
+        
         # Create tokens
-        access_token = create_access_token(data={"sub": db_user.email})
-        refresh_token = create_refresh_token(data={"sub": db_user.email})
+        access_token = create_access_token(data=token_claims(db_user))
+        refresh_token = create_refresh_token(data=token_claims(db_user))
         
         return {
             "access_token": access_token,
@@ -82,14 +79,14 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Login failed")
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(token_data: TokenRefresh, db: Session = Depends(get_db)):
+async def refresh_token(token_data: TokenRefresh, db: AsyncSession = Depends(get_db)):
     email = verify_token(token_data.refresh_token)
-    db_user = db.query(User).filter(User.email == email).first()
+    db_user = (await db.execute(select(User).filter(User.email == email))).scalars().first()
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    access_token = create_access_token(data={"sub": db_user.email})
-    refresh_token = create_refresh_token(data={"sub": db_user.email})
+    access_token = create_access_token(data=token_claims(db_user))
+    refresh_token = create_refresh_token(data=token_claims(db_user))
     
     return {
         "access_token": access_token,
@@ -98,5 +95,5 @@ async def refresh_token(token_data: TokenRefresh, db: Session = Depends(get_db))
     }
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: Principal = Depends(get_current_user)):
     return current_user
\ No newline at end of file
@@ -1,29 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Header
-from sqlalchemy.orm import Session
-from app.core.database import get_db, Classification, User
-from app.core.security import verify_token
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db, Classification
+from app.core.dependencies import conditional_get_dependency, get_current_user_dependency
+from app.core.responses import SchemaSerializer, list_response
+from app.schemas.classify import ClassificationResponse, SuggestionRequest
+from app.schemas.user import Principal
+from app.services.classification_import import IMPORT_FORMATS, detect_format, import_classifications
+from app.services.suggestions import suggest
+from app.services.image_hashes import find_near_duplicates, hash_upload
+from app.services.images import generate_derivatives_async, ready_derivative_urls, upload_url
+from app.services.uploads import store_upload
 from typing import List, Optional
-import shutil
-import os
 
 router = APIRouter()
 
-def get_current_user(authorization: str = Header(None, alias="Authorization"), db: Session = Depends(get_db)):
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Please login to classify items")
-    
-    token = authorization.split(" ")[1]
-    email = verify_token(token)
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+get_current_user = get_current_user_dependency("Please login to classify items")
+
+classification_serializer = SchemaSerializer(ClassificationResponse)
 
 @router.post("/")
 async def classify_item(
     classification: dict,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     try:
         db_classification = Classification(
@@ -34,8 +35,8 @@ async def classify_item(
             category=classification["category"]
         )
         db.add(db_classification)
-        db.commit()
-        db.refresh(db_classification)
+        await db.commit()
+        await db.refresh(db_classification)
         
         return {
             "id": db_classification.id,
@@ -44,61 +45,97 @@ async def classify_item(
             "description": db_classification.description,
             "condition": db_classification.condition,
             "image_path": db_classification.image_path,
+            "image_derivatives": db_classification.image_derivatives or {},
             "category": db_classification.category,
             "created_at": db_classification.created_at.isoformat() if db_classification.created_at else None
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/batch")
+async def classify_batch(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv or ndjson; detected from the file name or content type if omitted"),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    import_format = format or detect_format(file.filename, file.content_type)
+    if import_format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Upload a .csv or .ndjson file, or pass format=csv|ndjson")
+    try:
+        return await import_classifications(db, current_user.id, file, import_format)
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/suggest")
+async def suggest_categories(
+    request: SuggestionRequest,
+    top_k: int = Query(3, ge=1, le=10),
+    current_user: Principal = Depends(get_current_user)
+):
+    # Scoring a large batch takes milliseconds of NumPy work; keep it off the event loop
+    model, suggestions = await run_in_threadpool(suggest, [item.model_dump() for item in request.items], top_k)
+    return {
+        "suggestions": suggestions,
+        "model": {"trained_at": model.trained_at, "examples": model.examples}
+    }
+
 @router.post("/upload-image/{classification_id}")
 async def upload_image(
     classification_id: int,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     try:
-        classification = db.query(Classification).filter(
+        classification = (await db.execute(select(Classification).filter(
             Classification.id == classification_id,
             Classification.user_id == current_user.id
-        ).first()
+        ))).scalars().first()
         
         if not classification:
             raise HTTPException(status_code=404, detail="Classification not found")
         
-        upload_dir = "uploads"
-        os.makedirs(upload_dir, exist_ok=True)
-        file_path = f"{upload_dir}/{classification_id}_{file.filename}"
+        stored = await store_upload(file)
         
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Byte-identical uploads share stored.path, so only other files are reported
+        duplicates = []
+        phash = await hash_upload(db, stored.path)
+        if phash is not None:
+            duplicates = await find_near_duplicates(db, phash, exclude_path=stored.path)
         
-        classification.image_path = file_path
-        db.commit()
+        # Byte-identical uploads may already have their thumbnails
+        derivatives = await run_in_threadpool(ready_derivative_urls, stored.path)
+        classification.image_path = stored.path
+        classification.image_derivatives = derivatives
+        await db.commit()
         
-        return {"message": "Image uploaded successfully", "path": file_path}
+        if not derivatives:
+            # Rendered after the response is sent; the task records them on the classification
+            background_tasks.add_task(generate_derivatives_async, stored.path)
+        
+        return {
+            "message": "Image uploaded successfully",
+            "path": stored.path,
+            "sha256": stored.sha256,
+            "image_derivatives": derivatives,
+            "duplicates": [{"image_url": upload_url(duplicate.path), "distance": duplicate.distance} for duplicate in duplicates]
+        }
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/")
-async def get_classifications(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@router.get("/", response_model=List[ClassificationResponse],
+            dependencies=[Depends(conditional_get_dependency("classifications", user_dependency=get_current_user))])
+async def get_classifications(response: Response, current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        classifications = db.query(Classification).filter(Classification.user_id == current_user.id).all()
-        result = []
-        for c in classifications:
-            result.append({
-                "id": c.id,
-                "user_id": c.user_id,
-                "item_name": c.item_name,
-                "description": c.description,
-                "condition": c.condition,
-                "image_path": c.image_path,
-                "category": c.category,
-                "created_at": c.created_at.isoformat() if c.created_at else None
-            })
-        return result
+        classifications = (await db.execute(select(Classification).filter(Classification.user_id == current_user.id))).scalars().all()
+        return list_response(classifications, classification_serializer, response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
-from app.core.database import get_db, Disposal, Classification, User
-from app.core.security import verify_token
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db, Disposal, Classification, Vendor
+from app.core.dependencies import conditional_get_dependency, get_current_user_dependency
+from app.core.responses import SchemaSerializer, list_response
+from app.schemas.user import Principal
+from app.services.pickups import CONFIRMED_STATUS, bookable_days, booking_day_started_at, normalize_area, parse_pickup_day, reserve_slot, slot_availability
+from app.services.vendors import get_vendor_index
+from pydantic import BaseModel, Field
+from datetime import date, datetime
 from typing import List, Optional
 
 router = APIRouter()
@@ -14,6 +20,9 @@ class DisposalCreate(BaseModel):
     pickup_location: Optional[str] = None
     vendor_filter: str
     selected_vendor: Optional[str] = None
+    # With a pickup, books a slot with this vendor for pickup_area on the pickup_date's day
+    vendor_id: Optional[int] = None
+    pickup_area: Optional[str] = Field(None, max_length=255)
 
 class DisposalResponse(BaseModel):
     id: int
@@ -25,32 +34,65 @@ class DisposalResponse(BaseModel):
     vendor_filter: str
     selected_vendor: Optional[str] = None
     status: str
+    created_at: Optional[datetime] = None
+    vendor_id: Optional[int] = None
+    pickup_area: Optional[str] = None
+    pickup_slot_id: Optional[int] = None
     
     class Config:
         from_attributes = True
 
-def get_current_user(authorization: str = Header(None, alias="Authorization"), db: Session = Depends(get_db)):
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Please login to schedule disposal")
-    
-    token = authorization.split(" ")[1]
-    email = verify_token(token)
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+get_current_user = get_current_user_dependency("Please login to schedule disposal")
+
+disposal_serializer = SchemaSerializer(DisposalResponse)
+
+DEFAULT_VENDOR_RADIUS_KM = 25.0
+MAX_VENDOR_RADIUS_KM = 200.0
+DEFAULT_VENDOR_LIMIT = 20
+MAX_VENDOR_LIMIT = 100
+MAX_SLOT_DAYS = 31
+
+async def get_pickup_vendor(db: AsyncSession, vendor_id: int) -> Vendor:
+    vendor = await db.get(Vendor, vendor_id)
+    if not vendor or not vendor.is_active:
+        raise HTTPException(status_code=404, detail="Vendor not found")
+    if not vendor.pickup:
+        raise HTTPException(status_code=400, detail="This vendor does not offer pickups")
+    return vendor
+
+async def book_pickup(db: AsyncSession, db_disposal: Disposal, disposal: DisposalCreate):
+    """Reserve a slot for the disposal in the current transaction, or raise."""
+    vendor = await get_pickup_vendor(db, disposal.vendor_id)
+    if disposal.vendor_filter not in (vendor.accepts or ()):
+        raise HTTPException(status_code=400, detail=f"This vendor does not accept {disposal.vendor_filter}")
+    area = normalize_area(disposal.pickup_area or "")
+    if not area:
+        raise HTTPException(status_code=400, detail="pickup_area is required to book a pickup")
+    day = parse_pickup_day(disposal.pickup_date)
+    first_day, last_day = bookable_days()
+    if day is None or not first_day <= day <= last_day:
+        raise HTTPException(status_code=400, detail=f"pickup_date must be a date between {first_day} and {last_day}")
+
+    slot_id = await reserve_slot(db, vendor, area, day)
+    if slot_id is None:
+        raise HTTPException(status_code=409, detail="No pickups left for this vendor, area and day; please choose another day")
+    db_disposal.vendor_id = vendor.id
+    db_disposal.selected_vendor = vendor.name
+    db_disposal.pickup_area = area
+    db_disposal.pickup_slot_id = slot_id
+    db_disposal.status = CONFIRMED_STATUS
 
 @router.post("/")
 async def schedule_disposal(
     disposal: DisposalCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     try:
-        classification = db.query(Classification).filter(
+        classification = (await db.execute(select(Classification).filter(
             Classification.id == disposal.classification_id,
             Classification.user_id == current_user.id
-        ).first()
+        ))).scalars().first()
         
         if not classification:
             raise HTTPException(status_code=404, detail="Classification not found")
@@ -64,9 +106,11 @@ async def schedule_disposal(
             vendor_filter=disposal.vendor_filter,
             selected_vendor=disposal.selected_vendor
         )
+        if disposal.disposal_method == "pickup" and disposal.vendor_id is not None:
+            await book_pickup(db, db_disposal, disposal)
         db.add(db_disposal)
-        db.commit()
-        db.refresh(db_disposal)
+        await db.commit()
+        await db.refresh(db_disposal)
         
         return {
             "id": db_disposal.id,
@@ -78,54 +122,58 @@ async def schedule_disposal(
             "vendor_filter": db_disposal.vendor_filter,
             "selected_vendor": db_disposal.selected_vendor,
             "status": db_disposal.status,
-            "created_at": db_disposal.created_at.isoformat() if db_disposal.created_at else None
+            "created_at": db_disposal.created_at.isoformat() if db_disposal.created_at else None,
+            "vendor_id": db_disposal.vendor_id,
+            "pickup_area": db_disposal.pickup_area,
+            "pickup_slot_id": db_disposal.pickup_slot_id
         }
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/")
-async def get_disposals(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@router.get("/", response_model=List[DisposalResponse],
+            dependencies=[Depends(conditional_get_dependency("disposals", user_dependency=get_current_user))])
+async def get_disposals(response: Response, current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        disposals = db.query(Disposal).filter(Disposal.user_id == current_user.id).all()
-        result = []
-        for disposal in disposals:
-            result.append({
-                "id": disposal.id,
-                "user_id": disposal.user_id,
-                "classification_id": disposal.classification_id,
-                "disposal_method": disposal.disposal_method,
-                "pickup_date": disposal.pickup_date,
-                "pickup_location": disposal.pickup_location,
-                "vendor_filter": disposal.vendor_filter,
-                "selected_vendor": disposal.selected_vendor,
-                "status": disposal.status,
-                "created_at": disposal.created_at.isoformat() if disposal.created_at else None
-            })
-        return result
+        disposals = (await db.execute(select(Disposal).filter(Disposal.user_id == current_user.id))).scalars().all()
+        return list_response(disposals, disposal_serializer, response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/vendors")
-async def get_vendors(vendor_type: str):
-    vendors = {
-        "batteries": [
-            {"name": "EcoBattery Recycling", "location": "Downtown", "rating": 4.5, "pickup": True},
-            {"name": "Green Power Solutions", "location": "Uptown", "rating": 4.2, "pickup": False}
-        ],
-        "computers": [
-            {"name": "TechRecycle Pro", "location": "Tech District", "rating": 4.8, "pickup": True},
-            {"name": "Digital Waste Management", "location": "Business Park", "rating": 4.3, "pickup": True}
-        ],
-        "appliances": [
-            {"name": "Home Appliance Recyclers", "location": "Industrial Zone", "rating": 4.1, "pickup": True},
-            {"name": "White Goods Disposal", "location": "Suburb Area", "rating": 4.0, "pickup": False}
-        ],
-        "phones": [
-            {"name": "Mobile Recycle Hub", "location": "City Center", "rating": 4.6, "pickup": True},
-            {"name": "Phone Disposal Service", "location": "Mall District", "rating": 4.4, "pickup": False}
-        ]
-    }
-    return vendors.get(vendor_type, [])
\ No newline at end of file
+@router.get("/vendors", dependencies=[Depends(conditional_get_dependency("vendors"))])
+async def get_vendors(
+    vendor_type: Optional[str] = Query(None, description="Only vendors accepting this item type"),
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: float = Query(DEFAULT_VENDOR_RADIUS_KM, gt=0, le=MAX_VENDOR_RADIUS_KM),
+    pickup: Optional[bool] = None,
+    limit: int = Query(DEFAULT_VENDOR_LIMIT, ge=1, le=MAX_VENDOR_LIMIT),
+    db: AsyncSession = Depends(get_db)
+):
+    if (latitude is None) != (longitude is None):
+        raise HTTPException(status_code=400, detail="latitude and longitude must be given together")
+    index = await get_vendor_index(db)
+    if latitude is None:
+        # No location: best rated first
+        return [vendor.to_dict() for vendor in index.top_rated(vendor_type, pickup, limit)]
+    nearest = index.nearest(latitude, longitude, radius_km, vendor_type, pickup, limit)
+    return [vendor.to_dict(distance) for distance, vendor in nearest]
+
+# The listing starts at today's date, so it also changes at midnight without any write
+@router.get("/slots", dependencies=[Depends(conditional_get_dependency("pickup_slots", "vendors", period_start=booking_day_started_at))])
+async def get_pickup_slots(
+    vendor_id: int,
+    area: str = Query(..., min_length=1, max_length=255),
+    start_date: Optional[date] = None,
+    days: int = Query(14, ge=1, le=MAX_SLOT_DAYS),
+    db: AsyncSession = Depends(get_db)
+):
+    vendor = await get_pickup_vendor(db, vendor_id)
+    first_day, last_day = bookable_days()
+    start = max(start_date or first_day, first_day)
+    days = min(days, (last_day - start).days + 1)
+    if days <= 0:
+        return []
+    return await slot_availability(db, vendor, normalize_area(area), start, days)
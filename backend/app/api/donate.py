@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
-from app.core.database import get_db, Donation, Classification, User
-from app.core.security import verify_token
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db, Donation, Classification
+from app.core.dependencies import conditional_get_dependency, get_current_user_dependency
+from app.core.responses import SchemaSerializer, list_response
+from app.schemas.user import Principal
 from pydantic import BaseModel
+from datetime import datetime
 from typing import List, Optional
 
 router = APIRouter()
@@ -19,33 +23,26 @@ class DonationResponse(BaseModel):
     location: str
     organization: str
     status: str
-    created_at: str
+    created_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
 
-def get_current_user(authorization: str = Header(None, alias="Authorization"), db: Session = Depends(get_db)):
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Please login to donate items")
-    
-    token = authorization.split(" ")[1]
-    email = verify_token(token)
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+get_current_user = get_current_user_dependency("Please login to donate items")
+
+donation_serializer = SchemaSerializer(DonationResponse)
 
 @router.post("/")
 async def register_donation(
     donation: DonationCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     try:
-        classification = db.query(Classification).filter(
+        classification = (await db.execute(select(Classification).filter(
             Classification.id == donation.classification_id,
             Classification.user_id == current_user.id
-        ).first()
+        ))).scalars().first()
         
         if not classification:
             raise HTTPException(status_code=404, detail="Classification not found")
@@ -61,8 +58,8 @@ async def register_donation(
             organization=donation.organization
         )
         db.add(db_donation)
-        db.commit()
-        db.refresh(db_donation)
+        await db.commit()
+        await db.refresh(db_donation)
         
         return {
             "id": db_donation.id,
@@ -76,29 +73,19 @@ async def register_donation(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to register donation")
 
-@router.get("/")
-async def get_donations(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@router.get("/", response_model=List[DonationResponse],
+            dependencies=[Depends(conditional_get_dependency("donations", user_dependency=get_current_user))])
+async def get_donations(response: Response, current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        donations = db.query(Donation).filter(Donation.user_id == current_user.id).all()
-        result = []
-        for donation in donations:
-            result.append({
-                "id": donation.id,
-                "user_id": donation.user_id,
-                "classification_id": donation.classification_id,
-                "location": donation.location,
-                "organization": donation.organization,
-                "status": donation.status,
-                "created_at": donation.created_at.isoformat() if donation.created_at else None
-            })
-        return result
+        donations = (await db.execute(select(Donation).filter(Donation.user_id == current_user.id))).scalars().all()
+        return list_response(donations, donation_serializer, response)
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to fetch donations")
 
-@router.get("/organizations")
+@router.get("/organizations", dependencies=[Depends(conditional_get_dependency())])
 async def get_donation_organizations():
     organizations = [
         {
@@ -1,14 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import Response
-from sqlalchemy.orm import Session
-from app.core.database import get_db, MarketplaceItem, Classification, User, ProductCategory, Purchase
-from app.core.security import verify_token
-# from app.services.receipt_generator import generate_receipt_pdf
-from pydantic import BaseModel
-from datetime import datetime
+from sqlalchemy import select, update, and_, or_, true, false
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db, MarketplaceItem, Classification, ProductCategory, Purchase, marketplace_discount
+from app.core.dependencies import conditional_get_dependency, etag_matches, get_current_user_dependency
+from app.schemas.user import Principal
+from app.core.responses import SchemaSerializer, list_response
+from app.core.versions import mark_changed
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.services.idempotency import get_stored_response, request_fingerprint, store_response
+from app.services.images import generate_listing_derivatives_async, listing_image_derivatives
+from app.services.search import search_item_ids
+from app.services.stats import adjust_stats
+from app.services.uploads import stored_upload_path
+from app.services.spec_filters import parse_spec_filters, spec_filter_clause, matches_spec_filters
+from app.services.receipts import load_receipt, receipt_formats, receipt_snapshot, render_receipt_async, render_receipts_after_purchase
+from pydantic import BaseModel, field_validator
+from datetime import datetime, timezone
 from typing import List, Optional
-import json
-from ..static_products import STATIC_PRODUCTS
+from types import MappingProxyType
+from ..static_products import STATIC_CATALOG, STATIC_PRODUCTS_CREATED_AT
 
 router = APIRouter()
 
@@ -45,6 +58,14 @@ class MarketplaceItemResponse(BaseModel):
     is_selling: bool
     status: str
     created_at: datetime
+    # Thumbnail/medium WebP and JPEG URLs for each uploaded image, {} for external URLs
+    image_derivatives: List[dict] = []
+
+    @field_validator("seller_rating", mode="before")
+    @classmethod
+    def unrated_seller(cls, value):
+        # The column is nullable; listings without a rating show 0 like new ones
+        return 0.0 if value is None else value
     
     class Config:
         from_attributes = True
@@ -83,20 +104,11 @@ class PurchaseResponse(BaseModel):
     class Config:
         from_attributes = True
 
-def get_current_user(authorization: str = Header(None), db: Session = Depends(get_db)):
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Please login to access marketplace")
-    
-    token = authorization.split(" ")[1]
-    email = verify_token(token)
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
-@router.get("/categories", response_model=List[CategoryResponse])
-async def get_categories(db: Session = Depends(get_db)):
-    categories = db.query(ProductCategory).all()
+get_current_user = get_current_user_dependency("Please login to access marketplace")
+
+@router.get("/categories", response_model=List[CategoryResponse], dependencies=[Depends(conditional_get_dependency("product_categories"))])
+async def get_categories(db: AsyncSession = Depends(get_db)):
+    categories = (await db.execute(select(ProductCategory))).scalars().all()
     if not categories:
         # Create default categories
         default_categories = [
@@ -110,25 +122,26 @@ async def get_categories(db: Session = Depends(get_db)):
         for cat in default_categories:
             db_cat = ProductCategory(**cat)
             db.add(db_cat)
-        db.commit()
+        await db.commit()
         
         # Categories are created, static products are handled separately
         pass
         
-        categories = db.query(ProductCategory).all()
+        categories = (await db.execute(select(ProductCategory))).scalars().all()
     return categories
 
 @router.post("/", response_model=MarketplaceItemResponse)
 async def create_marketplace_item(
     item: MarketplaceItemCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     
-    classification = db.query(Classification).filter(
+    classification = (await db.execute(select(Classification).filter(
         Classification.id == item.classification_id,
         Classification.user_id == current_user.id
-    ).first()
+    ))).scalars().first()
     
     if not classification:
         raise HTTPException(status_code=404, detail="Classification not found")
@@ -143,31 +156,137 @@ async def create_marketplace_item(
         price=item.price,
         original_price=item.original_price,
         category_id=item.category_id,
-        images=json.dumps(item.images),
-        specifications=json.dumps(item.specifications),
+        images=item.images,
+        image_derivatives=await run_in_threadpool(listing_image_derivatives, item.images),
+        specifications=item.specifications,
         warranty_info=item.warranty_info,
         seller_name=current_user.full_name or current_user.username,
         is_selling=item.is_selling
     )
     db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    await db.commit()
+    await db.refresh(db_item)
     
-    # Convert JSON strings back to objects for response
-    db_item.images = json.loads(db_item.images or '[]')
-    db_item.specifications = json.loads(db_item.specifications or '{}')
+    if any(stored_upload_path(image) and not derivatives for image, derivatives in zip(item.images, db_item.image_derivatives)):
+        # Rendered after the response is sent; the task records them on the listing
+        background_tasks.add_task(generate_listing_derivatives_async, db_item.id, item.images)
     return db_item
 
+SORT_OPTIONS = ("newest", "price_asc", "price_desc", "discount")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Source rank used as a tie-breaker so static and DB items interleave deterministically
+STATIC_SOURCE = 0
+DB_SOURCE = 1
+
+def build_static_item_response(item: dict) -> MarketplaceItemResponse:
+    return MarketplaceItemResponse(
+        id=item['id'],
+        user_id=1,
+        classification_id=1,
+        title=item['title'],
+        brand=item['brand'],
+        model=item['model'],
+        description=item['description'],
+        price=item['price'],
+        original_price=item.get('original_price'),
+        category_id=item['category_id'],
+        images=item['images'],
+        image_derivatives=[{} for _ in item['images']],
+        specifications=item['specifications'],
+        warranty_info=item['warranty_info'],
+        seller_name=item['seller_name'],
+        seller_rating=item['seller_rating'],
+        is_selling=item['is_selling'],
+        status=item['status'],
+        created_at=STATIC_PRODUCTS_CREATED_AT
+    )
+
+marketplace_item_serializer = SchemaSerializer(MarketplaceItemResponse)
+
+# Responses for the static catalog never change, so they are validated once at import
+STATIC_ITEM_RESPONSES = MappingProxyType({
+    product_id: build_static_item_response(item) for product_id, item in STATIC_CATALOG.by_id.items()
+})
+
+def get_sort_column(sort: str):
+    if sort == "newest":
+        return MarketplaceItem.created_at
+    if sort == "discount":
+        return marketplace_discount
+    return MarketplaceItem.price
+
+def is_descending(sort: str) -> bool:
+    return sort != "price_asc"
+
+def get_static_sort_value(item: dict, sort: str):
+    if sort == "newest":
+        return STATIC_PRODUCTS_CREATED_AT
+    if sort == "discount":
+        original_price = item.get('original_price')
+        return (original_price - item['price']) / original_price if original_price else 0
+    return item['price']
+
+def get_db_sort_value(item: MarketplaceItem, sort: str):
+    if sort == "newest":
+        return item.created_at
+    if sort == "discount":
+        return (item.original_price - item.price) / item.original_price if item.original_price else 0
+    return item.price
+
+def serialize_sort_value(value, sort: str):
+    return value.isoformat() if sort == "newest" else value
+
+def parse_sort_value(value, sort: str):
+    if sort == "newest":
+        parsed = datetime.fromisoformat(value)
+        # created_at is stored as naive UTC; an offset in a hand-made cursor must not reach the comparisons
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    return float(value)
+
+def keyset_filter(sort: str, value, source: int, item_id: int):
+    """SQL condition selecting DB rows that come after the (value, source, id) cursor position."""
+    column = get_sort_column(sort)
+    if is_descending(sort):
+        # DB rows rank above static ones, so on a tie they only follow a static cursor item when ascending
+        tie_break = MarketplaceItem.id < item_id if source == DB_SOURCE else false()
+        return or_(column < value, and_(column == value, tie_break))
+    tie_break = MarketplaceItem.id > item_id if source == DB_SOURCE else true()
+    return or_(column > value, and_(column == value, tie_break))
+
+def is_after_cursor(key: tuple, cursor_key: tuple, descending: bool) -> bool:
+    return key < cursor_key if descending else key > cursor_key
+
 @router.get("/", response_model=List[MarketplaceItemResponse])
 async def get_marketplace_items(
+    response: Response,
     is_selling: Optional[bool] = None,
     category_id: Optional[int] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
-    db: Session = Depends(get_db)
+    spec: Optional[List[str]] = Query(None, description="Specification filters such as RAM>=8GB or Storage=256GB"),
+    sort: str = Query("newest", pattern="^(newest|price_asc|price_desc|discount)$"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
+    spec_filters = parse_spec_filters(spec)
+    descending = is_descending(sort)
+    cursor_key = None
+    if cursor:
+        cursor_data = decode_cursor(cursor)
+        if cursor_data.get("sort") != sort:
+            raise HTTPException(status_code=400, detail="Cursor does not match sort order")
+        try:
+            cursor_key = (parse_sort_value(cursor_data["value"], sort), int(cursor_data["source"]), int(cursor_data["id"]))
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
     # Get database items
-    query = db.query(MarketplaceItem).filter(MarketplaceItem.status == "available")
+    query = select(MarketplaceItem).filter(MarketplaceItem.status == "available")
     if is_selling is not None:
         query = query.filter(MarketplaceItem.is_selling == is_selling)
     if category_id is not None:
@@ -176,205 +295,249 @@ async def get_marketplace_items(
         query = query.filter(MarketplaceItem.price >= min_price)
     if max_price is not None:
         query = query.filter(MarketplaceItem.price <= max_price)
-    db_items = query.all()
-    
-    # Convert JSON strings to objects for DB items
-    for item in db_items:
-        item.images = json.loads(item.images or '[]')
-        item.specifications = json.loads(item.specifications or '{}')
+    if spec_filters:
+        query = query.filter(spec_filter_clause(spec_filters))
+    if cursor_key is not None:
+        query = query.filter(keyset_filter(sort, *cursor_key))
+    sort_column = get_sort_column(sort)
+    if descending:
+        query = query.order_by(sort_column.desc(), MarketplaceItem.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), MarketplaceItem.id.asc())
+    # One extra row tells us whether another page exists
+    db_items = (await db.execute(query.limit(limit + 1))).scalars().all()
     
     # Filter static products
-    static_items = STATIC_PRODUCTS.copy()
-    if is_selling is not None and not is_selling:
-        static_items = []
-    if category_id is not None:
-        static_items = [item for item in static_items if item['category_id'] == category_id]
-    if min_price is not None:
-        static_items = [item for item in static_items if item['price'] >= min_price]
-    if max_price is not None:
-        static_items = [item for item in static_items if item['price'] <= max_price]
+    static_items = STATIC_CATALOG.filter(is_selling, category_id, min_price, max_price)
+    if spec_filters:
+        static_items = [item for item in static_items if matches_spec_filters(item['specifications'], spec_filters)]
+
+    # Merge both sources on the same (value, source, id) key and cut the page
+    candidates = [((get_static_sort_value(item, sort), STATIC_SOURCE, item['id']), item) for item in static_items]
+    candidates += [((get_db_sort_value(item, sort), DB_SOURCE, item.id), item) for item in db_items]
+    if cursor_key is not None:
+        candidates = [candidate for candidate in candidates if is_after_cursor(candidate[0], cursor_key, descending)]
+    candidates.sort(key=lambda candidate: candidate[0], reverse=descending)
+    page = candidates[:limit]
+
+    if len(candidates) > limit:
+        last_value, last_source, last_id = page[-1][0]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor({
+            "sort": sort,
+            "value": serialize_sort_value(last_value, sort),
+            "source": last_source,
+            "id": last_id,
+        })
     
     # Convert static items to response format
-    static_responses = []
-    for item in static_items:
-        static_responses.append(MarketplaceItemResponse(
-            id=item['id'],
-            user_id=1,
-            classification_id=1,
-            title=item['title'],
-            brand=item['brand'],
-            model=item['model'],
-            description=item['description'],
-            price=item['price'],
-            original_price=item.get('original_price'),
-            category_id=item['category_id'],
-            images=item['images'],
-            specifications=item['specifications'],
-            warranty_info=item['warranty_info'],
-            seller_name=item['seller_name'],
-            seller_rating=item['seller_rating'],
-            is_selling=item['is_selling'],
-            status=item['status'],
-            created_at=datetime.now()
-        ))
+    results = []
+    for (_, source, _), item in page:
+        results.append(item if source == DB_SOURCE else STATIC_ITEM_RESPONSES[item['id']])
+    
+    return list_response(results, marketplace_item_serializer, response)
+
+@router.get("/search", response_model=List[MarketplaceItemResponse])
+async def search_marketplace_items(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    is_selling: Optional[bool] = None,
+    category_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    spec: Optional[List[str]] = Query(None, description="Specification filters such as RAM>=8GB or Storage=256GB"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
+    spec_filters = parse_spec_filters(spec)
+    static_ids = [
+        item['id'] for item in STATIC_CATALOG.filter(is_selling, category_id, min_price, max_price)
+        if matches_spec_filters(item['specifications'], spec_filters)
+    ]
+    matches = await search_item_ids(
+        db, q, static_ids,
+        is_selling=is_selling, category_id=category_id,
+        min_price=min_price, max_price=max_price,
+        spec_filters=spec_filters, limit=limit,
+    )
     
-    return static_responses + db_items
+    db_ids = [item_id for is_static, item_id in matches if not is_static]
+    db_items = {}
+    if db_ids:
+        rows = (await db.execute(select(MarketplaceItem).filter(MarketplaceItem.id.in_(db_ids)))).scalars().all()
+        db_items = {item.id: item for item in rows}
+    
+    # Keep the search ranking order
+    results = []
+    for is_static, item_id in matches:
+        if is_static:
+            results.append(STATIC_ITEM_RESPONSES[item_id])
+        elif item_id in db_items:
+            results.append(db_items[item_id])
+    return list_response(results, marketplace_item_serializer, response)
+
+async def reserve_item(db: AsyncSession, item_id: int, buyer_id: int):
+    """
+    Mark a DB item sold with one conditional UPDATE, so of several concurrent buyers
+    exactly one succeeds. Returns the item's price, seller and receipt fields; raises if
+    the item cannot be bought.
+    """
+    reserved = (await db.execute(
+        update(MarketplaceItem)
+        .where(
+            MarketplaceItem.id == item_id,
+            MarketplaceItem.status == "available",
+            MarketplaceItem.user_id != buyer_id
+        )
+        .values(status="sold")
+        .returning(
+            MarketplaceItem.price, MarketplaceItem.user_id, MarketplaceItem.title, MarketplaceItem.brand,
+            MarketplaceItem.model, MarketplaceItem.seller_name, MarketplaceItem.warranty_info
+        )
+        .execution_options(synchronize_session=False)
+    )).first()
+    if reserved:
+        mark_changed(db, "marketplace_items", reserved.user_id)
+        await adjust_stats(db, "marketplace_items_by_status", "available", -1)
+        await adjust_stats(db, "marketplace_items_by_status", "sold", 1)
+        return reserved
+    
+    # Nothing updated: work out why for the error message
+    await db.rollback()
+    item = (await db.execute(select(MarketplaceItem).filter(
+        MarketplaceItem.id == item_id,
+        MarketplaceItem.status == "available"
+    ))).scalars().first()
+    if item and item.user_id == buyer_id:
+        raise HTTPException(status_code=400, detail="Cannot purchase your own item")
+    raise HTTPException(status_code=404, detail="Item not found or not available")
 
 @router.post("/purchase", response_model=PurchaseResponse)
 async def purchase_item(
     purchase_data: PurchaseFormData,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
+    # Card details are not part of the fingerprint, so they are never hashed or stored
+    fingerprint = request_fingerprint(purchase_data.model_dump(exclude={"card_number", "card_expiry", "card_cvv"}))
+    if idempotency_key:
+        stored = await get_stored_response(db, current_user.id, idempotency_key, fingerprint)
+        if stored:
+            return stored
+    
     # Check if it's a static product (ID >= 1000)
     if purchase_data.marketplace_item_id >= 1000:
         # Find static product
-        static_item = next((item for item in STATIC_PRODUCTS if item['id'] == purchase_data.marketplace_item_id), None)
+        static_item = STATIC_CATALOG.get(purchase_data.marketplace_item_id)
         if not static_item:
             raise HTTPException(status_code=404, detail="Item not found")
-        
-        # Create purchase record for static item
-        db_purchase = Purchase(
-            user_id=current_user.id,
-            marketplace_item_id=purchase_data.marketplace_item_id,
-            purchase_price=static_item['price'],
-            shipping_address=purchase_data.shipping_address,
-            phone_number=purchase_data.phone_number,
-            payment_method=purchase_data.payment_method
-        )
-        db.add(db_purchase)
-        db.commit()
-        db.refresh(db_purchase)
-        return db_purchase
-    
-    # Handle database items
-    item = db.query(MarketplaceItem).filter(
-        MarketplaceItem.id == purchase_data.marketplace_item_id,
-        MarketplaceItem.status == "available"
-    ).first()
-    
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found or not available")
-    
-    if item.user_id == current_user.id:
-        raise HTTPException(status_code=400, detail="Cannot purchase your own item")
+        purchase_price = static_item['price']
+        item_data = static_item
+    else:
+        try:
+            reserved = await reserve_item(db, purchase_data.marketplace_item_id, current_user.id)
+            purchase_price = reserved.price
+            item_data = dict(reserved._mapping)
+        except HTTPException:
+            # A concurrent retry may have bought the item for us under the same key
+            if idempotency_key:
+                stored = await get_stored_response(db, current_user.id, idempotency_key, fingerprint)
+                if stored:
+                    return stored
+            raise
     
     # Create purchase record
     db_purchase = Purchase(
         user_id=current_user.id,
-        marketplace_item_id=item.id,
-        purchase_price=item.price,
+        marketplace_item_id=purchase_data.marketplace_item_id,
+        purchase_price=purchase_price,
         shipping_address=purchase_data.shipping_address,
         phone_number=purchase_data.phone_number,
         payment_method=purchase_data.payment_method
     )
     db.add(db_purchase)
     
-    # Update item status
-    item.status = "sold"
+    if not idempotency_key:
+        await db.commit()
+        await db.refresh(db_purchase)
+        background_tasks.add_task(render_receipts_after_purchase, current_user.id, *receipt_snapshot(db_purchase, item_data, current_user))
+        return db_purchase
     
-    db.commit()
-    db.refresh(db_purchase)
-    return db_purchase
+    await db.flush()
+    await db.refresh(db_purchase)
+    body = PurchaseResponse.model_validate(db_purchase).model_dump_json()
+    store_response(db, current_user.id, idempotency_key, fingerprint, body)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request with the same key won; undo ours and answer with its result
+        await db.rollback()
+        stored = await get_stored_response(db, current_user.id, idempotency_key, fingerprint)
+        if stored:
+            return stored
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is already in progress")
+    background_tasks.add_task(render_receipts_after_purchase, current_user.id, *receipt_snapshot(db_purchase, item_data, current_user))
+    return Response(content=body, media_type="application/json")
+
+@router.get("/my-items", response_model=List[MarketplaceItemResponse],
+            dependencies=[Depends(conditional_get_dependency("marketplace_items", user_dependency=get_current_user))])
+async def get_my_marketplace_items(response: Response, current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    items = (await db.execute(select(MarketplaceItem).filter(MarketplaceItem.user_id == current_user.id))).scalars().all()
+    return list_response(items, marketplace_item_serializer, response)
 
-@router.get("/my-items", response_model=List[MarketplaceItemResponse])
-async def get_my_marketplace_items(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    items = db.query(MarketplaceItem).filter(MarketplaceItem.user_id == current_user.id).all()
+async def get_receipt_item_data(db: AsyncSession, marketplace_item_id: int) -> dict:
+    if marketplace_item_id >= 1000:
+        # Static product
+        item_data = STATIC_CATALOG.get(marketplace_item_id)
+        if not item_data:
+            raise HTTPException(status_code=404, detail="Item not found")
+        return item_data
     
-    # Convert JSON strings to objects
-    for item in items:
-        item.images = json.loads(item.images or '[]')
-        item.specifications = json.loads(item.specifications or '{}')
-    return items
+    # Database item
+    db_item = (await db.execute(select(MarketplaceItem).filter(MarketplaceItem.id == marketplace_item_id))).scalars().first()
+    if not db_item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return {
+        'title': db_item.title,
+        'brand': db_item.brand,
+        'model': db_item.model,
+        'seller_name': db_item.seller_name,
+        'warranty_info': db_item.warranty_info
+    }
 
 @router.get("/receipt/{purchase_id}")
 async def download_receipt(
     purchase_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    receipt_format: str = Query("txt", alias="format", pattern="^(txt|pdf)$"),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    # Get purchase record
-    purchase = db.query(Purchase).filter(
-        Purchase.id == purchase_id,
-        Purchase.user_id == current_user.id
-    ).first()
-    
-    if not purchase:
-        raise HTTPException(status_code=404, detail="Purchase not found")
-    
-    # Get item data
-    if purchase.marketplace_item_id >= 1000:
-        # Static product
-        item_data = next((item for item in STATIC_PRODUCTS if item['id'] == purchase.marketplace_item_id), None)
-        if not item_data:
-            raise HTTPException(status_code=404, detail="Item not found")
-    else:
-        # Database item
-        db_item = db.query(MarketplaceItem).filter(MarketplaceItem.id == purchase.marketplace_item_id).first()
-        if not db_item:
-            raise HTTPException(status_code=404, detail="Item not found")
-        item_data = {
-            'title': db_item.title,
-            'brand': db_item.brand,
-            'model': db_item.model,
-            'seller_name': db_item.seller_name,
-            'warranty_info': db_item.warranty_info
-        }
+    if receipt_format not in receipt_formats():
+        raise HTTPException(status_code=404, detail="PDF receipts are not available")
     
-    # Generate simple text receipt
-    subtotal = purchase.purchase_price
-    tax = subtotal * 0.08
-    total = subtotal + tax
-    
-    receipt_text = f"""
-===============================================
-            E-CYCLE MARKETPLACE
-               Purchase Receipt
-===============================================
-
-Order ID: ECY{purchase.id:06d}
-Date: {purchase.created_at.strftime('%B %d, %Y at %I:%M %p')}
-Customer: {current_user.full_name or current_user.username}
-Email: {current_user.email}
-Phone: {purchase.phone_number}
-
------------------------------------------------
-                ITEM DETAILS
------------------------------------------------
-Product: {item_data['title']}
-Brand: {item_data['brand']}
-Model: {item_data['model']}
-Seller: {item_data['seller_name']}
-Warranty: {item_data['warranty_info']}
-
------------------------------------------------
-              PAYMENT SUMMARY
------------------------------------------------
-Item Price:        ${subtotal:.2f}
-Tax (8%):          ${tax:.2f}
-Shipping:          FREE
-                   --------
-Total Paid:        ${total:.2f}
-
------------------------------------------------
-             SHIPPING ADDRESS
------------------------------------------------
-{purchase.shipping_address}
-
-===============================================
-        Thank you for your purchase!
-    For support, contact: support@ecycle.com
-===============================================
-"""
-    
-    # Update receipt generated flag
-    purchase.receipt_generated = True
-    db.commit()
+    # Receipts are rendered after purchase; this is a file lookup, not a query
+    receipt = await load_receipt(current_user.id, purchase_id, receipt_format)
+    if receipt is None:
+        # Still queued, or bought before receipts were stored: render it now
+        purchase = (await db.execute(select(Purchase).filter(
+            Purchase.id == purchase_id,
+            Purchase.user_id == current_user.id
+        ))).scalars().first()
+        
+        if not purchase:
+            raise HTTPException(status_code=404, detail="Purchase not found")
+        
+        item_data = await get_receipt_item_data(db, purchase.marketplace_item_id)
+        receipt = await render_receipt_async(current_user.id, receipt_format, *receipt_snapshot(purchase, item_data, current_user))
     
-    # Return text receipt
-    filename = f"ECycle_Receipt_{purchase.id:06d}.txt"
-    return Response(
-        content=receipt_text.encode('utf-8'),
-        media_type="text/plain",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
\ No newline at end of file
+    headers = {
+        "ETag": receipt.etag,
+        # Receipts never change once rendered
+        "Cache-Control": "private, max-age=31536000, immutable",
+    }
+    if etag_matches(request.headers.get("if-none-match", ""), receipt.etag):
+        return Response(status_code=304, headers=headers)
+    headers["Content-Disposition"] = f"attachment; filename={receipt.filename}"
+    return Response(content=receipt.content, media_type=receipt.media_type, headers=headers)
@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, Query, Response
+from pydantic import BaseModel
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db, Classification, Disposal, Donation, MarketplaceItem, Purchase
+from app.core.dependencies import get_current_user_dependency, conditional_get_dependency
+from app.core.responses import FAST_JSON_RESPONSES, SchemaSerializer, json_response
+from app.schemas.classify import ClassificationResponse
+from app.schemas.user import Principal
+from app.api.classify import classification_serializer
+from app.api.disposal import DisposalResponse, disposal_serializer
+from app.api.donate import DonationResponse, donation_serializer
+from app.api.marketplace import MarketplaceItemResponse, PurchaseResponse, marketplace_item_serializer
+from typing import Dict, Generic, List, TypeVar
+
+router = APIRouter()
+
+get_current_user = get_current_user_dependency("Please login to access your dashboard")
+
+DEFAULT_DASHBOARD_SECTION_LIMIT = 20
+MAX_DASHBOARD_SECTION_LIMIT = 100
+
+purchase_serializer = SchemaSerializer(PurchaseResponse)
+
+# Section name -> (model, serializer); section names are also the version-counter tables
+DASHBOARD_SECTIONS = {
+    "classifications": (Classification, classification_serializer),
+    "disposals": (Disposal, disposal_serializer),
+    "donations": (Donation, donation_serializer),
+    "marketplace_items": (MarketplaceItem, marketplace_item_serializer),
+    "purchases": (Purchase, purchase_serializer),
+}
+
+SectionItem = TypeVar("SectionItem")
+
+class DashboardSection(BaseModel, Generic[SectionItem]):
+    items: List[SectionItem]
+    count: int
+
+class DashboardResponse(BaseModel):
+    classifications: DashboardSection[ClassificationResponse]
+    disposals: DashboardSection[DisposalResponse]
+    donations: DashboardSection[DonationResponse]
+    marketplace_items: DashboardSection[MarketplaceItemResponse]
+    purchases: DashboardSection[PurchaseResponse]
+    # Names of classifications referenced by disposals/donations but outside the classifications section
+    classification_names: Dict[int, str]
+
+def section_counts_query(user_id: int):
+    """All section counts as one row, one scalar subquery per section."""
+    return select(*(
+        select(func.count()).select_from(model).filter(model.user_id == user_id).scalar_subquery().label(name)
+        for name, (model, _) in DASHBOARD_SECTIONS.items()
+    ))
+
+@router.get("/dashboard", response_model=DashboardResponse,
+            dependencies=[Depends(conditional_get_dependency(*DASHBOARD_SECTIONS, user_dependency=get_current_user))])
+async def get_dashboard(
+    response: Response,
+    limit: int = Query(DEFAULT_DASHBOARD_SECTION_LIMIT, ge=1, le=MAX_DASHBOARD_SECTION_LIMIT, description="Newest rows returned per section"),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    counts = (await db.execute(section_counts_query(current_user.id))).one()._mapping
+
+    dashboard = {}
+    for name, (model, serializer) in DASHBOARD_SECTIONS.items():
+        rows = []
+        if counts[name]:
+            rows = (await db.execute(
+                select(model)
+                .filter(model.user_id == current_user.id)
+                .order_by(model.created_at.desc(), model.id.desc())
+                .limit(limit)
+            )).scalars().all()
+        dashboard[name] = {"items": [serializer.to_dict(row) for row in rows], "count": counts[name]}
+
+    listed = {item["id"] for item in dashboard["classifications"]["items"]}
+    referenced = {
+        item["classification_id"]
+        for section in ("disposals", "donations")
+        for item in dashboard[section]["items"]
+    } - listed
+    classification_names = {}
+    if referenced:
+        classification_names = dict((await db.execute(
+            select(Classification.id, Classification.item_name).filter(
+                Classification.id.in_(referenced),
+                Classification.user_id == current_user.id
+            )
+        )).all())
+    dashboard["classification_names"] = classification_names
+
+    if not FAST_JSON_RESPONSES:
+        return dashboard
+    return json_response(dashboard, response)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Header
 from sqlalchemy.orm import Session
 from app.core.database import get_db, User
+from app.core.dependencies import conditional_get_dependency
 from app.core.security import verify_token
 from pydantic import BaseModel
 from typing import List, Optional
@@ -9,7 +10,7 @@ router = APIRouter()
 
 # Repair request functionality removed - focusing on repair shop directory
 
-@router.get("/shops")
+@router.get("/shops", dependencies=[Depends(conditional_get_dependency())])
 async def get_repair_shops(repair_type: str):
     shops = {
         "phones": [
@@ -105,7 +106,7 @@ async def get_repair_shops(repair_type: str):
     }
     return shops.get(repair_type, [])
 
-@router.get("/faq")
+@router.get("/faq", dependencies=[Depends(conditional_get_dependency())])
 async def get_repair_faq():
     faq = [
         {
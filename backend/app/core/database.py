@@ -1,12 +1,98 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Text, Float
+from sqlalchemy import create_engine, event, func, case, cast, literal_column, Index, UniqueConstraint, Column, Integer, BigInteger, String, Date, DateTime, Boolean, Text, Float, JSON
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from datetime import datetime, timezone
+from typing import Optional
+from dotenv import load_dotenv
+import os
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./ecycle.db"
+load_dotenv()
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ecycle.db")
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+
+# SQLite performance profile, applied on every new connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-64000"))  # negative value is in KiB
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # milliseconds
+SQLITE_TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+
+SYNC_DRIVERS = {"sqlite": "sqlite", "postgresql": "postgresql+psycopg2"}
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def get_database_url(url: Optional[str] = None, async_driver: bool = False) -> URL:
+    url = url or SQLALCHEMY_DATABASE_URL
+    # Hosting providers hand out "postgres://" URLs which SQLAlchemy does not accept
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    db_url = make_url(url)
+    backend = db_url.get_backend_name()
+    drivers = ASYNC_DRIVERS if async_driver else SYNC_DRIVERS
+    # Only swap the driver when the URL uses one of our defaults, so explicit choices are kept
+    if backend in drivers and db_url.drivername in (backend, SYNC_DRIVERS[backend], ASYNC_DRIVERS[backend]):
+        db_url = db_url.set(drivername=drivers[backend])
+    return db_url
+
+def is_sqlite(db_url: URL) -> bool:
+    return db_url.get_backend_name() == "sqlite"
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    cursor.execute(f"PRAGMA temp_store={SQLITE_TEMP_STORE}")
+    cursor.close()
+
+def create_db_engine(url: Optional[str] = None, async_driver: bool = False):
+    db_url = get_database_url(url, async_driver)
+    engine_kwargs = {"echo": DB_ECHO}
+    in_memory = is_sqlite(db_url) and db_url.database in (None, "", ":memory:")
+    if not in_memory:
+        engine_kwargs.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    if is_sqlite(db_url):
+        if not async_driver:
+            engine_kwargs["connect_args"] = {"check_same_thread": False}
+        elif not in_memory:
+            # aiosqlite defaults to NullPool, which would reopen the file and rerun the pragmas per request
+            engine_kwargs["poolclass"] = AsyncAdaptedQueuePool
+    else:
+        engine_kwargs["pool_pre_ping"] = True
+
+    if async_driver:
+        db_engine = create_async_engine(db_url, **engine_kwargs)
+        if is_sqlite(db_url):
+            event.listen(db_engine.sync_engine, "connect", set_sqlite_pragmas)
+    else:
+        db_engine = create_engine(db_url, **engine_kwargs)
+        if is_sqlite(db_url):
+            event.listen(db_engine, "connect", set_sqlite_pragmas)
+    return db_engine
+
+# Sync engine is kept for startup checks, table creation and scripts;
+# request handlers use the async engine so queries never block the event loop.
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = create_db_engine(async_driver=True)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 def get_utc_now():
@@ -25,6 +111,10 @@ class User(Base):
     is_admin = Column(Boolean, default=False)
     created_at = Column(DateTime, default=get_utc_now)
 
+    __table_args__ = (
+        Index("ix_users_is_admin", "is_admin"),
+    )
+
 class Classification(Base):
     __tablename__ = "classifications"
     
@@ -36,6 +126,12 @@ class Classification(Base):
     image_path = Column(String)
     category = Column(String)
     created_at = Column(DateTime, default=get_utc_now)
+    # Thumbnail/medium URLs of image_path once app.services.images has generated them
+    image_derivatives = Column(JSON, default=dict)
+
+    __table_args__ = (
+        Index("ix_classifications_user_id_created_at", "user_id", "created_at"),
+    )
 
 class Disposal(Base):
     __tablename__ = "disposals"
@@ -50,6 +146,15 @@ class Disposal(Base):
     selected_vendor = Column(String)
     status = Column(String, default="pending")
     created_at = Column(DateTime, default=get_utc_now)
+    # Set when a pickup slot was booked for this disposal
+    vendor_id = Column(Integer)
+    pickup_area = Column(String)
+    pickup_slot_id = Column(Integer)
+
+    __table_args__ = (
+        Index("ix_disposals_user_id_created_at", "user_id", "created_at"),
+        Index("ix_disposals_pickup_slot_id", "pickup_slot_id"),
+    )
 
 class Donation(Base):
     __tablename__ = "donations"
@@ -62,6 +167,10 @@ class Donation(Base):
     status = Column(String, default="available")
     created_at = Column(DateTime, default=get_utc_now)
 
+    __table_args__ = (
+        Index("ix_donations_user_id_created_at", "user_id", "created_at"),
+    )
+
 class ProductCategory(Base):
     __tablename__ = "product_categories"
     
@@ -83,14 +192,65 @@ class MarketplaceItem(Base):
     price = Column(Float)
     original_price = Column(Float)
     category_id = Column(Integer)
-    images = Column(Text)
-    specifications = Column(Text)
+    images = Column(JSON, default=list)
+    specifications = Column(JSON, default=dict)
     warranty_info = Column(String)
     seller_name = Column(String)
     seller_rating = Column(Float, default=0.0)
     is_selling = Column(Boolean, default=True)
     status = Column(String, default="available")
     created_at = Column(DateTime, default=get_utc_now)
+    # Derivative URLs for each entry of images, {} for external URLs
+    image_derivatives = Column(JSON, default=list)
+
+    __table_args__ = (
+        Index("ix_marketplace_items_listing", "status", "is_selling", "category_id", "price"),
+        Index("ix_marketplace_items_status_price", "status", "price"),
+        Index("ix_marketplace_items_status_created_at", "status", "created_at"),
+        Index("ix_marketplace_items_category_id", "category_id"),
+        Index("ix_marketplace_items_user_id_created_at", "user_id", "created_at"),
+    )
+
+# Discount ratio used for "best deal" ordering. Literal zeros keep the SQL rendered in
+# queries identical to the index expression so SQLite can use the index.
+marketplace_discount = func.coalesce(
+    (MarketplaceItem.original_price - MarketplaceItem.price) / func.nullif(MarketplaceItem.original_price, literal_column("0")),
+    literal_column("0"),
+)
+Index("ix_marketplace_items_status_discount", MarketplaceItem.status, marketplace_discount)
+
+# Specification keys that get an expression index for numeric filtering (e.g. RAM>=8GB)
+INDEXED_SPEC_KEYS = ("RAM", "Storage")
+
+def spec_value(key: str):
+    """Text value of a specification key. The key must already be validated; it is rendered inline."""
+    if is_sqlite(get_database_url()):
+        return func.json_extract(MarketplaceItem.specifications, literal_column(f"'$.\"{key}\"'"))
+    return MarketplaceItem.specifications.op("->>")(literal_column(f"'{key}'"))
+
+def spec_number(key: str):
+    """
+    Leading number of a specification value with storage units normalised to GB
+    ("8GB" -> 8, "1TB SSD" -> 1024), or NULL when the value does not start with a digit.
+    Constants are inline literals so queries render exactly like the index expressions.
+    """
+    value = spec_value(key)
+    unit = case(
+        (func.upper(value).like(literal_column("'%TB%'")), literal_column("1024.0")),
+        (func.upper(value).like(literal_column("'%MB%'")), literal_column("(1.0 / 1024)")),
+        else_=literal_column("1.0"),
+    )
+    if is_sqlite(get_database_url()):
+        # SQLite casts the numeric prefix of a string ("512GB SSD" -> 512)
+        number = cast(value, Float)
+        starts_with_digit = value.op("GLOB")(literal_column("'[0-9]*'"))
+    else:
+        number = cast(func.substring(value, literal_column("'^[0-9]+(\\.[0-9]+)?'")), Float)
+        starts_with_digit = value.op("~")(literal_column("'^[0-9]'"))
+    return case((starts_with_digit, number * unit))
+
+for spec_key in INDEXED_SPEC_KEYS:
+    Index(f"ix_marketplace_items_spec_{spec_key.lower()}", MarketplaceItem.status, spec_number(spec_key))
 
 class Purchase(Base):
     __tablename__ = "purchases"
@@ -106,6 +266,103 @@ class Purchase(Base):
     receipt_generated = Column(Boolean, default=False)
     created_at = Column(DateTime, default=get_utc_now)
 
+    __table_args__ = (
+        Index("ix_purchases_user_id_created_at", "user_id", "created_at"),
+        Index("ix_purchases_marketplace_item_id", "marketplace_item_id"),
+    )
+
+class IdempotencyKey(Base):
+    """Stored result of a request sent with an Idempotency-Key header, replayed on retries."""
+    __tablename__ = "idempotency_keys"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=get_utc_now)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_id_key"),
+    )
+
+class StatCounter(Base):
+    """Running count (and sum, e.g. GMV) per metric and key, kept up to date by app.services.stats."""
+    __tablename__ = "stat_counters"
+    
+    metric = Column(String(64), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
+
+class StatDelta(Base):
+    """Change to a stat counter recorded by a write; app.services.stats folds these into stat_counters."""
+    __tablename__ = "stat_deltas"
+
+    id = Column(Integer, primary_key=True)
+    metric = Column(String(64), nullable=False)
+    key = Column(String(255), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
+
+class Vendor(Base):
+    """Disposal/recycling vendor; looked up by distance through app.services.vendors."""
+    __tablename__ = "vendors"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    location = Column(String)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    # Item types the vendor takes, e.g. ["phones", "batteries"]
+    accepts = Column(JSON, nullable=False, default=list)
+    rating = Column(Float, default=0.0)
+    pickup = Column(Boolean, default=False)
+    # Pickups the vendor can do per day
+    daily_capacity = Column(Integer, nullable=False, default=0)
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=get_utc_now)
+    updated_at = Column(DateTime, default=get_utc_now, onupdate=get_utc_now)
+
+class PickupSlot(Base):
+    """One vendor collecting in one area on one day, booked through app.services.pickups."""
+    __tablename__ = "pickup_slots"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    vendor_id = Column(Integer, nullable=False)
+    area = Column(String, nullable=False)
+    day = Column(Date, nullable=False)
+    capacity = Column(Integer, nullable=False)
+    booked = Column(Integer, nullable=False, default=0)
+    # Set once the day's manifest has been built; closed slots take no more bookings
+    closed_at = Column(DateTime)
+
+    __table_args__ = (
+        UniqueConstraint("vendor_id", "area", "day", name="uq_pickup_slots_vendor_area_day"),
+        Index("ix_pickup_slots_day", "day"),
+    )
+
+class ImageHash(Base):
+    """64-bit perceptual hash of an uploaded image, split into four 16-bit chunks for near-duplicate lookups."""
+    __tablename__ = "image_hashes"
+    
+    path = Column(String, primary_key=True)
+    # Stored signed, since SQLite/Postgres integers are signed 64-bit
+    phash = Column(BigInteger, nullable=False)
+    chunk0 = Column(Integer, nullable=False)
+    chunk1 = Column(Integer, nullable=False)
+    chunk2 = Column(Integer, nullable=False)
+    chunk3 = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=get_utc_now)
+
+    __table_args__ = (
+        Index("ix_image_hashes_chunk0", "chunk0"),
+        Index("ix_image_hashes_chunk1", "chunk1"),
+        Index("ix_image_hashes_chunk2", "chunk2"),
+        Index("ix_image_hashes_chunk3", "chunk3"),
+    )
+
 class RepairRequest(Base):
     __tablename__ = "repair_requests"
     
@@ -118,6 +375,16 @@ class RepairRequest(Base):
     status = Column(String, default="pending")
     created_at = Column(DateTime, default=get_utc_now)
 
+def insert_ignore_statement(dialect_name: str, table, values: dict, index_elements):
+    """INSERT that leaves an existing row with the same key alone (plain INSERT on other databases)."""
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return table.insert().values(**values)
+    return insert(table).values(**values).on_conflict_do_nothing(index_elements=index_elements)
+
 def create_tables():
     try:
         Base.metadata.create_all(bind=engine)
@@ -125,11 +392,8 @@ def create_tables():
         print(f"Error creating tables: {e}")
         raise
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-__all__ = ['engine', 'SessionLocal', 'Base', 'User', 'Classification', 'Disposal', 'Donation', 'ProductCategory', 'MarketplaceItem', 'Purchase', 'RepairRequest', 'create_tables', 'get_db']
\ No newline at end of file
+__all__ = ['engine', 'SessionLocal', 'async_engine', 'AsyncSessionLocal', 'create_db_engine', 'get_database_url', 'Base', 'User', 'Classification', 'Disposal', 'Donation', 'ProductCategory', 'MarketplaceItem', 'marketplace_discount', 'INDEXED_SPEC_KEYS', 'spec_value', 'spec_number', 'Purchase', 'IdempotencyKey', 'StatCounter', 'StatDelta', 'Vendor', 'PickupSlot', 'ImageHash', 'RepairRequest', 'insert_ignore_statement', 'create_tables', 'get_db']
\ No newline at end of file
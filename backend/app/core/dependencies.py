@@ -0,0 +1,171 @@
+"""
+Shared authentication dependencies.
+
+Access tokens carry the user id ("uid") and admin flag ("adm") next to the
+email in "sub". Decoded tokens are cached as Principal snapshots in a
+bounded LRU+TTL cache, so repeated requests with the same token skip both
+the JWT decode and the user lookup. Entries for a user are dropped whenever
+that user row is updated or deleted through the ORM; the TTL bounds
+staleness for changes made by other processes.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Optional
+import hashlib
+import os
+
+from fastapi import Depends, Header, HTTPException, Request, Response
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.database import get_db, User
+from app.core.security import decode_token
+from app.core.versions import BOOT_ID, CONDITIONAL_GET_ENABLED, table_versions
+from app.schemas.user import Principal
+
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+
+principal_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS)
+
+def token_claims(user) -> dict:
+    return {"sub": user.email, "uid": user.id, "adm": bool(user.is_admin)}
+
+def principal_from_user(user: User) -> Principal:
+    return Principal(
+        id=user.id,
+        email=user.email,
+        username=user.username,
+        full_name=user.full_name,
+        phone=user.phone,
+        address=user.address,
+        is_admin=bool(user.is_admin),
+        created_at=user.created_at,
+    )
+
+def invalidate_user(user_id: int):
+    principal_cache.delete_where(lambda token, principal: principal is not None and principal.id == user_id)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidate_changed_user(mapper, connection, target):
+    invalidate_user(target.id)
+
+def get_bearer_token(authorization: Optional[str], login_message: str) -> str:
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail=login_message)
+    return authorization.split(" ")[1]
+
+async def load_principal(token: str, db: AsyncSession) -> Optional[Principal]:
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    payload = decode_token(token)
+    user_id = payload.get("uid")
+    if user_id is not None:
+        user = (await db.execute(select(User).filter(User.id == user_id))).scalars().first()
+    else:
+        # Tokens issued before ids were embedded only carry the email
+        user = (await db.execute(select(User).filter(User.email == payload["sub"]))).scalars().first()
+    if not user or user.email != payload["sub"]:
+        return None
+
+    principal = principal_from_user(user)
+    expires_in = payload["exp"] - datetime.now(timezone.utc).timestamp() if "exp" in payload else None
+    principal_cache.set(token, principal, expires_in)
+    return principal
+
+def get_current_user_dependency(login_message: str = "Please login to access your account"):
+    async def get_current_user(
+        authorization: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_db)
+    ) -> Principal:
+        token = get_bearer_token(authorization, login_message)
+        principal = await load_principal(token, db)
+        if not principal:
+            raise HTTPException(status_code=404, detail="User not found")
+        return principal
+    return get_current_user
+
+def get_admin_user_dependency(login_message: str = "Please login to access admin panel"):
+    async def get_admin_user(
+        authorization: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_db)
+    ) -> Principal:
+        token = get_bearer_token(authorization, login_message)
+        principal = await load_principal(token, db)
+        if not principal or not principal.is_admin:
+            raise HTTPException(status_code=403, detail="Admin access required")
+        return principal
+    return get_admin_user
+
+get_current_user = get_current_user_dependency()
+get_admin_user = get_admin_user_dependency()
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison, as required for If-None-Match
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+def not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return since.tzinfo is not None and last_modified.replace(microsecond=0) <= since
+
+def check_conditional_get(request: Request, response: Response, tables, user_id: Optional[int] = None,
+                          period_start: Optional[datetime] = None):
+    """
+    Set ETag/Last-Modified for the current versions of tables (scoped to user_id
+    if given) and raise 304 when the client's copy is still current. period_start
+    is when a response that also depends on the clock (e.g. today's date) last
+    changed without a write.
+    """
+    if not CONDITIONAL_GET_ENABLED:
+        return
+    versions, last_modified = table_versions.snapshot(tables, user_id)
+    if period_start is not None:
+        last_modified = max(last_modified, period_start)
+    key = f"{request.url.path}?{request.url.query}|{user_id}|{versions}|{period_start}"
+    etag = f'W/"{BOOT_ID}-{hashlib.sha1(key.encode()).hexdigest()[:16]}"'
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache" if user_id is not None else "no-cache"}
+    if user_id is not None:
+        headers["Vary"] = "Authorization"
+    # Last-Modified has one-second resolution: only send it once the current second is over,
+    # otherwise a second write within the same second would be hidden behind a 304
+    if (datetime.now(timezone.utc) - last_modified).total_seconds() >= 1:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        not_modified = etag_matches(if_none_match, etag)
+    else:
+        not_modified = if_modified_since is not None and not_modified_since(if_modified_since, last_modified)
+    if not_modified:
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+def conditional_get_dependency(*tables: str, user_dependency=None, period_start: Optional[Callable[[], datetime]] = None):
+    """
+    Route dependency answering If-None-Match / If-Modified-Since from table version
+    counters. With user_dependency, versions are tracked per authenticated user.
+    period_start returns the start of the current period (e.g. day) for responses
+    that change when it rolls over.
+    """
+    if user_dependency is None:
+        async def conditional_get(request: Request, response: Response):
+            check_conditional_get(request, response, tables, period_start=period_start() if period_start else None)
+        return conditional_get
+
+    async def conditional_get_for_user(
+        request: Request,
+        response: Response,
+        current_user: Principal = Depends(user_dependency)
+    ):
+        check_conditional_get(request, response, tables, current_user.id, period_start() if period_start else None)
+    return conditional_get_for_user
@@ -0,0 +1,382 @@
+"""
+Versioned schema migrations.
+
+create_tables() only creates missing tables, so changes to existing tables
+(new indexes, columns, triggers) are shipped here and applied in order to
+live databases. Each migration runs in its own transaction and is recorded
+in the schema_migrations table.
+
+Migrations spell out their own DDL and data instead of reading the models,
+so a migration does the same thing no matter how the models change after
+it was written; never edit one that has shipped, add a new one. Tables
+introduced after the first release are created by create_all() at their
+current definition before migrations run, so every statement must also be
+a no-op when its object already exists (CREATE INDEX IF NOT EXISTS,
+add_column).
+
+Usage:
+    python -m app.core.migrations upgrade [--to VERSION]
+    python -m app.core.migrations status
+"""
+import argparse
+import os
+from datetime import datetime, timezone
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import JSON, Boolean, Column, DateTime, Float, Integer, MetaData, String, Table, bindparam, inspect, select, text, update
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.database import engine as default_engine, Base
+from app.services.uploads import UPLOAD_DIR, stored_upload_path
+
+RUN_MIGRATIONS_ON_STARTUP = os.getenv("RUN_MIGRATIONS_ON_STARTUP", "true").lower() == "true"
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+def create_index(conn: Connection, name: str, table_name: str, columns: str):
+    """Create an index from its literal column/expression list, unless it already exists."""
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table_name} ({columns})"))
+
+def add_column(conn: Connection, table_name: str, column_name: str, column_type: str):
+    """Add a nullable column, unless the table already has it."""
+    existing = {column["name"] for column in inspect(conn).get_columns(table_name)}
+    if column_name not in existing:
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
+
+def analyze(conn: Connection):
+    if conn.dialect.name == "sqlite":
+        # Refresh planner statistics so new indexes are picked up immediately
+        conn.execute(text("ANALYZE"))
+
+def migration_0001_hot_path_indexes(conn: Connection):
+    create_index(conn, "ix_users_is_admin", "users", "is_admin")
+    create_index(conn, "ix_classifications_user_id_created_at", "classifications", "user_id, created_at")
+    create_index(conn, "ix_disposals_user_id_created_at", "disposals", "user_id, created_at")
+    create_index(conn, "ix_donations_user_id_created_at", "donations", "user_id, created_at")
+    create_index(conn, "ix_marketplace_items_listing", "marketplace_items", "status, is_selling, category_id, price")
+    create_index(conn, "ix_marketplace_items_status_price", "marketplace_items", "status, price")
+    create_index(conn, "ix_marketplace_items_category_id", "marketplace_items", "category_id")
+    create_index(conn, "ix_marketplace_items_user_id_created_at", "marketplace_items", "user_id, created_at")
+    create_index(conn, "ix_purchases_user_id_created_at", "purchases", "user_id, created_at")
+    create_index(conn, "ix_purchases_marketplace_item_id", "purchases", "marketplace_item_id")
+    analyze(conn)
+
+# Must match app.core.database.marketplace_discount as each dialect renders it
+DISCOUNT_SQL_0002 = {
+    "sqlite": "coalesce((original_price - price) / (nullif(original_price, 0) + 0.0), 0)",
+    "postgresql": "coalesce((original_price - price) / CAST(nullif(original_price, 0) AS NUMERIC), 0)",
+}
+
+def migration_0002_marketplace_sort_indexes(conn: Connection):
+    create_index(conn, "ix_marketplace_items_status_created_at", "marketplace_items", "status, created_at")
+    discount = DISCOUNT_SQL_0002.get(conn.dialect.name)
+    if discount:
+        create_index(conn, "ix_marketplace_items_status_discount", "marketplace_items", f"status, {discount}")
+    analyze(conn)
+
+SPECIFICATION_VALUES_SQL_0003 = (
+    "CASE WHEN json_valid({row}.specifications) "
+    "THEN (SELECT group_concat(value, ' ') FROM json_each({row}.specifications)) END"
+)
+
+SEARCH_SCHEMA_0003 = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS marketplace_search USING fts5(
+        title, brand, model, description, specifications,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS marketplace_search_trigram USING fts5(
+        title, brand, model,
+        tokenize = 'trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS marketplace_items_search_insert AFTER INSERT ON marketplace_items BEGIN
+        INSERT INTO marketplace_search(rowid, title, brand, model, description, specifications)
+        VALUES (NEW.id, NEW.title, NEW.brand, NEW.model, NEW.description, {SPECIFICATION_VALUES_SQL_0003.format(row="NEW")});
+        INSERT INTO marketplace_search_trigram(rowid, title, brand, model)
+        VALUES (NEW.id, NEW.title, NEW.brand, NEW.model);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS marketplace_items_search_delete AFTER DELETE ON marketplace_items BEGIN
+        DELETE FROM marketplace_search WHERE rowid = OLD.id;
+        DELETE FROM marketplace_search_trigram WHERE rowid = OLD.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS marketplace_items_search_update
+    AFTER UPDATE OF title, brand, model, description, specifications ON marketplace_items BEGIN
+        DELETE FROM marketplace_search WHERE rowid = OLD.id;
+        DELETE FROM marketplace_search_trigram WHERE rowid = OLD.id;
+        INSERT INTO marketplace_search(rowid, title, brand, model, description, specifications)
+        VALUES (NEW.id, NEW.title, NEW.brand, NEW.model, NEW.description, {SPECIFICATION_VALUES_SQL_0003.format(row="NEW")});
+        INSERT INTO marketplace_search_trigram(rowid, title, brand, model)
+        VALUES (NEW.id, NEW.title, NEW.brand, NEW.model);
+    END
+    """,
+]
+
+def migration_0003_marketplace_search(conn: Connection):
+    # FTS5 is SQLite only; other databases use the ILIKE fallback in app.services.search
+    if conn.dialect.name != "sqlite":
+        return
+    for statement in SEARCH_SCHEMA_0003:
+        conn.execute(text(statement))
+    conn.execute(text("DELETE FROM marketplace_search WHERE rowid > 0"))
+    conn.execute(text("DELETE FROM marketplace_search_trigram WHERE rowid > 0"))
+    conn.execute(text(f"""
+        INSERT INTO marketplace_search(rowid, title, brand, model, description, specifications)
+        SELECT id, title, brand, model, description, {SPECIFICATION_VALUES_SQL_0003.format(row="marketplace_items")}
+        FROM marketplace_items
+    """))
+    conn.execute(text("""
+        INSERT INTO marketplace_search_trigram(rowid, title, brand, model)
+        SELECT id, title, brand, model FROM marketplace_items
+    """))
+    # The static catalog rows (negative rowids) are indexed by refresh_static_search_index on startup
+
+def spec_number_sql_0004(dialect_name: str, key: str) -> Optional[str]:
+    """app.core.database.spec_number(key) as each dialect renders it."""
+    if dialect_name == "sqlite":
+        value = f"json_extract(specifications, '$.\"{key}\"')"
+        starts_with_digit = f"{value} GLOB '[0-9]*'"
+        number = f"CAST({value} AS FLOAT)"
+    elif dialect_name == "postgresql":
+        value = f"(specifications ->> '{key}')"
+        starts_with_digit = f"{value} ~ '^[0-9]'"
+        number = f"CAST(SUBSTRING({value} FROM '^[0-9]+(\\.[0-9]+)?') AS FLOAT)"
+    else:
+        return None
+    unit = (
+        f"CASE WHEN (upper({value}) LIKE '%TB%') THEN 1024.0 "
+        f"WHEN (upper({value}) LIKE '%MB%') THEN (1.0 / 1024) ELSE 1.0 END"
+    )
+    return f"CASE WHEN ({starts_with_digit}) THEN {number} * {unit} END"
+
+def migration_0004_marketplace_json_specs(conn: Connection):
+    # Columns are now JSON typed; rows written before had NULL for "no images/specifications"
+    conn.execute(text("UPDATE marketplace_items SET images = '[]' WHERE images IS NULL"))
+    conn.execute(text("UPDATE marketplace_items SET specifications = '{}' WHERE specifications IS NULL"))
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("ALTER TABLE marketplace_items ALTER COLUMN images TYPE JSON USING images::json"))
+        conn.execute(text("ALTER TABLE marketplace_items ALTER COLUMN specifications TYPE JSON USING specifications::json"))
+    for key in ("RAM", "Storage"):
+        expression = spec_number_sql_0004(conn.dialect.name, key)
+        if expression:
+            create_index(conn, f"ix_marketplace_items_spec_{key.lower()}", "marketplace_items", f"status, {expression}")
+    analyze(conn)
+
+# (metric, table, key expression, summed column) as app.services.stats defined them at this version
+STAT_DIMENSIONS_0005 = [
+    ("classifications_by_category", "classifications", "category", None),
+    ("classifications_by_condition", "classifications", "condition", None),
+    ("disposals_by_status", "disposals", "status", None),
+    ("disposals_by_vendor", "disposals", "selected_vendor", None),
+    ("donations_by_organization", "donations", "organization", None),
+    ("donations_by_status", "donations", "status", None),
+    ("marketplace_items_by_status", "marketplace_items", "status", None),
+    ("marketplace_items_by_category", "marketplace_items", "category_id", None),
+    ("purchases_by_day", "purchases", "date(created_at)", "purchase_price"),
+]
+
+def migration_0005_admin_stats(conn: Connection):
+    # stat_counters is created by create_all; fill it from the existing rows
+    conn.execute(text("DELETE FROM stat_counters"))
+    for metric, table_name, key, amount in STAT_DIMENSIONS_0005:
+        total = f"coalesce(sum({amount}), 0)" if amount else "0"
+        conn.execute(text(f"""
+            INSERT INTO stat_counters (metric, key, count, total)
+            SELECT :metric, coalesce(CAST({key} AS VARCHAR), '(none)'), count(*), {total}
+            FROM {table_name} GROUP BY {key}
+        """), {"metric": metric})
+
+vendors_0006 = Table(
+    "vendors",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("name", String),
+    Column("location", String),
+    Column("latitude", Float),
+    Column("longitude", Float),
+    Column("accepts", JSON),
+    Column("rating", Float),
+    Column("pickup", Boolean),
+    Column("daily_capacity", Integer),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+# The vendors that used to be hard-coded in get_vendors, placed around a demo city centre
+SEED_VENDORS_0006 = [
+    {"name": "EcoBattery Recycling", "location": "Downtown", "latitude": 12.9716, "longitude": 77.5946, "accepts": ["batteries"], "rating": 4.5, "pickup": True, "daily_capacity": 20},
+    {"name": "Green Power Solutions", "location": "Uptown", "latitude": 13.0358, "longitude": 77.5970, "accepts": ["batteries"], "rating": 4.2, "pickup": False, "daily_capacity": 0},
+    {"name": "TechRecycle Pro", "location": "Tech District", "latitude": 12.9352, "longitude": 77.6245, "accepts": ["computers"], "rating": 4.8, "pickup": True, "daily_capacity": 40},
+    {"name": "Digital Waste Management", "location": "Business Park", "latitude": 12.9698, "longitude": 77.7500, "accepts": ["computers"], "rating": 4.3, "pickup": True, "daily_capacity": 25},
+    {"name": "Home Appliance Recyclers", "location": "Industrial Zone", "latitude": 13.0285, "longitude": 77.5197, "accepts": ["appliances"], "rating": 4.1, "pickup": True, "daily_capacity": 10},
+    {"name": "White Goods Disposal", "location": "Suburb Area", "latitude": 12.9063, "longitude": 77.5857, "accepts": ["appliances"], "rating": 4.0, "pickup": False, "daily_capacity": 0},
+    {"name": "Mobile Recycle Hub", "location": "City Center", "latitude": 12.9760, "longitude": 77.6033, "accepts": ["phones"], "rating": 4.6, "pickup": True, "daily_capacity": 30},
+    {"name": "Phone Disposal Service", "location": "Mall District", "latitude": 12.9591, "longitude": 77.6974, "accepts": ["phones"], "rating": 4.4, "pickup": False, "daily_capacity": 0},
+]
+
+def migration_0006_vendor_registry(conn: Connection):
+    # vendors is created by create_all; start it with the vendors get_vendors used to hard-code
+    if conn.execute(select(vendors_0006.c.id).limit(1)).first() is not None:
+        return
+    now = datetime.now(timezone.utc)
+    conn.execute(vendors_0006.insert(), [
+        {**vendor, "is_active": True, "created_at": now, "updated_at": now} for vendor in SEED_VENDORS_0006
+    ])
+
+def migration_0007_pickup_slots(conn: Connection):
+    # pickup_slots is created by create_all; disposals gain the booked slot
+    add_column(conn, "disposals", "vendor_id", "INTEGER")
+    add_column(conn, "disposals", "pickup_area", "VARCHAR")
+    add_column(conn, "disposals", "pickup_slot_id", "INTEGER")
+    create_index(conn, "ix_disposals_pickup_slot_id", "disposals", "pickup_slot_id")
+    analyze(conn)
+
+classifications_0008 = Table(
+    "classifications",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("image_path", String),
+    Column("image_derivatives", JSON),
+)
+
+marketplace_items_0008 = Table(
+    "marketplace_items",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("images", JSON),
+    Column("image_derivatives", JSON),
+)
+
+DERIVATIVE_SIZES_0008 = ("thumbnail", "medium")
+DERIVATIVE_FORMATS_0008 = ("webp", "jpeg")
+
+def derivative_urls_0008(url: Optional[str]) -> dict:
+    """Derivative URLs of an upload if its thumbnails are on disk (the webp thumbnail is written last)."""
+    path = stored_upload_path(url)
+    stem = os.path.splitext(path)[0] if path else None
+    if not stem or not os.path.exists(f"{stem}_thumbnail.webp"):
+        return {}
+    return {
+        size: {
+            image_format: "/uploads/" + os.path.relpath(f"{stem}_{size}.{image_format}", UPLOAD_DIR).replace(os.sep, "/")
+            for image_format in DERIVATIVE_FORMATS_0008
+        }
+        for size in DERIVATIVE_SIZES_0008
+    }
+
+def migration_0008_image_derivative_columns(conn: Connection):
+    # Responses used to stat the derivative files on every request; record what is on disk now
+    add_column(conn, "classifications", "image_derivatives", "JSON")
+    add_column(conn, "marketplace_items", "image_derivatives", "JSON")
+    classifications = conn.execute(
+        select(classifications_0008.c.id, classifications_0008.c.image_path)
+        .where(classifications_0008.c.image_derivatives.is_(None))
+    ).all()
+    if classifications:
+        conn.execute(
+            update(classifications_0008).where(classifications_0008.c.id == bindparam("row_id"))
+            .values(image_derivatives=bindparam("derivatives")),
+            [{"row_id": row.id, "derivatives": derivative_urls_0008(row.image_path)} for row in classifications],
+        )
+    items = conn.execute(
+        select(marketplace_items_0008.c.id, marketplace_items_0008.c.images)
+        .where(marketplace_items_0008.c.image_derivatives.is_(None))
+    ).all()
+    if items:
+        conn.execute(
+            update(marketplace_items_0008).where(marketplace_items_0008.c.id == bindparam("row_id"))
+            .values(image_derivatives=bindparam("derivatives")),
+            [{"row_id": row.id, "derivatives": [derivative_urls_0008(image) for image in row.images or []]} for row in items],
+        )
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Hot-path indexes on foreign keys, status and price", migration_0001_hot_path_indexes),
+    Migration(2, "Marketplace indexes for newest and discount ordering", migration_0002_marketplace_sort_indexes),
+    Migration(3, "FTS5 marketplace search tables and sync triggers", migration_0003_marketplace_search),
+    Migration(4, "JSON marketplace columns and specification indexes", migration_0004_marketplace_json_specs),
+    Migration(5, "Backfill admin stat counters", migration_0005_admin_stats),
+    Migration(6, "Seed the vendor registry", migration_0006_vendor_registry),
+    Migration(7, "Pickup slot columns on disposals", migration_0007_pickup_slots),
+    Migration(8, "Record image derivative URLs on classifications and listings", migration_0008_image_derivative_columns),
+]
+
+def get_applied_versions(conn: Connection) -> List[int]:
+    migration_metadata.create_all(conn, checkfirst=True)
+    return [row[0] for row in conn.execute(select(schema_migrations.c.version).order_by(schema_migrations.c.version))]
+
+def get_current_version(bind: Optional[Engine] = None) -> int:
+    with (bind or default_engine).begin() as conn:
+        applied = get_applied_versions(conn)
+    return applied[-1] if applied else 0
+
+def run_migrations(bind: Optional[Engine] = None, target: Optional[int] = None) -> List[int]:
+    """Apply pending migrations up to target (or the latest) and return the versions applied."""
+    bind = bind or default_engine
+    # Tables must exist before migrations alter them
+    Base.metadata.create_all(bind=bind)
+
+    with bind.begin() as conn:
+        applied = set(get_applied_versions(conn))
+
+    newly_applied = []
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        if migration.version in applied:
+            continue
+        if target is not None and migration.version > target:
+            break
+        with bind.begin() as conn:
+            migration.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=migration.version,
+                description=migration.description,
+                applied_at=datetime.now(timezone.utc),
+            ))
+        print(f"[MIGRATION] Applied {migration.version:04d}: {migration.description}")
+        newly_applied.append(migration.version)
+    return newly_applied
+
+def print_status(bind: Optional[Engine] = None):
+    with (bind or default_engine).begin() as conn:
+        applied = set(get_applied_versions(conn))
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        state = "applied" if migration.version in applied else "pending"
+        print(f"{migration.version:04d}  {state:8s}  {migration.description}")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="E-Cycle database migrations")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = subparsers.add_parser("upgrade", help="Apply pending migrations")
+    upgrade_parser.add_argument("--to", type=int, default=None, help="Stop at this version")
+    subparsers.add_parser("status", help="List applied and pending migrations")
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        applied = run_migrations(target=args.to)
+        if not applied:
+            print("[MIGRATION] Database is up to date")
+    elif args.command == "status":
+        print_status()
+
+if __name__ == "__main__":
+    main()
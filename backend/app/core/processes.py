@@ -0,0 +1,17 @@
+"""
+Process pools for CPU-bound work (password hashing, images, receipts).
+
+Pools are created lazily from inside the running server, which already has
+threads (the event loop's thread pool, database drivers). Forking such a
+process copies whatever locks those threads hold into the child, where
+they are never released, so workers are started by a forkserver (a clean,
+single-threaded process) or spawned where forkserver is unavailable.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+def process_start_method() -> str:
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+def create_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(process_start_method()))
@@ -0,0 +1,48 @@
+"""
+Fast JSON path for list endpoints.
+
+Returning ORM rows or dicts from a route makes FastAPI validate every row
+against response_model, walk the result with jsonable_encoder and encode it
+with the stdlib json module. Most of that time is spent outside validation,
+so list endpoints can instead hand their rows to a SchemaSerializer: each
+row is validated once against the schema and dumped by pydantic's compiled
+serializer, and the list is encoded with orjson in a single call. This is
+opt-in: set FAST_JSON_RESPONSES=true to enable it.
+"""
+from typing import Iterable, Type
+import os
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() == "true"
+
+class SchemaSerializer:
+    """Row -> dict conversion for a response schema, validated like response_model."""
+
+    def __init__(self, schema: Type[BaseModel]):
+        self.schema = schema
+
+    def to_dict(self, row) -> dict:
+        # Instances of the schema (prebuilt static responses) are not validated again
+        return self.schema.model_validate(row).model_dump()
+
+    def dumps(self, rows: Iterable) -> bytes:
+        return orjson.dumps([self.to_dict(row) for row in rows], option=orjson.OPT_NON_STR_KEYS)
+
+def json_response(content, response: Response = None) -> Response:
+    """
+    Encode content with orjson and return the finished response, carrying over
+    headers already set on the injected response (ETag, pagination cursors).
+    """
+    fast_response = Response(content=orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS), media_type="application/json")
+    if response is not None:
+        fast_response.headers.raw.extend(response.headers.raw)
+    return fast_response
+
+def list_response(rows: Iterable, serializer: SchemaSerializer, response: Response = None):
+    """Encode rows with the serializer, see json_response."""
+    if not FAST_JSON_RESPONSES:
+        return [serializer.to_dict(row) for row in rows]
+    return json_response([serializer.to_dict(row) for row in rows], response)
@@ -1,11 +1,15 @@
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
 from fastapi import HTTPException, status
 import os
+import asyncio
 import hashlib
+import hmac
 import secrets
 from dotenv import load_dotenv
+from app.core.processes import create_process_pool
 
 load_dotenv()
 
@@ -14,18 +18,76 @@ ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 
+PASSWORD_HASH_ALGORITHM = os.getenv("PASSWORD_HASH_ALGORITHM", "sha256")
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "100000"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Hash jobs allowed in flight at once; further callers wait without queueing work in the pool
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 4)))
+
+# Hashes created before the cost became configurable are "salt$hash" with these parameters
+LEGACY_HASH_ALGORITHM = "sha256"
+LEGACY_HASH_ITERATIONS = 100000
+
+_hash_executor: Optional[ProcessPoolExecutor] = None
+_hash_slots: Optional[asyncio.Semaphore] = None
+
+def _pbkdf2(password: str, salt: str, algorithm: str, iterations: int) -> str:
+    return hashlib.pbkdf2_hmac(algorithm, password.encode(), salt.encode(), iterations).hex()
+
+def _parse_password_hash(hashed_password: str):
+    parts = hashed_password.split('$')
+    if len(parts) == 2:
+        salt, stored_hash = parts
+        return LEGACY_HASH_ALGORITHM, LEGACY_HASH_ITERATIONS, salt, stored_hash
+    scheme, iterations, salt, stored_hash = parts
+    if not scheme.startswith("pbkdf2_"):
+        raise ValueError("Unknown password hash scheme")
+    return scheme[len("pbkdf2_"):], int(iterations), salt, stored_hash
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     try:
-        salt, stored_hash = hashed_password.split('$')
-        password_hash = hashlib.pbkdf2_hmac('sha256', plain_password.encode(), salt.encode(), 100000)
-        return password_hash.hex() == stored_hash
+        algorithm, iterations, salt, stored_hash = _parse_password_hash(hashed_password)
+        return hmac.compare_digest(_pbkdf2(plain_password, salt, algorithm, iterations), stored_hash)
     except Exception:
         return False
 
 def get_password_hash(password: str) -> str:
     salt = secrets.token_hex(16)
-    password_hash = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000)
-    return f"{salt}${password_hash.hex()}"
+    password_hash = _pbkdf2(password, salt, PASSWORD_HASH_ALGORITHM, PASSWORD_HASH_ITERATIONS)
+    return f"pbkdf2_{PASSWORD_HASH_ALGORITHM}${PASSWORD_HASH_ITERATIONS}${salt}${password_hash}"
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    try:
+        algorithm, iterations, _, _ = _parse_password_hash(hashed_password)
+    except Exception:
+        return False
+    return hashed_password.count('$') != 3 or algorithm != PASSWORD_HASH_ALGORITHM or iterations != PASSWORD_HASH_ITERATIONS
+
+def get_hash_executor() -> ProcessPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = create_process_pool(PASSWORD_HASH_WORKERS)
+    return _hash_executor
+
+def shutdown_hash_executor():
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+async def _run_in_hash_pool(func, *args):
+    global _hash_slots
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(PASSWORD_HASH_MAX_PENDING)
+    async with _hash_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_hash_executor(), func, *args)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_hash_pool(get_password_hash, password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -44,20 +106,23 @@ def create_refresh_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str):
+def decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return email
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
-        )
\ No newline at end of file
+        )
+    if payload.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
+
+def verify_token(token: str):
+    email: str = decode_token(token)["sub"]
+    return email
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+In-process version counters per table, and per (table, user).
+
+Every ORM flush records which tables (and owning user_id, where the row
+has one) it touched; once the transaction commits those counters are
+bumped. Read endpoints combine the counters they depend on into an ETag
+and can answer conditional requests with 304 without querying anything.
+
+Counters live in this process only and start over on restart (BOOT_ID is
+part of every ETag, so old tags simply stop matching). Writes made by
+another process are not seen, so run a single worker or turn this off
+with CONDITIONAL_GET_ENABLED=false.
+"""
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Dict, Iterable, Optional, Tuple
+import os
+import uuid
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+CONDITIONAL_GET_ENABLED = os.getenv("CONDITIONAL_GET_ENABLED", "true").lower() == "true"
+
+BOOT_ID = uuid.uuid4().hex[:8]
+
+VersionKey = Tuple[str, Optional[int]]
+
+class VersionRegistry:
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self._versions: Dict[VersionKey, Tuple[int, datetime]] = {}
+        self._lock = Lock()
+
+    def bump(self, table: str, user_id: Optional[int] = None):
+        """Bump the table counter, and the user's counter for that table if user_id is given."""
+        now = datetime.now(timezone.utc)
+        keys = [(table, None)] if user_id is None else [(table, None), (table, user_id)]
+        with self._lock:
+            for key in keys:
+                version, _ = self._versions.get(key, (0, self.started_at))
+                self._versions[key] = (version + 1, now)
+
+    def get(self, table: str, user_id: Optional[int] = None) -> Tuple[int, datetime]:
+        with self._lock:
+            return self._versions.get((table, user_id), (0, self.started_at))
+
+    def snapshot(self, tables: Iterable[str], user_id: Optional[int] = None) -> Tuple[str, datetime]:
+        """A version string covering all tables, and when the newest of them last changed."""
+        parts = []
+        last_modified = self.started_at
+        for table in tables:
+            version, changed_at = self.get(table, user_id)
+            parts.append(f"{table}:{version}")
+            last_modified = max(last_modified, changed_at)
+        return ",".join(parts), last_modified
+
+table_versions = VersionRegistry()
+
+def _changed_keys(session: Session):
+    for obj in list(session.new) + list(session.deleted) + [obj for obj in session.dirty if session.is_modified(obj)]:
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            yield table, getattr(obj, "user_id", None)
+
+def mark_changed(session, table: str, user_id: Optional[int] = None):
+    """Record a change made with a bulk UPDATE/DELETE, which the flush hooks cannot see."""
+    session.info.setdefault("changed_versions", set()).add((table, user_id))
+
+@event.listens_for(Session, "after_flush")
+def record_changed_tables(session, flush_context):
+    session.info.setdefault("changed_versions", set()).update(_changed_keys(session))
+
+@event.listens_for(Session, "after_commit")
+def bump_changed_tables(session):
+    # Bumped only after commit, so a new version never describes uncommitted data
+    for table, user_id in session.info.pop("changed_versions", ()):
+        table_versions.bump(table, user_id)
+
+@event.listens_for(Session, "after_rollback")
+def discard_changed_tables(session):
+    session.info.pop("changed_versions", None)
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Optional
 
 class ClassificationCreate(BaseModel):
     item_name: str
@@ -7,6 +8,14 @@ class ClassificationCreate(BaseModel):
     condition: str
     category: str
 
+class SuggestionRequestItem(BaseModel):
+    item_name: str = Field(..., max_length=500)
+    description: str = Field("", max_length=5000)
+    condition: Optional[str] = None
+
+class SuggestionRequest(BaseModel):
+    items: List[SuggestionRequestItem] = Field(..., min_length=1, max_length=1000)
+
 class ClassificationResponse(BaseModel):
     id: int
     user_id: int
@@ -15,7 +24,8 @@ class ClassificationResponse(BaseModel):
     condition: str
     image_path: Optional[str] = None
     category: str
-    created_at: str
+    created_at: Optional[datetime] = None
+    image_derivatives: dict = {}
     
     class Config:
         from_attributes = True
\ No newline at end of file
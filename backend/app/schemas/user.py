@@ -27,6 +27,21 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class Principal(BaseModel):
+    """Read-only snapshot of the authenticated user, safe to cache across requests."""
+    id: int
+    email: str
+    username: str
+    full_name: Optional[str] = None
+    phone: Optional[str] = None
+    address: Optional[str] = None
+    is_admin: bool = False
+    created_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+        frozen = True
+
 class Token(BaseModel):
     access_token: str
     refresh_token: str
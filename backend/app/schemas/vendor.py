@@ -0,0 +1,48 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+
+class VendorCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=255)
+    location: Optional[str] = None
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    accepts: List[str] = Field(..., min_length=1)
+    rating: float = Field(0.0, ge=0, le=5)
+    pickup: bool = False
+    daily_capacity: int = Field(0, ge=0)
+
+class VendorUpdate(BaseModel):
+    # Only fields that are sent are applied (exclude_unset)
+    name: Optional[str] = Field(None, min_length=1, max_length=255)
+    location: Optional[str] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+    accepts: Optional[List[str]] = Field(None, min_length=1)
+    rating: Optional[float] = Field(None, ge=0, le=5)
+    pickup: Optional[bool] = None
+    daily_capacity: Optional[int] = Field(None, ge=0)
+    is_active: Optional[bool] = None
+
+    @field_validator("name", "latitude", "longitude", "accepts", "rating", "pickup", "daily_capacity", "is_active", mode="before")
+    @classmethod
+    def not_null(cls, value):
+        # Runs only for fields that were sent; these columns can't be cleared
+        if value is None:
+            raise ValueError("may not be null")
+        return value
+
+class VendorResponse(BaseModel):
+    id: int
+    name: str
+    location: Optional[str] = None
+    latitude: float
+    longitude: float
+    accepts: List[str]
+    rating: float
+    pickup: bool
+    daily_capacity: int
+    is_active: bool = True
+    distance_km: Optional[float] = None
+    
+    class Config:
+        from_attributes = True
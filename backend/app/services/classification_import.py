@@ -0,0 +1,129 @@
+"""
+Bulk classification ingest from CSV or NDJSON inventories.
+
+The uploaded file is read line by line from its spooled copy, never loaded
+whole. Rows are validated against ClassificationCreate in chunks of
+IMPORT_CHUNK_SIZE (in a worker thread) and each chunk's valid rows are
+inserted with a single bulk INSERT and committed, so a 10k-row inventory is
+ten transactions instead of ten thousand. Invalid rows are skipped and
+reported with their line number; valid rows around them are still imported.
+"""
+from itertools import islice
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+import csv
+import io
+import os
+
+import orjson
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import Classification
+from app.core.versions import mark_changed
+from app.schemas.classify import ClassificationCreate
+from app.services.stats import adjust_stats_for_insert
+
+IMPORT_CHUNK_SIZE = int(os.getenv("CLASSIFY_IMPORT_CHUNK_SIZE", "1000"))
+IMPORT_MAX_ROWS = int(os.getenv("CLASSIFY_IMPORT_MAX_ROWS", "50000"))
+# Errors listed in the response; the failed count covers all of them
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+IMPORT_CONTENT_TYPES = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}
+REQUIRED_COLUMNS = tuple(ClassificationCreate.model_fields)
+
+class ImportedRow(NamedTuple):
+    line: int
+    classification: Optional[ClassificationCreate]
+    errors: Optional[List[dict]]
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension in IMPORT_EXTENSIONS:
+        return IMPORT_EXTENSIONS[extension]
+    return IMPORT_CONTENT_TYPES.get((content_type or "").split(";")[0].strip().lower())
+
+def iter_csv_rows(text_file) -> Iterator[Tuple[int, object]]:
+    reader = csv.DictReader(text_file)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"CSV header is missing columns: {', '.join(missing)}")
+    for row in reader:
+        # line_num is the last physical line of the record, which is what editors show
+        yield reader.line_num, row
+
+def iter_ndjson_rows(text_file) -> Iterator[Tuple[int, object]]:
+    for line_number, line in enumerate(text_file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield line_number, e
+
+def validate_row(line: int, data) -> ImportedRow:
+    if isinstance(data, orjson.JSONDecodeError):
+        return ImportedRow(line, None, [{"field": None, "message": f"Invalid JSON: {data}"}])
+    try:
+        return ImportedRow(line, ClassificationCreate.model_validate(data), None)
+    except ValidationError as e:
+        errors = [{"field": ".".join(str(part) for part in error["loc"]) or None, "message": error["msg"]} for error in e.errors()]
+        return ImportedRow(line, None, errors)
+
+def read_chunk(rows: Iterator[Tuple[int, object]], size: int) -> List[ImportedRow]:
+    try:
+        return [validate_row(line, data) for line, data in islice(rows, size)]
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=422, detail="File must be UTF-8 encoded")
+    except csv.Error as e:
+        raise HTTPException(status_code=422, detail=f"Malformed CSV: {e}")
+
+async def import_classifications(db: AsyncSession, user_id: int, file: UploadFile, import_format: str) -> dict:
+    text_file = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    rows = iter_csv_rows(text_file) if import_format == "csv" else iter_ndjson_rows(text_file)
+    imported = failed = total = 0
+    errors = []
+    truncated = False
+    try:
+        while True:
+            size = min(IMPORT_CHUNK_SIZE, IMPORT_MAX_ROWS - total)
+            if size <= 0:
+                truncated = bool(await run_in_threadpool(read_chunk, rows, 1))
+                break
+            chunk = await run_in_threadpool(read_chunk, rows, size)
+            if not chunk:
+                break
+            total += len(chunk)
+            valid = [row.classification for row in chunk if row.classification is not None]
+            for row in chunk:
+                if row.errors is not None:
+                    failed += 1
+                    if len(errors) < MAX_REPORTED_ERRORS:
+                        errors.append({"line": row.line, "errors": row.errors})
+            if valid:
+                # Bulk INSERT skips the per-object unit of work (and its flush hooks), so record stats/versions here
+                values = [{"user_id": user_id, **classification.model_dump()} for classification in valid]
+                await db.execute(insert(Classification), values)
+                await adjust_stats_for_insert(db, Classification, values)
+                mark_changed(db, "classifications", user_id)
+                await db.commit()
+                imported += len(valid)
+    except HTTPException as e:
+        if imported:
+            e.detail = f"{e.detail} ({imported} rows before it were already imported)"
+        raise
+    finally:
+        # Leave the spooled file open for UploadFile to close
+        text_file.detach()
+    return {
+        "imported": imported,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors),
+        "truncated": truncated,
+        "max_rows": IMPORT_MAX_ROWS,
+    }
@@ -0,0 +1,64 @@
+"""
+Idempotency-Key support for POST endpoints.
+
+The first request with a key stores its response in idempotency_keys in
+the same transaction as its side effects, so either both are committed or
+neither is. Retries with the same key get the stored response back
+instead of running again. A concurrent duplicate fails on the unique
+(user_id, key) constraint when it commits and then replays the winner's
+response. Keys expire after IDEMPOTENCY_KEY_TTL_HOURS.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import hashlib
+import json
+import os
+
+from fastapi import HTTPException, Response
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import IdempotencyKey
+
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+def request_fingerprint(data: dict) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+def is_expired(record: IdempotencyKey) -> bool:
+    created_at = record.created_at
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at < datetime.now(timezone.utc) - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+
+async def get_stored_response(db: AsyncSession, user_id: int, key: str, fingerprint: str) -> Optional[Response]:
+    """The response stored for this key, or None if the request has not been handled yet."""
+    record = (await db.execute(select(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key
+    ))).scalars().first()
+    if not record:
+        return None
+    if is_expired(record):
+        await db.execute(delete(IdempotencyKey).where(IdempotencyKey.id == record.id))
+        await db.commit()
+        return None
+    if record.request_hash != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    return Response(
+        content=record.response_body,
+        status_code=record.status_code,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+def store_response(db: AsyncSession, user_id: int, key: str, fingerprint: str, body: str, status_code: int = 200):
+    """Add the response to the current transaction; it is saved by the caller's commit."""
+    db.add(IdempotencyKey(
+        user_id=user_id,
+        key=key,
+        request_hash=fingerprint,
+        status_code=status_code,
+        response_body=body
+    ))
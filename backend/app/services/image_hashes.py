@@ -0,0 +1,172 @@
+"""
+Near-duplicate detection for uploaded images.
+
+Every upload gets a 64-bit difference hash (dHash): the image is shrunk to
+9x8 grayscale and each bit records whether a pixel is brighter than its
+right-hand neighbour, so re-encoded, resized or lightly edited copies of a
+photo hash within a few bits of each other.
+
+Hashes are stored in image_hashes together with their four 16-bit chunks,
+each indexed (multi-index hashing). Two hashes within distance d of each
+other must share at least one chunk within d // 4 bits, so a lookup only
+reads the rows whose chunks match one of those few variants, then checks
+the full Hamming distance. The table can be rebuilt from the files in
+UPLOAD_DIR:
+    python -m app.services.image_hashes rebuild
+"""
+from functools import lru_cache
+from itertools import combinations
+from typing import List, NamedTuple, Optional
+import argparse
+import asyncio
+import os
+import re
+
+from sqlalchemy import delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import engine as default_engine, Base, ImageHash, insert_ignore_statement
+from app.core.processes import create_process_pool
+from app.services.images import IMAGE_WORKERS, MAX_IMAGE_PIXELS, get_image_executor
+from app.services.uploads import UPLOAD_DIR
+
+HASH_CHUNKS = 4
+CHUNK_BITS = 16
+DUPLICATE_MAX_DISTANCE = int(os.getenv("IMAGE_DUPLICATE_MAX_DISTANCE", "7"))
+MAX_REPORTED_DUPLICATES = 10
+REBUILD_BATCH_SIZE = 500
+
+# Originals are stored as <sha256><ext>; derivatives and temp files are not indexed
+ORIGINAL_NAME_PATTERN = re.compile(r"^[0-9a-f]{64}(\.[a-z0-9]{1,10})?$")
+
+class NearDuplicate(NamedTuple):
+    path: str
+    distance: int
+
+def compute_dhash(image_path: str) -> int:
+    """64-bit difference hash of an image. Runs in the image process pool."""
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    with Image.open(image_path) as source:
+        image = ImageOps.exif_transpose(source)
+        pixels = image.convert("L").resize((9, 8), Image.LANCZOS).tobytes()
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            value = (value << 1) | (pixels[row * 9 + column] > pixels[row * 9 + column + 1])
+    return value
+
+def try_compute_dhash(image_path: str) -> Optional[int]:
+    try:
+        return compute_dhash(image_path)
+    except Exception as e:
+        print(f"Could not hash {image_path}: {e}")
+        return None
+
+def to_signed(value: int) -> int:
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def to_unsigned(value: int) -> int:
+    return value & ((1 << 64) - 1)
+
+def hash_chunks(value: int) -> List[int]:
+    mask = (1 << CHUNK_BITS) - 1
+    return [(value >> (CHUNK_BITS * i)) & mask for i in range(HASH_CHUNKS)]
+
+def hash_row(path: str, value: int) -> dict:
+    chunks = hash_chunks(value)
+    return {"path": path, "phash": to_signed(value), **{f"chunk{i}": chunk for i, chunk in enumerate(chunks)}}
+
+@lru_cache(maxsize=None)
+def flip_masks(radius: int) -> tuple:
+    """Every CHUNK_BITS-bit mask with at most radius bits set."""
+    return tuple(
+        sum(1 << bit for bit in bits)
+        for count in range(radius + 1)
+        for bits in combinations(range(CHUNK_BITS), count)
+    )
+
+def candidates_clause(value: int, max_distance: int):
+    masks = flip_masks(max_distance // HASH_CHUNKS)
+    return or_(*(
+        getattr(ImageHash, f"chunk{i}").in_([chunk ^ mask for mask in masks])
+        for i, chunk in enumerate(hash_chunks(value))
+    ))
+
+async def compute_dhash_async(image_path: str) -> Optional[int]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_image_executor(), try_compute_dhash, image_path)
+
+async def get_indexed_hash(db: AsyncSession, image_path: str) -> Optional[int]:
+    stored = (await db.execute(select(ImageHash.phash).filter(ImageHash.path == image_path))).scalar()
+    return None if stored is None else to_unsigned(stored)
+
+async def find_near_duplicates(
+    db: AsyncSession,
+    value: int,
+    exclude_path: Optional[str] = None,
+    max_distance: int = DUPLICATE_MAX_DISTANCE,
+    limit: int = MAX_REPORTED_DUPLICATES
+) -> List[NearDuplicate]:
+    rows = (await db.execute(select(ImageHash.path, ImageHash.phash).filter(candidates_clause(value, max_distance)))).all()
+    duplicates = []
+    for path, stored in rows:
+        distance = (to_unsigned(stored) ^ value).bit_count()
+        if distance <= max_distance and path != exclude_path:
+            duplicates.append(NearDuplicate(path, distance))
+    duplicates.sort(key=lambda duplicate: (duplicate.distance, duplicate.path))
+    return duplicates[:limit]
+
+async def hash_upload(db: AsyncSession, image_path: str) -> Optional[int]:
+    """Hash of an upload, computing and indexing it if it is new. None if it is not a readable image."""
+    value = await get_indexed_hash(db, image_path)
+    if value is None:
+        value = await compute_dhash_async(image_path)
+        if value is not None:
+            # Leaves the row alone if the same file was uploaded twice at once
+            table = ImageHash.__table__
+            await db.execute(insert_ignore_statement(db.bind.dialect.name, table, hash_row(image_path, value), [table.c.path]))
+    return value
+
+def iter_originals(upload_dir: str = UPLOAD_DIR):
+    for directory, subdirectories, files in os.walk(upload_dir):
+        subdirectories[:] = [name for name in subdirectories if name != "tmp"]
+        for name in files:
+            if ORIGINAL_NAME_PATTERN.match(name):
+                yield os.path.join(directory, name)
+
+def rebuild_index(bind=None) -> int:
+    """Replace image_hashes with hashes of every original in UPLOAD_DIR."""
+    bind = bind or default_engine
+    Base.metadata.create_all(bind=bind, tables=[ImageHash.__table__])
+    paths = list(iter_originals())
+    indexed = 0
+    with create_process_pool(IMAGE_WORKERS) as pool, bind.begin() as conn:
+        conn.execute(delete(ImageHash.__table__))
+        batch = []
+        for path, value in zip(paths, pool.map(try_compute_dhash, paths, chunksize=16)):
+            if value is None:
+                continue
+            batch.append(hash_row(path, value))
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                conn.execute(ImageHash.__table__.insert(), batch)
+                indexed += len(batch)
+                batch = []
+        if batch:
+            conn.execute(ImageHash.__table__.insert(), batch)
+            indexed += len(batch)
+    return indexed
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="E-Cycle image duplicate index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild", help=f"Re-hash every uploaded image in {UPLOAD_DIR}")
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild":
+        indexed = rebuild_index()
+        print(f"[IMAGES] Indexed {indexed} images")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Resized WebP/JPEG derivatives of uploaded images.
+
+After an upload is stored, generate_derivatives runs in a process pool (as
+a background task, so the upload response does not wait for it) and writes
+one file per size and format next to the original, e.g.
+uploads/aa/bb/<sha256>_thumbnail.webp. Images are rotated according to
+their EXIF orientation and re-encoded without EXIF metadata.
+
+Once they exist, their URLs are recorded in the image_derivatives column of
+the classifications using the image and of the listings showing it, so
+responses never have to look at the filesystem. Only content-addressed
+uploads (see stored_upload_path) are ever opened; other listing image URLs
+get no derivatives.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+import asyncio
+import os
+import tempfile
+
+from sqlalchemy import update
+
+from app.core.database import AsyncSessionLocal, Classification, MarketplaceItem
+from app.core.processes import create_process_pool
+from app.core.versions import mark_changed
+from app.services.uploads import UPLOAD_DIR, stored_upload_path
+
+# Longest edge in pixels; "medium" is for the product detail view
+DERIVATIVE_SIZES = {"thumbnail": 320, "medium": 960}
+DERIVATIVE_FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Uploads larger than this many pixels are not decoded (decompression bomb guard)
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(50_000_000)))
+
+# Written last, so its presence means every derivative of an image is in place
+READY_MARKER = ("thumbnail", "webp")
+
+_image_executor: Optional[ProcessPoolExecutor] = None
+
+def derivative_path(image_path: str, size: str, image_format: str) -> str:
+    return f"{os.path.splitext(image_path)[0]}_{size}.{image_format}"
+
+def upload_url(path: str) -> str:
+    return "/uploads/" + os.path.relpath(path, UPLOAD_DIR).replace(os.sep, "/")
+
+def derivative_urls(image_path: str) -> Dict[str, Dict[str, str]]:
+    """{"thumbnail": {"webp": url, "jpeg": url}, ...} for an image whose derivatives have been generated."""
+    return {
+        size: {image_format: upload_url(derivative_path(image_path, size, image_format)) for image_format in DERIVATIVE_FORMATS}
+        for size in DERIVATIVE_SIZES
+    }
+
+def ready_derivative_urls(image: Optional[str]) -> Dict[str, Dict[str, str]]:
+    """
+    derivative_urls of a stored upload (path or URL) once the files exist, else {}.
+    Stats the filesystem, so keep it off the event loop.
+    """
+    image_path = stored_upload_path(image)
+    if image_path is None or not os.path.exists(derivative_path(image_path, *READY_MARKER)):
+        return {}
+    return derivative_urls(image_path)
+
+def listing_image_derivatives(images: List[str]) -> List[Dict[str, Dict[str, str]]]:
+    """ready_derivative_urls for each image of a listing, {} for external URLs."""
+    return [ready_derivative_urls(image) for image in images]
+
+def generate_derivatives(image_path: str) -> bool:
+    """Write every size/format of image_path. Returns False if they already existed."""
+    from PIL import Image, ImageOps
+
+    if os.path.exists(derivative_path(image_path, *READY_MARKER)):
+        return False
+
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    with Image.open(image_path) as source:
+        image = ImageOps.exif_transpose(source)
+        image = image.convert("RGB")
+
+    directory = os.path.dirname(image_path)
+    written = []
+    try:
+        for size, max_edge in DERIVATIVE_SIZES.items():
+            resized = image.copy()
+            resized.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            for image_format, pil_format in DERIVATIVE_FORMATS.items():
+                fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+                with os.fdopen(fd, "wb") as buffer:
+                    # No exif= argument, so metadata from the original is dropped
+                    resized.save(buffer, pil_format, quality=IMAGE_QUALITY, optimize=True)
+                written.append((temp_path, derivative_path(image_path, size, image_format)))
+        written.sort(key=lambda paths: paths[1] == derivative_path(image_path, *READY_MARKER))
+        for temp_path, final_path in written:
+            os.replace(temp_path, final_path)
+    finally:
+        for temp_path, _ in written:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    return True
+
+def get_image_executor() -> ProcessPoolExecutor:
+    global _image_executor
+    if _image_executor is None:
+        _image_executor = create_process_pool(IMAGE_WORKERS)
+    return _image_executor
+
+def shutdown_image_executor():
+    global _image_executor
+    if _image_executor is not None:
+        _image_executor.shutdown(wait=False, cancel_futures=True)
+        _image_executor = None
+
+async def ensure_derivatives(image_path: str) -> Dict[str, Dict[str, str]]:
+    """Generate any missing derivatives in the pool and return their URLs, {} if the image can't be decoded."""
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(get_image_executor(), generate_derivatives, image_path)
+    except Exception as e:
+        print(f"Could not generate derivatives for {image_path}: {e}")
+        return {}
+    return derivative_urls(image_path)
+
+async def generate_listing_derivatives_async(item_id: int, images: List[str]):
+    """Background task: render missing derivatives of a listing's uploaded images and record them."""
+    derivatives = []
+    for image in images:
+        image_path = stored_upload_path(image)
+        derivatives.append(await ensure_derivatives(image_path) if image_path else {})
+    if not any(derivatives):
+        return
+    async with AsyncSessionLocal() as db:
+        user_id = (await db.execute(
+            update(MarketplaceItem)
+            .where(MarketplaceItem.id == item_id)
+            .values(image_derivatives=derivatives)
+            .returning(MarketplaceItem.user_id)
+        )).scalar()
+        if user_id is not None:
+            mark_changed(db, "marketplace_items", user_id)
+        await db.commit()
+
+async def generate_derivatives_async(image_path: str):
+    """Background task: failures are logged, the original upload stays usable either way."""
+    derivatives = await ensure_derivatives(image_path)
+    if not derivatives:
+        return
+    async with AsyncSessionLocal() as db:
+        user_ids = (await db.execute(
+            update(Classification)
+            .where(Classification.image_path == image_path)
+            .values(image_derivatives=derivatives)
+            .returning(Classification.user_id)
+        )).scalars().all()
+        for user_id in set(user_ids):
+            mark_changed(db, "classifications", user_id)
+        await db.commit()
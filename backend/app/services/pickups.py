@@ -0,0 +1,176 @@
+"""
+Capacity-aware pickup slots for disposals.
+
+A slot is one vendor collecting in one area on one day. Its row is created
+on the first booking with the vendor's daily_capacity, and a booking is a
+single conditional UPDATE (booked = booked + 1 WHERE booked < capacity),
+committed together with the disposal. The database serializes updates to
+the row, so concurrent bookings can never overbook: whoever finds the slot
+full gets no row back. Each booking touches one row, which keeps it cheap
+during collection drives.
+
+Once a day's bookings are done, build_manifests closes its slots and groups
+the confirmed pickups into one manifest per vendor and area:
+    python -m app.services.pickups manifests --date 2024-06-01
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from itertools import groupby
+from typing import List, Optional
+import argparse
+import asyncio
+import json
+
+from sqlalchemy import exists, select, update
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal, Classification, Disposal, PickupSlot, Vendor, insert_ignore_statement
+from app.core.versions import mark_changed
+
+MAX_BOOKING_DAYS_AHEAD = 60
+CONFIRMED_STATUS = "confirmed"
+
+def normalize_area(area: str) -> str:
+    return " ".join(area.split()).casefold()
+
+def parse_pickup_day(pickup_date: Optional[str]) -> Optional[date]:
+    """The day of a pickup_date as sent by the disposal form ("YYYY-MM-DD" or "YYYY-MM-DDTHH:MM")."""
+    try:
+        return date.fromisoformat((pickup_date or "")[:10])
+    except ValueError:
+        return None
+
+def bookable_days() -> tuple:
+    today = datetime.now(timezone.utc).date()
+    return today, today + timedelta(days=MAX_BOOKING_DAYS_AHEAD)
+
+def booking_day_started_at() -> datetime:
+    """Midnight UTC of the first bookable day, when slot listings last moved on by a day."""
+    return datetime.combine(bookable_days()[0], time.min, tzinfo=timezone.utc)
+
+async def reserve_slot(db: AsyncSession, vendor: Vendor, area: str, day: date) -> Optional[int]:
+    """Book one pickup in the vendor's slot for area and day; the slot id, or None if it is full or the day is closed."""
+    table = PickupSlot.__table__
+    closed_slot = aliased(PickupSlot)
+    await db.execute(insert_ignore_statement(
+        db.bind.dialect.name,
+        table,
+        {"vendor_id": vendor.id, "area": area, "day": day, "capacity": vendor.daily_capacity, "booked": 0},
+        [table.c.vendor_id, table.c.area, table.c.day],
+    ))
+    slot_id = (await db.execute(
+        update(PickupSlot)
+        .where(
+            PickupSlot.vendor_id == vendor.id,
+            PickupSlot.area == area,
+            PickupSlot.day == day,
+            PickupSlot.booked < PickupSlot.capacity,
+            PickupSlot.closed_at.is_(None),
+            # Once the day's manifests are built, new areas can't open a slot either
+            ~exists().where(closed_slot.vendor_id == vendor.id, closed_slot.day == day, closed_slot.closed_at.isnot(None))
+        )
+        .values(booked=PickupSlot.booked + 1)
+        .returning(PickupSlot.id)
+    )).scalar()
+    if slot_id is not None:
+        mark_changed(db, "pickup_slots")
+    return slot_id
+
+async def slot_availability(db: AsyncSession, vendor: Vendor, area: str, start: date, days: int) -> List[dict]:
+    slots = {
+        slot.day: slot
+        for slot in (await db.execute(select(PickupSlot).filter(
+            PickupSlot.vendor_id == vendor.id,
+            PickupSlot.area == area,
+            PickupSlot.day >= start,
+            PickupSlot.day < start + timedelta(days=days)
+        ))).scalars()
+    }
+    availability = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        slot = slots.get(day)
+        capacity = slot.capacity if slot else vendor.daily_capacity
+        booked = slot.booked if slot else 0
+        closed = bool(slot and slot.closed_at)
+        availability.append({
+            "day": day,
+            "capacity": capacity,
+            "booked": booked,
+            "available": 0 if closed else max(capacity - booked, 0),
+            "closed": closed,
+        })
+    return availability
+
+async def build_manifests(db: AsyncSession, day: date, close: bool = True) -> List[dict]:
+    """Per-vendor, per-area manifests of the day's confirmed pickups, closing the day's slots first."""
+    if close:
+        result = await db.execute(
+            update(PickupSlot)
+            .where(PickupSlot.day == day, PickupSlot.closed_at.is_(None))
+            .values(closed_at=datetime.now(timezone.utc))
+        )
+        if result.rowcount:
+            mark_changed(db, "pickup_slots")
+        await db.commit()
+
+    rows = (await db.execute(
+        select(
+            PickupSlot.id.label("slot_id"), PickupSlot.vendor_id, PickupSlot.area, PickupSlot.capacity,
+            PickupSlot.booked, PickupSlot.closed_at, Vendor.name.label("vendor_name"), Vendor.location.label("vendor_location"),
+            Disposal.id.label("disposal_id"), Disposal.user_id, Disposal.pickup_date, Disposal.pickup_location,
+            Disposal.vendor_filter, Classification.item_name,
+        )
+        .join(Disposal, Disposal.pickup_slot_id == PickupSlot.id)
+        .outerjoin(Vendor, Vendor.id == PickupSlot.vendor_id)
+        .outerjoin(Classification, Classification.id == Disposal.classification_id)
+        .filter(PickupSlot.day == day, Disposal.status == CONFIRMED_STATUS)
+        .order_by(PickupSlot.vendor_id, PickupSlot.area, Disposal.pickup_date, Disposal.id)
+    )).all()
+
+    manifests = []
+    for _, slot_rows in groupby(rows, key=lambda row: row.slot_id):
+        slot_rows = list(slot_rows)
+        first = slot_rows[0]
+        manifests.append({
+            "slot_id": first.slot_id,
+            "day": day,
+            "vendor_id": first.vendor_id,
+            "vendor_name": first.vendor_name,
+            "vendor_location": first.vendor_location,
+            "area": first.area,
+            "capacity": first.capacity,
+            "booked": first.booked,
+            "closed": first.closed_at is not None,
+            "pickups": [
+                {
+                    "disposal_id": row.disposal_id,
+                    "user_id": row.user_id,
+                    "item_name": row.item_name,
+                    "item_type": row.vendor_filter,
+                    "pickup_date": row.pickup_date,
+                    "pickup_location": row.pickup_location,
+                }
+                for row in slot_rows
+            ],
+        })
+    return manifests
+
+async def _print_manifests(day: date, close: bool):
+    async with AsyncSessionLocal() as db:
+        manifests = await build_manifests(db, day, close)
+    print(json.dumps(manifests, indent=2, default=str))
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="E-Cycle pickup scheduling")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    manifest_parser = subparsers.add_parser("manifests", help="Close a day's pickup slots and print its manifests")
+    manifest_parser.add_argument("--date", type=date.fromisoformat, default=None, help="Day to build (default: today, UTC)")
+    manifest_parser.add_argument("--no-close", action="store_true", help="Print without closing the slots")
+    args = parser.parse_args(argv)
+
+    if args.command == "manifests":
+        asyncio.run(_print_manifests(args.date or datetime.now(timezone.utc).date(), not args.no_close))
+
+if __name__ == "__main__":
+    main()
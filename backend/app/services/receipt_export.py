@@ -0,0 +1,123 @@
+"""
+Bulk receipt export as a streamed ZIP archive.
+
+Purchases are read from the database in batches, receipts are fetched from
+the receipt store or rendered in the receipt process pool (several at a
+time, one per worker plus some look-ahead) and each one is written to the
+archive and sent to the client as soon as it is ready. Memory use does not
+grow with the number of receipts beyond the archive's central directory
+(one small entry per file).
+"""
+from collections import deque
+from datetime import date, datetime, time, timedelta
+from typing import AsyncIterator, List, Optional
+import asyncio
+import zipfile
+
+from sqlalchemy import and_, or_, select
+
+from app.core.database import AsyncSessionLocal, MarketplaceItem, Purchase, User
+from app.services.receipts import RECEIPT_WORKERS, get_receipt_executor, read_or_render_receipt, receipt_filename, receipt_snapshot
+from app.static_products import STATIC_CATALOG
+
+EXPORT_BATCH_SIZE = 500
+# Receipts rendered ahead of the one being written to the archive
+EXPORT_PREFETCH = RECEIPT_WORKERS * 2
+
+class ZipStreamSink:
+    """Write-only file object that hands out what zipfile has written so far."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def static_item_ids_for_seller(seller: str) -> List[int]:
+    return [product_id for product_id, item in STATIC_CATALOG.by_id.items() if item['seller_name'] == seller]
+
+def export_query(start_date: Optional[date], end_date: Optional[date], seller: Optional[str]):
+    query = (
+        select(
+            Purchase.id, Purchase.user_id, Purchase.marketplace_item_id, Purchase.created_at,
+            Purchase.phone_number, Purchase.purchase_price, Purchase.shipping_address,
+            User.full_name, User.username, User.email,
+            MarketplaceItem.title, MarketplaceItem.brand, MarketplaceItem.model,
+            MarketplaceItem.seller_name, MarketplaceItem.warranty_info,
+        )
+        .outerjoin(User, User.id == Purchase.user_id)
+        .outerjoin(MarketplaceItem, and_(MarketplaceItem.id == Purchase.marketplace_item_id, Purchase.marketplace_item_id < 1000))
+    )
+    if start_date:
+        query = query.filter(Purchase.created_at >= datetime.combine(start_date, time.min))
+    if end_date:
+        query = query.filter(Purchase.created_at < datetime.combine(end_date + timedelta(days=1), time.min))
+    if seller:
+        query = query.filter(or_(
+            MarketplaceItem.seller_name == seller,
+            Purchase.marketplace_item_id.in_(static_item_ids_for_seller(seller)),
+        ))
+    return query.order_by(Purchase.created_at, Purchase.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+def receipt_job(row, receipt_format: str) -> Optional[tuple]:
+    """Arguments for read_or_render_receipt, or None if the purchased item no longer exists."""
+    if row.marketplace_item_id >= 1000:
+        item_data = STATIC_CATALOG.get(row.marketplace_item_id)
+    elif row.title is not None:
+        item_data = {
+            'title': row.title,
+            'brand': row.brand,
+            'model': row.model,
+            'seller_name': row.seller_name,
+            'warranty_info': row.warranty_info
+        }
+    else:
+        item_data = None
+    if item_data is None:
+        return None
+    purchase_data, item, user_data = receipt_snapshot(row, item_data, row)
+    return row.user_id, receipt_format, purchase_data, item, user_data
+
+async def iter_receipts(start_date, end_date, seller, receipt_format: str) -> AsyncIterator[tuple]:
+    """(purchase_id, created_at, content) in purchase order, rendering up to EXPORT_PREFETCH ahead."""
+    loop = asyncio.get_running_loop()
+    executor = get_receipt_executor()
+    pending = deque()
+    async with AsyncSessionLocal() as db:
+        rows = await db.stream(export_query(start_date, end_date, seller))
+        async for row in rows:
+            job = receipt_job(row, receipt_format)
+            if job is None:
+                continue
+            pending.append((row.id, row.created_at, loop.run_in_executor(executor, read_or_render_receipt, *job)))
+            if len(pending) > EXPORT_PREFETCH:
+                purchase_id, created_at, future = pending.popleft()
+                yield purchase_id, created_at, await future
+    while pending:
+        purchase_id, created_at, future = pending.popleft()
+        yield purchase_id, created_at, await future
+
+async def stream_receipts_zip(start_date, end_date, seller, receipt_format: str) -> AsyncIterator[bytes]:
+    sink = ZipStreamSink()
+    # PDFs are already compressed; text receipts shrink a lot
+    compression = zipfile.ZIP_STORED if receipt_format == "pdf" else zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(sink, mode="w", compression=compression) as archive:
+        async for purchase_id, created_at, content in iter_receipts(start_date, end_date, seller, receipt_format):
+            info = zipfile.ZipInfo(
+                f"{created_at:%Y-%m-%d}/{receipt_filename(purchase_id, receipt_format)}",
+                date_time=created_at.timetuple()[:6],
+            )
+            info.compress_type = compression
+            archive.writestr(info, content)
+            yield sink.drain()
+    # Central directory, written when the archive is closed
+    yield sink.drain()
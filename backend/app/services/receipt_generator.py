@@ -17,7 +17,8 @@ def generate_receipt_pdf(purchase_data, item_data, user_data):
         return generate_text_receipt(purchase_data, item_data, user_data)
     
     buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    # invariant: same input gives byte-identical output, so the file's ETag is stable
+    doc = SimpleDocTemplate(buffer, pagesize=letter, invariant=1)
     styles = getSampleStyleSheet()
     story = []
     
@@ -0,0 +1,159 @@
+"""
+Receipts rendered once and served as immutable files.
+
+Right after a purchase, render_receipts runs in a process pool and writes
+the text and PDF receipt to RECEIPT_DIR/<user_id>/<purchase_id>.<format>.
+The owner is part of the path, so a download only needs a file lookup: no
+query and no write. Receipts never change once written, so downloads carry
+a strong ETag of the content and recently served files stay in memory.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+from typing import List, NamedTuple, Optional
+import asyncio
+import hashlib
+import os
+import tempfile
+
+from sqlalchemy import update
+
+from app.core.cache import TTLCache
+from app.core.database import AsyncSessionLocal, Purchase
+from app.core.processes import create_process_pool
+from app.services.receipt_generator import REPORTLAB_AVAILABLE, generate_receipt_pdf, generate_text_receipt
+
+RECEIPT_DIR = os.getenv("RECEIPT_DIR", "receipts")
+RECEIPT_WORKERS = int(os.getenv("RECEIPT_WORKERS", str(os.cpu_count() or 1)))
+RECEIPT_CACHE_SIZE = int(os.getenv("RECEIPT_CACHE_SIZE", "1000"))
+RECEIPT_CACHE_TTL_SECONDS = int(os.getenv("RECEIPT_CACHE_TTL_SECONDS", "3600"))
+
+RECEIPT_MEDIA_TYPES = {"txt": "text/plain", "pdf": "application/pdf"}
+
+_receipt_executor: Optional[ProcessPoolExecutor] = None
+
+class StoredReceipt(NamedTuple):
+    content: bytes
+    etag: str
+    media_type: str
+    filename: str
+
+receipt_cache = TTLCache(RECEIPT_CACHE_SIZE, RECEIPT_CACHE_TTL_SECONDS)
+
+def receipt_formats() -> List[str]:
+    return ["txt", "pdf"] if REPORTLAB_AVAILABLE else ["txt"]
+
+def receipt_path(user_id: int, purchase_id: int, receipt_format: str) -> str:
+    return os.path.join(RECEIPT_DIR, str(user_id), f"{purchase_id}.{receipt_format}")
+
+def receipt_filename(purchase_id: int, receipt_format: str) -> str:
+    return f"ECycle_Receipt_{purchase_id:06d}.{receipt_format}"
+
+def receipt_snapshot(purchase: Purchase, item_data: dict, user) -> tuple:
+    """Plain, picklable copies of what the receipt templates read."""
+    purchase_data = SimpleNamespace(
+        id=purchase.id,
+        created_at=purchase.created_at,
+        phone_number=purchase.phone_number,
+        purchase_price=purchase.purchase_price,
+        shipping_address=purchase.shipping_address,
+    )
+    item = {key: item_data.get(key) for key in ("title", "brand", "model", "seller_name", "warranty_info")}
+    user_data = SimpleNamespace(full_name=user.full_name, username=user.username, email=user.email)
+    return purchase_data, item, user_data
+
+def _write_file(path: str, content: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            buffer.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def render_receipts(user_id: int, purchase_data, item_data: dict, user_data, formats: Optional[List[str]] = None) -> List[str]:
+    """Write the missing receipt formats (all by default) for a purchase. Runs in the receipt process pool."""
+    written = []
+    for receipt_format in formats or receipt_formats():
+        path = receipt_path(user_id, purchase_data.id, receipt_format)
+        if os.path.exists(path):
+            continue
+        if receipt_format == "pdf":
+            content = generate_receipt_pdf(purchase_data, item_data, user_data)
+        else:
+            content = generate_text_receipt(purchase_data, item_data, user_data)
+        _write_file(path, content)
+        written.append(receipt_format)
+    return written
+
+def read_or_render_receipt(user_id: int, receipt_format: str, purchase_data, item_data: dict, user_data) -> bytes:
+    """Stored receipt content, rendering and storing it first if needed. Runs in the receipt process pool."""
+    path = receipt_path(user_id, purchase_data.id, receipt_format)
+    content = _read_receipt(path)
+    if content is None:
+        render_receipts(user_id, purchase_data, item_data, user_data, [receipt_format])
+        content = _read_receipt(path)
+    return content
+
+def get_receipt_executor() -> ProcessPoolExecutor:
+    global _receipt_executor
+    if _receipt_executor is None:
+        _receipt_executor = create_process_pool(RECEIPT_WORKERS)
+    return _receipt_executor
+
+def shutdown_receipt_executor():
+    global _receipt_executor
+    if _receipt_executor is not None:
+        _receipt_executor.shutdown(wait=False, cancel_futures=True)
+        _receipt_executor = None
+
+async def render_receipts_async(user_id: int, purchase_data, item_data: dict, user_data):
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(get_receipt_executor(), render_receipts, user_id, purchase_data, item_data, user_data)
+
+async def render_receipts_after_purchase(user_id: int, purchase_data, item_data: dict, user_data):
+    """Background task run after the purchase response is sent."""
+    try:
+        await render_receipts_async(user_id, purchase_data, item_data, user_data)
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Purchase).where(Purchase.id == purchase_data.id).values(receipt_generated=True))
+            await db.commit()
+    except Exception as e:
+        print(f"Could not render receipt for purchase {purchase_data.id}: {e}")
+
+def _read_receipt(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def _cache_receipt(path: str, purchase_id: int, receipt_format: str, content: bytes) -> StoredReceipt:
+    receipt = StoredReceipt(
+        content=content,
+        etag=f'"{hashlib.sha256(content).hexdigest()[:32]}"',
+        media_type=RECEIPT_MEDIA_TYPES[receipt_format],
+        filename=receipt_filename(purchase_id, receipt_format),
+    )
+    receipt_cache.set(path, receipt)
+    return receipt
+
+async def load_receipt(user_id: int, purchase_id: int, receipt_format: str) -> Optional[StoredReceipt]:
+    path = receipt_path(user_id, purchase_id, receipt_format)
+    receipt = receipt_cache.get(path)
+    if receipt is not None:
+        return receipt
+    content = await asyncio.to_thread(_read_receipt, path)
+    if content is None:
+        return None
+    return _cache_receipt(path, purchase_id, receipt_format, content)
+
+async def render_receipt_async(user_id: int, receipt_format: str, purchase_data, item_data: dict, user_data) -> StoredReceipt:
+    """Render just the requested format of a receipt that is not stored yet, e.g. for a download."""
+    loop = asyncio.get_running_loop()
+    content = await loop.run_in_executor(
+        get_receipt_executor(), read_or_render_receipt, user_id, receipt_format, purchase_data, item_data, user_data
+    )
+    return _cache_receipt(receipt_path(user_id, purchase_data.id, receipt_format), purchase_data.id, receipt_format, content)
@@ -0,0 +1,215 @@
+"""
+Marketplace full-text search backed by SQLite FTS5.
+
+Two virtual tables are kept in sync with marketplace_items by triggers:
+marketplace_search (porter-stemmed words, BM25 ranked) for normal queries
+and marketplace_search_trigram (title/brand/model trigrams) as a fallback
+for misspelled queries. Rowids equal the marketplace item id; static
+catalog products are stored under negative rowids (-id) so both sources
+share one index. The tables and triggers are created by migration 0003.
+"""
+import re
+from difflib import SequenceMatcher
+from typing import List, Optional, Tuple
+
+from sqlalchemy import bindparam, or_, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import MarketplaceItem
+from app.services.spec_filters import SpecFilter, spec_filter_clause
+from app.static_products import STATIC_PRODUCTS, STATIC_CATALOG
+
+# BM25 column weights: title, brand, model, description, specifications
+SEARCH_WEIGHTS = "10.0, 5.0, 5.0, 1.0, 2.0"
+TRIGRAM_WEIGHTS = "10.0, 5.0, 5.0"
+# Average per-token edit similarity a fuzzy candidate needs to be returned
+FUZZY_MIN_SIMILARITY = 0.75
+
+def search_supported(conn: Connection) -> bool:
+    return conn.dialect.name == "sqlite"
+
+def refresh_static_search_index(conn: Connection):
+    """Re-index the static catalog, which lives in code and can change between deploys."""
+    if not search_supported(conn):
+        return
+    conn.execute(text("DELETE FROM marketplace_search WHERE rowid < 0"))
+    conn.execute(text("DELETE FROM marketplace_search_trigram WHERE rowid < 0"))
+    for item in STATIC_PRODUCTS:
+        specifications = " ".join(str(value) for value in item['specifications'].values())
+        conn.execute(
+            text("""
+                INSERT INTO marketplace_search(rowid, title, brand, model, description, specifications)
+                VALUES (:rowid, :title, :brand, :model, :description, :specifications)
+            """),
+            {"rowid": -item['id'], "title": item['title'], "brand": item['brand'], "model": item['model'],
+             "description": item['description'], "specifications": specifications},
+        )
+        conn.execute(
+            text("INSERT INTO marketplace_search_trigram(rowid, title, brand, model) VALUES (:rowid, :title, :brand, :model)"),
+            {"rowid": -item['id'], "title": item['title'], "brand": item['brand'], "model": item['model']},
+        )
+
+def tokenize_query(query: str) -> List[str]:
+    return re.findall(r"\w+", query.lower())
+
+def build_match_query(tokens: List[str]) -> str:
+    # Quote every token so user input can never inject FTS5 syntax; prefix match for search-as-you-type
+    return " ".join(f'"{token}"*' for token in tokens)
+
+def get_trigrams(tokens: List[str]) -> List[str]:
+    trigrams = []
+    for token in tokens:
+        for start in range(len(token) - 2):
+            trigram = token[start:start + 3]
+            if trigram not in trigrams:
+                trigrams.append(trigram)
+    return trigrams
+
+def build_filter_sql(dialect, is_selling: Optional[bool], category_id: Optional[int],
+                     min_price: Optional[float], max_price: Optional[float],
+                     spec_filters: Optional[List[SpecFilter]] = None) -> Tuple[str, dict]:
+    conditions = ["marketplace_items.status = 'available'"]
+    params = {}
+    if is_selling is not None:
+        conditions.append("marketplace_items.is_selling = :is_selling")
+        params["is_selling"] = is_selling
+    if category_id is not None:
+        conditions.append("marketplace_items.category_id = :category_id")
+        params["category_id"] = category_id
+    if min_price is not None:
+        conditions.append("marketplace_items.price >= :min_price")
+        params["min_price"] = min_price
+    if max_price is not None:
+        conditions.append("marketplace_items.price <= :max_price")
+        params["max_price"] = max_price
+    if spec_filters:
+        # Filter values are plain numbers/strings, so inlining them through the dialect is safe
+        clause = spec_filter_clause(spec_filters)
+        conditions.append(str(clause.compile(dialect=dialect, compile_kwargs={"literal_binds": True})))
+    return " AND ".join(conditions), params
+
+async def search_item_ids(
+    db: AsyncSession,
+    query: str,
+    static_ids: List[int],
+    is_selling: Optional[bool] = None,
+    category_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    spec_filters: Optional[List[SpecFilter]] = None,
+    limit: int = 20,
+) -> List[Tuple[bool, int]]:
+    """
+    Return (is_static, item_id) pairs in rank order. Static products are
+    restricted to static_ids, which the caller has already filtered.
+    """
+    tokens = tokenize_query(query)
+    if not tokens:
+        return []
+
+    connection = await db.connection()
+    if connection.dialect.name != "sqlite":
+        return await search_item_ids_fallback(db, tokens, static_ids, is_selling, category_id, min_price, max_price,
+                                              spec_filters, limit)
+
+    filter_sql, params = build_filter_sql(connection.dialect, is_selling, category_id, min_price, max_price, spec_filters)
+    params.update(static_rowids=[-item_id for item_id in static_ids], limit=limit)
+
+    ranked = await db.execute(
+        text(f"""
+            SELECT s.rowid
+            FROM marketplace_search s
+            LEFT JOIN marketplace_items ON marketplace_items.id = s.rowid
+            WHERE marketplace_search MATCH :match
+              AND (s.rowid IN :static_rowids OR ({filter_sql}))
+            ORDER BY bm25(marketplace_search, {SEARCH_WEIGHTS})
+            LIMIT :limit
+        """).bindparams(bindparam("static_rowids", expanding=True)),
+        {**params, "match": build_match_query(tokens)},
+    )
+    rowids = [row[0] for row in ranked]
+
+    if not rowids:
+        rowids = await fuzzy_search_rowids(db, tokens, filter_sql, params)
+
+    return [(rowid < 0, abs(rowid)) for rowid in rowids]
+
+def token_similarity(tokens: List[str], words: List[str]) -> float:
+    """Average over query tokens of the best edit similarity against any candidate word."""
+    if not words:
+        return 0.0
+    return sum(max(SequenceMatcher(None, token, word).ratio() for word in words) for token in tokens) / len(tokens)
+
+async def fuzzy_search_rowids(db: AsyncSession, tokens: List[str], filter_sql: str, params: dict) -> List[int]:
+    """
+    Trigram fallback for misspelled queries. Any shared trigram makes a row
+    a candidate; candidates are then re-scored by edit similarity so a
+    transposed or missing letter still matches.
+    """
+    trigrams = get_trigrams(tokens)
+    if not trigrams:
+        return []
+    candidates = await db.execute(
+        text(f"""
+            SELECT s.rowid, s.title, s.brand, s.model
+            FROM marketplace_search_trigram s
+            LEFT JOIN marketplace_items ON marketplace_items.id = s.rowid
+            WHERE marketplace_search_trigram MATCH :match
+              AND (s.rowid IN :static_rowids OR ({filter_sql}))
+            ORDER BY bm25(marketplace_search_trigram, {TRIGRAM_WEIGHTS})
+            LIMIT :candidate_limit
+        """).bindparams(bindparam("static_rowids", expanding=True)),
+        {**params, "match": " OR ".join(f'"{trigram}"' for trigram in trigrams),
+         "candidate_limit": params["limit"] * 5},
+    )
+    scored = []
+    for rowid, title, brand, model in candidates:
+        words = tokenize_query(" ".join(filter(None, [title, brand, model])))
+        similarity = token_similarity(tokens, words)
+        if similarity >= FUZZY_MIN_SIMILARITY:
+            scored.append((similarity, rowid))
+    # sort is stable, so equally similar rows keep their BM25 order
+    scored.sort(key=lambda entry: entry[0], reverse=True)
+    return [rowid for _, rowid in scored[:params["limit"]]]
+
+async def search_item_ids_fallback(
+    db: AsyncSession,
+    tokens: List[str],
+    static_ids: List[int],
+    is_selling: Optional[bool],
+    category_id: Optional[int],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    spec_filters: Optional[List[SpecFilter]],
+    limit: int,
+) -> List[Tuple[bool, int]]:
+    """Unranked substring search for databases without FTS5 (e.g. PostgreSQL)."""
+    results = []
+    for item_id in static_ids:
+        item = STATIC_CATALOG.get(item_id)
+        haystack = " ".join([item['title'], item['brand'], item['model'], item['description']]).lower()
+        if all(token in haystack for token in tokens):
+            results.append((True, item_id))
+
+    query = select(MarketplaceItem.id).filter(MarketplaceItem.status == "available")
+    for token in tokens:
+        pattern = f"%{token}%"
+        query = query.filter(or_(
+            MarketplaceItem.title.ilike(pattern),
+            MarketplaceItem.brand.ilike(pattern),
+            MarketplaceItem.model.ilike(pattern),
+            MarketplaceItem.description.ilike(pattern),
+        ))
+    if is_selling is not None:
+        query = query.filter(MarketplaceItem.is_selling == is_selling)
+    if category_id is not None:
+        query = query.filter(MarketplaceItem.category_id == category_id)
+    if min_price is not None:
+        query = query.filter(MarketplaceItem.price >= min_price)
+    if max_price is not None:
+        query = query.filter(MarketplaceItem.price <= max_price)
+    if spec_filters:
+        query = query.filter(spec_filter_clause(spec_filters))
+    results += [(False, item_id) for item_id in (await db.execute(query.limit(limit))).scalars().all()]
+    return results[:limit]
@@ -0,0 +1,103 @@
+"""
+Specification filters for marketplace listings, e.g. "RAM>=8GB" or "Storage=256GB".
+
+Values that start with a number compare numerically with storage units
+normalised to GB, matching spec_number() in the database so DB rows and
+static catalog items filter the same way. Anything else compares as
+case-insensitive text equality.
+"""
+import re
+from typing import List, Mapping, NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, func
+
+from app.core.database import spec_number, spec_value
+
+SPEC_FILTER_PATTERN = re.compile(r"^\s*([A-Za-z0-9 _-]{1,40}?)\s*(>=|<=|!=|=|>|<)\s*(.{1,64}?)\s*$")
+SPEC_NUMBER_PATTERN = re.compile(r"^[0-9]+(\.[0-9]+)?")
+NUMERIC_OPERATORS = (">=", "<=", ">", "<")
+
+class SpecFilter(NamedTuple):
+    key: str
+    operator: str
+    value: str
+    number: Optional[float]
+
+def parse_spec_number(value) -> Optional[float]:
+    text = str(value)
+    match = SPEC_NUMBER_PATTERN.match(text)
+    if not match:
+        return None
+    number = float(match.group(0))
+    upper = text.upper()
+    if "TB" in upper:
+        return number * 1024.0
+    if "MB" in upper:
+        return number * (1.0 / 1024)
+    return number
+
+def parse_spec_filters(raw_filters: Optional[List[str]]) -> List[SpecFilter]:
+    filters = []
+    for raw in raw_filters or []:
+        match = SPEC_FILTER_PATTERN.match(raw)
+        if not match:
+            raise HTTPException(status_code=400, detail=f"Invalid specification filter: {raw}")
+        key, operator, value = match.groups()
+        number = parse_spec_number(value)
+        if operator in NUMERIC_OPERATORS and number is None:
+            raise HTTPException(status_code=400, detail=f"Specification filter needs a numeric value: {raw}")
+        filters.append(SpecFilter(key, operator, value, number))
+    return filters
+
+def spec_filter_clause(spec_filters: List[SpecFilter]):
+    """SQL condition over MarketplaceItem.specifications for all filters."""
+    conditions = []
+    for spec_filter in spec_filters:
+        if spec_filter.number is not None:
+            column = spec_number(spec_filter.key)
+            value = spec_filter.number
+        else:
+            column = func.lower(spec_value(spec_filter.key))
+            value = spec_filter.value.lower()
+        if spec_filter.operator == ">=":
+            conditions.append(column >= value)
+        elif spec_filter.operator == "<=":
+            conditions.append(column <= value)
+        elif spec_filter.operator == ">":
+            conditions.append(column > value)
+        elif spec_filter.operator == "<":
+            conditions.append(column < value)
+        elif spec_filter.operator == "!=":
+            conditions.append(column != value)
+        else:
+            conditions.append(column == value)
+    return and_(*conditions)
+
+def matches_spec_filters(specifications: Mapping, spec_filters: List[SpecFilter]) -> bool:
+    """Python equivalent of spec_filter_clause, used for the static catalog."""
+    for spec_filter in spec_filters:
+        raw = specifications.get(spec_filter.key)
+        if raw is None:
+            return False
+        if spec_filter.number is not None:
+            actual = parse_spec_number(raw)
+            expected = spec_filter.number
+            if actual is None:
+                return False
+        else:
+            actual = str(raw).lower()
+            expected = spec_filter.value.lower()
+        if spec_filter.operator == ">=" and not actual >= expected:
+            return False
+        if spec_filter.operator == "<=" and not actual <= expected:
+            return False
+        if spec_filter.operator == ">" and not actual > expected:
+            return False
+        if spec_filter.operator == "<" and not actual < expected:
+            return False
+        if spec_filter.operator == "!=" and not actual != expected:
+            return False
+        if spec_filter.operator == "=" and not actual == expected:
+            return False
+    return True
@@ -0,0 +1,257 @@
+"""
+Incrementally maintained admin statistics.
+
+stat_counters holds one row per (metric, key), e.g.
+("classifications_by_category", "marketplace"), with a running count and
+a running total (GMV for purchases), so /admin/stats reads a few hundred
+small rows instead of grouping the hot tables.
+
+Every ORM flush that inserts, deletes or changes a tracked column appends
+its changes to stat_deltas in the same transaction. Writes never update a
+shared counter row, so they do not queue behind each other on the handful
+of hot rows. Pending deltas are folded into stat_counters in a separate
+transaction when the stats are read, or on demand. Writes made outside the
+ORM must call adjust_stats themselves.
+
+Fold pending deltas (e.g. from cron), or recompute everything if counters
+ever drift (manual SQL, restored backups):
+    python -m app.services.stats fold
+    python -m app.services.stats rebuild
+"""
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import argparse
+
+from sqlalchemy import delete, event, func, inspect, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.database import engine as default_engine, AsyncSessionLocal, Base, Classification, Disposal, Donation, MarketplaceItem, Purchase, StatCounter, StatDelta
+
+NONE_KEY = "(none)"
+# Deltas folded per statement, so a large backlog is not loaded at once
+FOLD_BATCH_SIZE = 10000
+
+class StatDimension(NamedTuple):
+    metric: str
+    attribute: str
+    # Column added to the running total, if any
+    amount: Optional[str] = None
+    # Maps the attribute value to the key, e.g. a timestamp to its day
+    transform: Optional[Callable[[Any], Any]] = None
+    # Same transform in SQL, for rebuilds
+    sql_transform: Optional[Callable[[Any], Any]] = None
+
+def to_day(value) -> Optional[str]:
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+STAT_DIMENSIONS = {
+    Classification: [
+        StatDimension("classifications_by_category", "category"),
+        StatDimension("classifications_by_condition", "condition"),
+    ],
+    Disposal: [
+        StatDimension("disposals_by_status", "status"),
+        StatDimension("disposals_by_vendor", "selected_vendor"),
+    ],
+    Donation: [
+        StatDimension("donations_by_organization", "organization"),
+        StatDimension("donations_by_status", "status"),
+    ],
+    MarketplaceItem: [
+        StatDimension("marketplace_items_by_status", "status"),
+        StatDimension("marketplace_items_by_category", "category_id"),
+    ],
+    Purchase: [
+        StatDimension("purchases_by_day", "created_at", amount="purchase_price", transform=to_day, sql_transform=func.date),
+    ],
+}
+
+StatDeltas = Dict[Tuple[str, str], List[float]]
+
+def stat_key(dimension: StatDimension, value) -> str:
+    if dimension.transform is not None:
+        value = dimension.transform(value)
+    return NONE_KEY if value is None else str(value)
+
+def old_value(obj, attribute: str):
+    history = inspect(obj).attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attribute)
+
+def add_delta(deltas: StatDeltas, dimension: StatDimension, value, amount, sign: int):
+    entry = deltas[(dimension.metric, stat_key(dimension, value))]
+    entry[0] += sign
+    entry[1] += sign * (amount or 0.0)
+
+def collect_deltas(session: Session) -> StatDeltas:
+    deltas: StatDeltas = defaultdict(lambda: [0, 0.0])
+    for obj in session.new:
+        for dimension in STAT_DIMENSIONS.get(type(obj), ()):
+            amount = getattr(obj, dimension.amount) if dimension.amount else None
+            add_delta(deltas, dimension, getattr(obj, dimension.attribute), amount, 1)
+    for obj in session.deleted:
+        for dimension in STAT_DIMENSIONS.get(type(obj), ()):
+            amount = old_value(obj, dimension.amount) if dimension.amount else None
+            add_delta(deltas, dimension, old_value(obj, dimension.attribute), amount, -1)
+    for obj in session.dirty:
+        dimensions = STAT_DIMENSIONS.get(type(obj))
+        if not dimensions or not session.is_modified(obj):
+            continue
+        for dimension in dimensions:
+            before = (stat_key(dimension, old_value(obj, dimension.attribute)),
+                      old_value(obj, dimension.amount) if dimension.amount else None)
+            after = (stat_key(dimension, getattr(obj, dimension.attribute)),
+                     getattr(obj, dimension.amount) if dimension.amount else None)
+            if before != after:
+                add_delta(deltas, dimension, old_value(obj, dimension.attribute), before[1], -1)
+                add_delta(deltas, dimension, getattr(obj, dimension.attribute), after[1], 1)
+    return {key: value for key, value in deltas.items() if value[0] or value[1]}
+
+def upsert_statement(dialect_name: str, metric: str, key: str, count: int, total: float):
+    table = StatCounter.__table__
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert(table).values(metric=metric, key=key, count=count, total=total).on_conflict_do_update(
+        index_elements=[table.c.metric, table.c.key],
+        set_={"count": table.c.count + count, "total": table.c.total + total},
+    )
+
+def apply_deltas(conn: Connection, deltas: StatDeltas):
+    """Add deltas to the counter rows."""
+    table = StatCounter.__table__
+    # Sorted so concurrent transactions lock counter rows in the same order
+    for (metric, key), (count, total) in sorted(deltas.items()):
+        statement = upsert_statement(conn.dialect.name, metric, key, count, total)
+        if statement is not None:
+            conn.execute(statement)
+            continue
+        result = conn.execute(
+            update(table)
+            .where(table.c.metric == metric, table.c.key == key)
+            .values(count=table.c.count + count, total=table.c.total + total)
+        )
+        if result.rowcount == 0:
+            conn.execute(table.insert().values(metric=metric, key=key, count=count, total=total))
+
+def record_deltas(conn: Connection, deltas: StatDeltas):
+    """Append deltas to stat_deltas; they reach the counters with the next fold."""
+    if deltas:
+        conn.execute(StatDelta.__table__.insert(), [
+            {"metric": metric, "key": key, "count": count, "total": total}
+            for (metric, key), (count, total) in deltas.items()
+        ])
+
+def fold_stat_deltas(conn: Connection) -> int:
+    """Move committed deltas into stat_counters and return how many were folded."""
+    table = StatDelta.__table__
+    folded = 0
+    while True:
+        # DELETE ... RETURNING claims each delta once, even with concurrent folds
+        batch = select(table.c.id).order_by(table.c.id).limit(FOLD_BATCH_SIZE).scalar_subquery()
+        rows = conn.execute(
+            delete(table).where(table.c.id.in_(batch))
+            .returning(table.c.metric, table.c.key, table.c.count, table.c.total)
+        ).all()
+        deltas: StatDeltas = defaultdict(lambda: [0, 0.0])
+        for metric, key, count, total in rows:
+            deltas[(metric, key)][0] += count
+            deltas[(metric, key)][1] += total
+        apply_deltas(conn, deltas)
+        folded += len(rows)
+        if len(rows) < FOLD_BATCH_SIZE:
+            return folded
+
+async def fold_stat_deltas_async() -> int:
+    """Fold pending deltas in a transaction of their own."""
+    async with AsyncSessionLocal() as db:
+        folded = await db.run_sync(lambda session: fold_stat_deltas(session.connection()))
+        await db.commit()
+    return folded
+
+@event.listens_for(Session, "after_flush")
+def update_stats_after_flush(session, flush_context):
+    deltas = collect_deltas(session)
+    if deltas:
+        record_deltas(session.connection(), deltas)
+
+async def adjust_stats(db: AsyncSession, metric: str, key: str, count: int, total: float = 0.0):
+    """Record a change made with a bulk UPDATE/DELETE, in the caller's transaction."""
+    await db.run_sync(lambda session: record_deltas(session.connection(), {(metric, key): [count, total]}))
+
+async def adjust_stats_for_insert(db: AsyncSession, model, rows: List[dict]):
+    """Record rows inserted with a bulk INSERT, in the caller's transaction."""
+    deltas: StatDeltas = defaultdict(lambda: [0, 0.0])
+    for row in rows:
+        for dimension in STAT_DIMENSIONS.get(model, ()):
+            add_delta(deltas, dimension, row.get(dimension.attribute), row.get(dimension.amount) if dimension.amount else None, 1)
+    await db.run_sync(lambda session: record_deltas(session.connection(), deltas))
+
+def rebuild_stats(conn: Connection):
+    """Recompute every counter from the source tables."""
+    conn.execute(delete(StatCounter.__table__))
+    # Committed deltas are already reflected in the source tables
+    conn.execute(delete(StatDelta.__table__))
+    deltas: StatDeltas = {}
+    for model, dimensions in STAT_DIMENSIONS.items():
+        for dimension in dimensions:
+            column = getattr(model, dimension.attribute)
+            if dimension.sql_transform is not None:
+                column = dimension.sql_transform(column)
+            amount = func.sum(getattr(model, dimension.amount)) if dimension.amount else func.count()
+            rows = conn.execute(select(column, func.count(), amount).group_by(column))
+            for value, count, total in rows:
+                key = NONE_KEY if value is None else str(value)
+                deltas[(dimension.metric, key)] = [count, float(total or 0) if dimension.amount else 0.0]
+    apply_deltas(conn, deltas)
+
+async def get_stats(db: AsyncSession) -> dict:
+    await fold_stat_deltas_async()
+    rows = (await db.execute(select(StatCounter).filter(StatCounter.count != 0))).scalars().all()
+    stats = {dimension.metric: {} for dimensions in STAT_DIMENSIONS.values() for dimension in dimensions}
+    for row in rows:
+        if row.metric == "purchases_by_day":
+            stats[row.metric][row.key] = {"count": row.count, "gmv": round(row.total, 2)}
+        else:
+            stats.setdefault(row.metric, {})[row.key] = row.count
+    stats["totals"] = {
+        "classifications": sum(stats["classifications_by_category"].values()),
+        "disposals": sum(stats["disposals_by_status"].values()),
+        "donations": sum(stats["donations_by_status"].values()),
+        "marketplace_items": sum(stats["marketplace_items_by_status"].values()),
+        "purchases": sum(day["count"] for day in stats["purchases_by_day"].values()),
+        "gmv": round(sum(day["gmv"] for day in stats["purchases_by_day"].values()), 2),
+    }
+    return stats
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="E-Cycle admin statistics")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("fold", help="Fold pending stat deltas into the counters")
+    subparsers.add_parser("rebuild", help="Recompute all stat counters from the source tables")
+    args = parser.parse_args(argv)
+
+    if args.command == "fold":
+        Base.metadata.create_all(bind=default_engine)
+        with default_engine.begin() as conn:
+            folded = fold_stat_deltas(conn)
+        print(f"[STATS] Folded {folded} deltas")
+    elif args.command == "rebuild":
+        Base.metadata.create_all(bind=default_engine)
+        with default_engine.begin() as conn:
+            rebuild_stats(conn)
+        print("[STATS] Counters rebuilt")
+
+if __name__ == "__main__":
+    main()
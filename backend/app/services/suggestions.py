@@ -0,0 +1,287 @@
+"""
+Category suggestions for /classify/suggest.
+
+A TF-IDF weighted multinomial naive Bayes model over hashed word, word
+bigram and character trigram features of item_name + description (and the
+condition, when given). It has one head per prediction: the classify
+category, the disposal vendor type and the donation organization. Scoring a
+batch gathers the weight rows of every hashed feature in the batch and sums
+them per item with a single np.add.reduceat; an item in a batch takes
+tens of microseconds.
+
+The model is trained offline from historical classifications (joined to
+their disposals and donations) and the static catalog:
+    python -m app.services.suggestions train
+which replaces SUGGEST_MODEL_PATH atomically. Serving processes check the
+file's mtime every SUGGEST_MODEL_CHECK_SECONDS and swap the new model in
+without a restart. The first model is loaded at startup. Until a model has
+been trained, a seed model built from the static catalog and a few keyword
+examples is served.
+"""
+from collections import Counter
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import argparse
+import math
+import os
+import re
+import tempfile
+import time
+import zlib
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+
+from app.core.database import engine as default_engine, Classification, Disposal, Donation
+from app.static_products import STATIC_PRODUCTS
+
+SUGGEST_MODEL_PATH = os.getenv("SUGGEST_MODEL_PATH", "models/suggestions.npz")
+SUGGEST_MODEL_CHECK_SECONDS = float(os.getenv("SUGGEST_MODEL_CHECK_SECONDS", "30"))
+
+FEATURE_BUCKETS = 1 << 16
+SMOOTHING = 0.1
+HEADS = ("category", "vendor_type", "organization")
+# Same rule as register_donation
+DONATABLE_CONDITIONS = ("working", "unknown")
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Static catalog category_id -> disposal vendor type
+STATIC_CATEGORY_VENDOR_TYPES = {1: "phones", 2: "computers", 3: "appliances", 6: "computers"}
+
+# (text, condition, label) examples that keep every head usable before there is any history
+SEED_EXAMPLES = {
+    "category": [
+        ("broken dead damaged not working scrap old leaking swollen battery", "dead", "disposal"),
+        ("old unused spare still works good condition", "working", "donate"),
+        ("like new excellent condition barely used sell", "working", "marketplace"),
+        ("cracked screen not charging slow needs fix repair hinge keyboard", "unknown", "repair"),
+    ],
+    "vendor_type": [
+        ("battery batteries power bank lithium li ion cell ups inverter", None, "batteries"),
+        ("laptop computer desktop pc monitor keyboard mouse printer tablet motherboard", None, "computers"),
+        ("fridge refrigerator washing machine microwave oven air conditioner tv television fan", None, "appliances"),
+        ("phone smartphone mobile iphone android charger earphones feature phone", None, "phones"),
+    ],
+    "organization": [],
+}
+
+Features = Tuple[List[int], List[float]]
+
+def extract_features(item_name: str, description: str = "", condition: Optional[str] = None) -> Features:
+    """Hashed feature indices and their sublinear term frequencies."""
+    tokens = TOKEN_PATTERN.findall(f"{item_name} {description}".lower())
+    # The bias feature keeps every item non-empty, which np.add.reduceat relies on
+    names = ["bias"]
+    names.extend("w:" + token for token in tokens)
+    names.extend(f"b:{first} {second}" for first, second in zip(tokens, tokens[1:]))
+    for token in tokens:
+        padded = f"#{token}#"
+        names.extend("c:" + padded[i:i + 3] for i in range(len(padded) - 2))
+    if condition:
+        names.append("k:" + condition.lower())
+    counts = Counter(zlib.crc32(name.encode()) & (FEATURE_BUCKETS - 1) for name in names)
+    return list(counts), [1.0 + math.log(count) for count in counts.values()]
+
+def pack_features(features: Sequence[Features]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Concatenated indices and values of a batch, plus each item's start offset."""
+    lengths = np.fromiter((len(indices) for indices, _ in features), dtype=np.int64, count=len(features))
+    offsets = np.zeros(len(features), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    indices = np.fromiter((index for item, _ in features for index in item), dtype=np.int64, count=int(lengths.sum()))
+    values = np.fromiter((value for _, item in features for value in item), dtype=np.float32, count=len(indices))
+    return indices, values, offsets
+
+class Head(NamedTuple):
+    labels: Tuple[str, ...]
+    # (FEATURE_BUCKETS, len(labels)) log-probabilities, already multiplied by the idf
+    weights: np.ndarray
+    prior: np.ndarray
+
+    def probabilities(self, indices: np.ndarray, values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        scores = np.add.reduceat(self.weights[indices] * values[:, None], offsets, axis=0) + self.prior
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+class SuggestionModel(NamedTuple):
+    heads: Dict[str, Head]
+    trained_at: str
+    examples: int
+
+    def suggest(self, items: Sequence[dict], top_k: int = 3) -> List[dict]:
+        if not items:
+            return []
+        packed = pack_features([
+            extract_features(item["item_name"], item.get("description") or "", item.get("condition"))
+            for item in items
+        ])
+        ranked = {}
+        for name, head in self.heads.items():
+            probabilities = head.probabilities(*packed)
+            order = np.argsort(-probabilities, axis=1)[:, :top_k]
+            ranked[name] = [
+                [(head.labels[column], round(float(probabilities[row, column]), 4)) for column in columns]
+                for row, columns in enumerate(order)
+            ]
+        suggestions = []
+        for row, item in enumerate(items):
+            def top(head: str, key: str) -> List[dict]:
+                return [{key: label, "score": score} for label, score in ranked[head][row]] if head in ranked else []
+            suggestions.append({
+                "categories": top("category", "category"),
+                "disposal": {"vendor_types": top("vendor_type", "vendor_type")},
+                "donation": {
+                    "eligible": (item.get("condition") or "unknown") in DONATABLE_CONDITIONS,
+                    "organizations": top("organization", "organization"),
+                },
+            })
+        return suggestions
+
+def train_head(documents: Sequence[Features], labels: Sequence[str], idf: np.ndarray) -> Head:
+    label_names = tuple(sorted(set(labels)))
+    label_index = {label: i for i, label in enumerate(label_names)}
+    indices, values, offsets = pack_features(documents)
+    lengths = np.diff(np.append(offsets, len(indices)))
+    classes = np.repeat(np.fromiter((label_index[label] for label in labels), dtype=np.int64, count=len(labels)), lengths)
+    counts = np.zeros((FEATURE_BUCKETS, len(label_names)), dtype=np.float64)
+    np.add.at(counts, (indices, classes), values * idf[indices])
+    log_probabilities = np.log((counts + SMOOTHING) / (counts.sum(axis=0) + SMOOTHING * FEATURE_BUCKETS))
+    documents_per_label = np.bincount([label_index[label] for label in labels], minlength=len(label_names))
+    return Head(
+        labels=label_names,
+        weights=(idf[:, None] * log_probabilities).astype(np.float32),
+        prior=np.log(documents_per_label / documents_per_label.sum()).astype(np.float32),
+    )
+
+def compute_idf(documents: Sequence[Features]) -> np.ndarray:
+    document_frequency = np.bincount(pack_features(documents)[0], minlength=FEATURE_BUCKETS)
+    return (np.log((len(documents) + 1) / (document_frequency + 1)) + 1).astype(np.float32)
+
+def train_model(examples: Dict[str, Iterable[Tuple[str, str, Optional[str], str]]]) -> SuggestionModel:
+    """examples: head -> (item_name, description, condition, label) rows."""
+    corpus = {head: ([], []) for head in HEADS}
+    for head in HEADS:
+        documents, labels = corpus[head]
+        for text, condition, label in SEED_EXAMPLES[head]:
+            documents.append(extract_features(text, "", condition))
+            labels.append(label)
+        for item_name, description, condition, label in examples.get(head, ()):
+            if label:
+                documents.append(extract_features(item_name or "", description or "", condition))
+                labels.append(label)
+    idf = compute_idf(corpus["category"][0])
+    heads = {head: train_head(documents, labels, idf) for head, (documents, labels) in corpus.items() if documents}
+    return SuggestionModel(
+        heads=heads,
+        trained_at=datetime.now(timezone.utc).isoformat(),
+        examples=sum(len(labels) for _, labels in corpus.values()),
+    )
+
+def static_examples() -> Dict[str, List[tuple]]:
+    examples = {"category": [], "vendor_type": []}
+    for product in STATIC_PRODUCTS:
+        item_name = f"{product['title']} {product['brand']} {product['model']}"
+        examples["category"].append((item_name, product["description"], None, "marketplace"))
+        vendor_type = STATIC_CATEGORY_VENDOR_TYPES.get(product["category_id"])
+        if vendor_type:
+            examples["vendor_type"].append((item_name, product["description"], None, vendor_type))
+    return examples
+
+def history_examples(conn: Connection) -> Dict[str, Iterable[tuple]]:
+    text_columns = (Classification.item_name, Classification.description, Classification.condition)
+    queries = {
+        "category": select(*text_columns, Classification.category),
+        "vendor_type": select(*text_columns, Disposal.vendor_filter).join(Disposal, Disposal.classification_id == Classification.id),
+        "organization": select(*text_columns, Donation.organization).join(Donation, Donation.classification_id == Classification.id),
+    }
+    return {head: conn.execute(query).all() for head, query in queries.items()}
+
+def seed_model() -> SuggestionModel:
+    return train_model(static_examples())
+
+def train_from_database(conn: Connection) -> SuggestionModel:
+    examples = static_examples()
+    for head, rows in history_examples(conn).items():
+        examples[head] = examples.get(head, []) + rows
+    return train_model(examples)
+
+def save_model(model: SuggestionModel, path: str = SUGGEST_MODEL_PATH):
+    arrays = {"trained_at": np.array(model.trained_at), "examples": np.array(model.examples)}
+    for name, head in model.heads.items():
+        arrays[f"{name}.labels"] = np.array(head.labels)
+        arrays[f"{name}.weights"] = head.weights
+        arrays[f"{name}.prior"] = head.prior
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        # Readers only ever see the old file or the complete new one
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def load_model(path: str = SUGGEST_MODEL_PATH) -> SuggestionModel:
+    with np.load(path, allow_pickle=False) as data:
+        heads = {
+            name: Head(tuple(str(label) for label in data[f"{name}.labels"]), data[f"{name}.weights"], data[f"{name}.prior"])
+            for name in HEADS if f"{name}.labels" in data
+        }
+        return SuggestionModel(heads=heads, trained_at=str(data["trained_at"]), examples=int(data["examples"]))
+
+_model: Optional[SuggestionModel] = None
+_model_mtime: Optional[int] = None
+_model_checked_at = 0.0
+_model_lock = Lock()
+
+def get_model() -> SuggestionModel:
+    """The current model, reloaded when SUGGEST_MODEL_PATH has been replaced."""
+    global _model, _model_mtime, _model_checked_at
+    if _model is not None and time.monotonic() - _model_checked_at < SUGGEST_MODEL_CHECK_SECONDS:
+        return _model
+    with _model_lock:
+        _model_checked_at = time.monotonic()
+        try:
+            mtime = os.stat(SUGGEST_MODEL_PATH).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if _model is None or mtime != _model_mtime:
+            try:
+                _model = load_model() if mtime is not None else seed_model()
+                _model_mtime = mtime
+                print(f"[SUGGEST] Loaded model trained at {_model.trained_at} ({_model.examples} examples)")
+            except Exception as e:
+                # Keep serving the previous model; retried after the next check interval
+                print(f"[SUGGEST] Could not load {SUGGEST_MODEL_PATH}: {e}")
+                if _model is None:
+                    _model = seed_model()
+    return _model
+
+def suggest(items: Sequence[dict], top_k: int) -> Tuple[SuggestionModel, List[dict]]:
+    """Score items with the current model. Blocking (NumPy, model reloads), so run it in a thread."""
+    model = get_model()
+    return model, model.suggest(items, top_k)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="E-Cycle classification suggestion model")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    train_parser = subparsers.add_parser("train", help="Train the model from the database and static catalog")
+    train_parser.add_argument("--output", default=SUGGEST_MODEL_PATH, help="Model file to write")
+    args = parser.parse_args(argv)
+
+    if args.command == "train":
+        with default_engine.connect() as conn:
+            model = train_from_database(conn)
+        save_model(model, args.output)
+        labels = ", ".join(f"{name}: {len(head.labels)}" for name, head in model.heads.items())
+        print(f"[SUGGEST] Trained on {model.examples} examples ({labels}), written to {args.output}")
+
+if __name__ == "__main__":
+    main()
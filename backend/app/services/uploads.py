@@ -0,0 +1,138 @@
+"""
+Content-addressed storage for uploaded images.
+
+Uploads are streamed to a temporary file in chunks while being hashed,
+then moved to uploads/<aa>/<bb>/<sha256><ext>. Identical files map to the
+same path, so a photo uploaded twice is stored once. The size limit is
+enforced both on the raw request body (UploadSizeLimitMiddleware, before
+the multipart parser has buffered it) and while copying the file.
+"""
+from typing import NamedTuple, Optional
+import hashlib
+import os
+import re
+import tempfile
+
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Multipart boundaries and headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+EXTENSION_PATTERN = re.compile(r"^\.[a-z0-9]{1,10}$")
+# A stored upload relative to UPLOAD_DIR, as laid out by content_path
+CONTENT_PATH_PATTERN = re.compile(r"[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]{1,10})?")
+
+class StoredUpload(NamedTuple):
+    path: str
+    sha256: str
+    size: int
+    deduplicated: bool
+
+def upload_too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File too large (max {MAX_UPLOAD_SIZE // (1024 * 1024)} MB)")
+
+def get_extension(filename: str) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if EXTENSION_PATTERN.match(extension) else ""
+
+def content_path(sha256: str, extension: str) -> str:
+    return f"{UPLOAD_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}"
+
+def stored_upload_path(reference: Optional[str]) -> Optional[str]:
+    """
+    File path of a stored upload given as a URL ("/uploads/aa/bb/<sha256>.jpg") or a
+    path under UPLOAD_DIR. None for anything else: external URLs, partial uploads in
+    tmp/, derivatives and paths that would leave UPLOAD_DIR.
+    """
+    if not reference:
+        return None
+    if reference.startswith("/uploads/"):
+        relative = reference[len("/uploads/"):]
+    elif reference.startswith(UPLOAD_DIR + "/"):
+        relative = reference[len(UPLOAD_DIR) + 1:]
+    else:
+        return None
+    if not CONTENT_PATH_PATTERN.fullmatch(relative):
+        return None
+    return f"{UPLOAD_DIR}/{relative}"
+
+def _finalize(temp_path: str, final_path: str) -> bool:
+    """Move the temp file into place; return True if identical content was already stored."""
+    if os.path.exists(final_path):
+        os.remove(temp_path)
+        return True
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    os.replace(temp_path, final_path)
+    return False
+
+async def store_upload(file: UploadFile) -> StoredUpload:
+    temp_dir = os.path.join(UPLOAD_DIR, "tmp")
+    os.makedirs(temp_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_UPLOAD_SIZE:
+                    raise upload_too_large()
+                hasher.update(chunk)
+                await run_in_threadpool(buffer.write, chunk)
+        sha256 = hasher.hexdigest()
+        final_path = content_path(sha256, get_extension(file.filename))
+        deduplicated = await run_in_threadpool(_finalize, temp_path, final_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return StoredUpload(final_path, sha256, size, deduplicated)
+
+class UploadSizeLimitMiddleware:
+    """Reject request bodies larger than max_body_size on the given path prefixes as they stream in."""
+
+    def __init__(self, app, path_prefixes, max_body_size: int = MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD):
+        self.app = app
+        self.path_prefixes = tuple(path_prefixes)
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_body_size:
+                await self.reject(send)
+                return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    # Raised inside the route's body parsing, so FastAPI turns it into a 413 response
+                    raise upload_too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def reject(self, send):
+        error = upload_too_large()
+        body = ('{"detail":"%s"}' % error.detail).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,75 @@
+"""
+Filtered user queries for the admin listing, and streamed CSV/NDJSON exports.
+
+Exports read users through a server-side cursor (yield_per) in batches of
+EXPORT_BATCH_SIZE and encode each batch as it arrives, so memory stays
+flat however many users match.
+"""
+from datetime import datetime
+from typing import AsyncIterator, Optional
+import csv
+import io
+
+import orjson
+from sqlalchemy import or_, select
+
+from app.core.database import AsyncSessionLocal, User
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = ("id", "email", "username", "full_name", "phone", "address", "is_admin", "created_at")
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest string greater than every string starting with prefix, None if there is none."""
+    while prefix and prefix[-1] == "\U0010ffff":
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def starts_with(column, prefix: str):
+    # A range instead of LIKE, which SQLite cannot answer from the column's index
+    upper = prefix_upper_bound(prefix)
+    if upper is None:
+        return column >= prefix
+    return (column >= prefix) & (column < upper)
+
+def users_query(
+    is_admin: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    prefix: Optional[str] = None,
+):
+    query = select(User)
+    if is_admin is not None:
+        query = query.filter(User.is_admin == is_admin)
+    if created_after is not None:
+        query = query.filter(User.created_at >= created_after)
+    if created_before is not None:
+        query = query.filter(User.created_at < created_before)
+    if prefix:
+        query = query.filter(or_(
+            starts_with(User.email, prefix),
+            starts_with(User.username, prefix)
+        ))
+    return query
+
+def encode_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(value.isoformat() if isinstance(value, datetime) else value for value in row)
+    return buffer.getvalue().encode("utf-8")
+
+def encode_ndjson(rows) -> bytes:
+    return b"".join(orjson.dumps(dict(zip(EXPORT_COLUMNS, row))) + b"\n" for row in rows)
+
+async def stream_users(query, export_format: str) -> AsyncIterator[bytes]:
+    encode = encode_csv if export_format == "csv" else encode_ndjson
+    if export_format == "csv":
+        yield encode_csv([EXPORT_COLUMNS])
+    # Plain column rows rather than User objects, so nothing accumulates in the session
+    query = query.with_only_columns(*(getattr(User, column) for column in EXPORT_COLUMNS))
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.order_by(User.id).execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for batch in result.partitions():
+            yield encode(batch)
@@ -0,0 +1,141 @@
+"""
+In-memory spatial index over the vendors table.
+
+Active vendors are bucketed into a latitude/longitude grid of
+VENDOR_GRID_CELL_DEGREES cells. A "nearest N vendors accepting X within R
+km" query only visits the cells overlapping the R km bounding box around
+the caller, computes great-circle distances for the vendors in them and
+keeps the N closest, so its cost depends on how many vendors are nearby,
+not on how many are registered.
+
+The index is rebuilt from the table when the vendors version counter moves
+(any committed vendor write in this process) and at least every
+VENDOR_INDEX_REFRESH_SECONDS, to pick up writes made by other processes.
+"""
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+import heapq
+import math
+import os
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import Vendor
+from app.core.versions import table_versions
+
+VENDOR_GRID_CELL_DEGREES = float(os.getenv("VENDOR_GRID_CELL_DEGREES", "0.1"))
+VENDOR_INDEX_REFRESH_SECONDS = float(os.getenv("VENDOR_INDEX_REFRESH_SECONDS", "60"))
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+class VendorEntry(NamedTuple):
+    id: int
+    name: str
+    location: Optional[str]
+    latitude: float
+    longitude: float
+    accepts: FrozenSet[str]
+    rating: float
+    pickup: bool
+    daily_capacity: int
+
+    def matches(self, item_type: Optional[str], pickup: Optional[bool]) -> bool:
+        return (item_type is None or item_type in self.accepts) and (pickup is None or self.pickup == pickup)
+
+    def to_dict(self, distance_km: Optional[float] = None) -> dict:
+        data = self._asdict()
+        data["accepts"] = sorted(self.accepts)
+        data["is_active"] = True
+        data["distance_km"] = None if distance_km is None else round(distance_km, 2)
+        return data
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+class VendorIndex:
+    def __init__(self, vendors: Iterable[VendorEntry], cell_degrees: float = VENDOR_GRID_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.cells: Dict[Tuple[int, int], List[VendorEntry]] = {}
+        self.by_rating: List[VendorEntry] = []
+        for vendor in vendors:
+            self.cells.setdefault(self.cell(vendor.latitude, vendor.longitude), []).append(vendor)
+            self.by_rating.append(vendor)
+        self.by_rating.sort(key=lambda vendor: (-vendor.rating, vendor.name))
+
+    def cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def top_rated(self, item_type: Optional[str] = None, pickup: Optional[bool] = None, limit: int = 20) -> List[VendorEntry]:
+        matching = (vendor for vendor in self.by_rating if vendor.matches(item_type, pickup))
+        return [vendor for _, vendor in zip(range(limit), matching)]
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        item_type: Optional[str] = None,
+        pickup: Optional[bool] = None,
+        limit: int = 20
+    ) -> List[Tuple[float, VendorEntry]]:
+        """(distance_km, vendor) for the closest matching vendors within radius_km, nearest first."""
+        # Bounding box of the search circle in cells (no wrap-around at the antimeridian)
+        lat_span = radius_km / KM_PER_DEGREE
+        lon_span = min(180.0, radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 1e-6)))
+        min_row, min_column = self.cell(latitude - lat_span, longitude - lon_span)
+        max_row, max_column = self.cell(latitude + lat_span, longitude + lon_span)
+
+        if (max_row - min_row + 1) * (max_column - min_column + 1) > len(self.cells):
+            # Huge radius or sparse index: scanning the occupied cells is cheaper
+            buckets = [
+                vendors for (row, column), vendors in self.cells.items()
+                if min_row <= row <= max_row and min_column <= column <= max_column
+            ]
+        else:
+            buckets = [
+                self.cells[(row, column)]
+                for row in range(min_row, max_row + 1)
+                for column in range(min_column, max_column + 1)
+                if (row, column) in self.cells
+            ]
+
+        candidates = []
+        for vendors in buckets:
+            for vendor in vendors:
+                if not vendor.matches(item_type, pickup):
+                    continue
+                distance = haversine_km(latitude, longitude, vendor.latitude, vendor.longitude)
+                if distance <= radius_km:
+                    candidates.append((distance, vendor.id, vendor))
+        return [(distance, vendor) for distance, _, vendor in heapq.nsmallest(limit, candidates)]
+
+def vendor_entry(vendor) -> VendorEntry:
+    return VendorEntry(
+        id=vendor.id,
+        name=vendor.name,
+        location=vendor.location,
+        latitude=vendor.latitude,
+        longitude=vendor.longitude,
+        accepts=frozenset(vendor.accepts or ()),
+        rating=vendor.rating or 0.0,
+        pickup=bool(vendor.pickup),
+        daily_capacity=vendor.daily_capacity or 0,
+    )
+
+_vendor_index: Optional[VendorIndex] = None
+_vendor_index_version: Optional[int] = None
+_vendor_index_built_at = 0.0
+
+async def get_vendor_index(db: AsyncSession) -> VendorIndex:
+    global _vendor_index, _vendor_index_version, _vendor_index_built_at
+    version, _ = table_versions.get("vendors")
+    if (_vendor_index is None or version != _vendor_index_version
+            or time.monotonic() - _vendor_index_built_at > VENDOR_INDEX_REFRESH_SECONDS):
+        vendors = (await db.execute(select(Vendor).filter(Vendor.is_active == True))).scalars().all()
+        _vendor_index = VendorIndex(vendor_entry(vendor) for vendor in vendors)
+        _vendor_index_version = version
+        _vendor_index_built_at = time.monotonic()
+    return _vendor_index
@@ -1,6 +1,10 @@
 """
 Static marketplace products for demo purposes
 """
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from types import MappingProxyType
+from typing import Optional, Tuple
 
 STATIC_PRODUCTS = [
     {
@@ -258,4 +262,51 @@ STATIC_PRODUCTS = [
         "is_selling": True,
         "status": "available"
     }
-]
\ No newline at end of file
+]
+
+# Static products have no creation time of their own; a fixed one keeps ordering and responses stable
+STATIC_PRODUCTS_CREATED_AT = datetime(2024, 1, 1)
+
+class StaticCatalogIndex:
+    """
+    Read-only lookup structures over the static catalog, built once at import.
+    Products are exposed as read-only mappings; each bucket is a price-sorted
+    tuple with a parallel tuple of prices so range filters are a bisect.
+    """
+
+    def __init__(self, products):
+        ordered = tuple(sorted((MappingProxyType(dict(product)) for product in products),
+                               key=lambda product: (product['price'], product['id'])))
+        self.by_id = MappingProxyType({product['id']: product for product in ordered})
+        self.ids = tuple(product['id'] for product in ordered)
+        self.by_price = ordered
+        self.prices = tuple(product['price'] for product in ordered)
+
+        buckets = {}
+        for product in ordered:
+            buckets.setdefault(product['category_id'], []).append(product)
+        self.by_category = MappingProxyType({category_id: tuple(items) for category_id, items in buckets.items()})
+        self.category_prices = MappingProxyType({
+            category_id: tuple(product['price'] for product in items)
+            for category_id, items in self.by_category.items()
+        })
+
+    def get(self, product_id: int) -> Optional[MappingProxyType]:
+        return self.by_id.get(product_id)
+
+    def filter(self, is_selling: Optional[bool] = None, category_id: Optional[int] = None,
+               min_price: Optional[float] = None, max_price: Optional[float] = None) -> Tuple[MappingProxyType, ...]:
+        # Every static product is a listing for sale
+        if is_selling is not None and not is_selling:
+            return ()
+        if category_id is not None:
+            items = self.by_category.get(category_id, ())
+            prices = self.category_prices.get(category_id, ())
+        else:
+            items = self.by_price
+            prices = self.prices
+        low = bisect_left(prices, min_price) if min_price is not None else 0
+        high = bisect_right(prices, max_price) if max_price is not None else len(prices)
+        return items[low:high]
+
+STATIC_CATALOG = StaticCatalogIndex(STATIC_PRODUCTS)
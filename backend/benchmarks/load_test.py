@@ -0,0 +1,256 @@
+"""
+In-process load test for the E-Cycle API.
+
+Drives the FastAPI app from main.py directly over ASGI (no network, no
+uvicorn) against a throwaway SQLite database, runs scripted user journeys
+at a configurable concurrency and reports requests/second plus p50/p95/p99
+latency per endpoint. Results are written as JSON and can be compared with
+a stored baseline to catch regressions before a deploy.
+
+Requires httpx (pip install httpx). Run from the backend directory:
+
+    python -m benchmarks.load_test --concurrency 20 --iterations 10
+    python -m benchmarks.load_test --output bench.json --baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def sample_image() -> bytes:
+    """A real JPEG, so the upload also exercises thumbnail generation."""
+    import io
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.effect_noise((1600, 1200), 64).convert("RGB").save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+SAMPLE_IMAGE = sample_image()
+
+class LatencyRecorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(self, client, name: str, method: str, url: str, expected=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception:
+            self.errors[name] += 1
+            raise
+        self.samples[name].append(time.perf_counter() - started)
+        if response.status_code not in expected:
+            self.errors[name] += 1
+        return response
+
+def percentile(sorted_samples: List[float], percent: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    # Nearest-rank percentile
+    rank = math.ceil(percent / 100.0 * len(sorted_samples)) - 1
+    return sorted_samples[max(0, min(rank, len(sorted_samples) - 1))]
+
+def summarize(recorder: LatencyRecorder, elapsed: float) -> dict:
+    endpoints = {}
+    total_requests = 0
+    for name, samples in sorted(recorder.samples.items()):
+        ordered = sorted(samples)
+        total_requests += len(ordered)
+        endpoints[name] = {
+            "requests": len(ordered),
+            "errors": recorder.errors.get(name, 0),
+            "rps": len(ordered) / elapsed if elapsed else 0.0,
+            "mean_ms": sum(ordered) / len(ordered) * 1000,
+            "p50_ms": percentile(ordered, 50) * 1000,
+            "p95_ms": percentile(ordered, 95) * 1000,
+            "p99_ms": percentile(ordered, 99) * 1000,
+        }
+    return {
+        "elapsed_seconds": elapsed,
+        "total_requests": total_requests,
+        "total_rps": total_requests / elapsed if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+def auth_headers(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+async def register_and_login(client, recorder: LatencyRecorder) -> str:
+    suffix = uuid.uuid4().hex[:12]
+    email = f"bench_{suffix}@example.com"
+    await recorder.request(client, "POST /auth/register", "POST", "/auth/register", json={
+        "email": email, "username": f"bench_{suffix}", "password": "bench-password", "full_name": "Bench User",
+    })
+    response = await recorder.request(client, "POST /auth/login", "POST", "/auth/login", json={
+        "email": email, "password": "bench-password",
+    })
+    return response.json()["access_token"]
+
+async def create_classification(client, recorder: LatencyRecorder, token: str) -> int:
+    response = await recorder.request(client, "POST /classify/", "POST", "/classify/", headers=auth_headers(token), json={
+        "item_name": "Old smartphone", "description": "Cracked screen, battery OK",
+        "condition": "working", "category": "marketplace",
+    })
+    return response.json()["id"]
+
+async def scenario_onboarding(client, recorder: LatencyRecorder, state: dict):
+    """register -> login -> classify -> upload image"""
+    token = await register_and_login(client, recorder)
+    classification_id = await create_classification(client, recorder, token)
+    await recorder.request(
+        client, "POST /classify/upload-image/{id}", "POST", f"/classify/upload-image/{classification_id}",
+        headers=auth_headers(token), files={"file": ("photo.jpg", SAMPLE_IMAGE, "image/jpeg")},
+    )
+
+async def scenario_browse(client, recorder: LatencyRecorder, state: dict):
+    """browse and filter the marketplace"""
+    await recorder.request(client, "GET /marketplace/categories", "GET", "/marketplace/categories")
+    await recorder.request(client, "GET /marketplace/", "GET", "/marketplace/")
+    await recorder.request(client, "GET /marketplace/?category_id", "GET", "/marketplace/", params={
+        "category_id": random.randint(1, 6), "min_price": 1000, "max_price": 150000, "sort": "price_asc",
+    })
+    await recorder.request(client, "GET /marketplace/search", "GET", "/marketplace/search", params={
+        "q": random.choice(["iphone", "laptop", "samsung", "gaming", "wireless"]),
+    })
+
+async def scenario_purchase(client, recorder: LatencyRecorder, state: dict):
+    """purchase -> download receipt"""
+    token = state["buyer_token"]
+    response = await recorder.request(client, "POST /marketplace/purchase", "POST", "/marketplace/purchase",
+                                      headers=auth_headers(token), json={
+        "marketplace_item_id": random.choice(state["static_item_ids"]),
+        "shipping_address": "221B Baker Street", "phone_number": "+91 90000 00000", "payment_method": "upi",
+    })
+    purchase_id = response.json()["id"]
+    await recorder.request(client, "GET /marketplace/receipt/{id}", "GET", f"/marketplace/receipt/{purchase_id}",
+                           headers=auth_headers(token))
+
+async def scenario_dashboard(client, recorder: LatencyRecorder, state: dict):
+    """the dashboard page"""
+    await recorder.request(client, "GET /me/dashboard", "GET", "/me/dashboard", headers=auth_headers(state["buyer_token"]))
+
+SCENARIOS = {
+    "onboarding": scenario_onboarding,
+    "browse": scenario_browse,
+    "purchase": scenario_purchase,
+    "dashboard": scenario_dashboard,
+}
+
+async def prepare_state(client) -> dict:
+    """Seed a buyer with some history so the dashboard and purchase scenarios have data."""
+    setup = LatencyRecorder()
+    token = await register_and_login(client, setup)
+    for _ in range(5):
+        await create_classification(client, setup, token)
+    await client.get("/marketplace/categories")
+    listing = await client.get("/marketplace/", params={"limit": 200})
+    static_item_ids = [item["id"] for item in listing.json() if item["id"] >= 1000]
+    return {"buyer_token": token, "static_item_ids": static_item_ids}
+
+async def run_load_test(scenarios: List[str], concurrency: int, iterations: int) -> dict:
+    import httpx
+    from main import app
+
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            state = await prepare_state(client)
+            recorder = LatencyRecorder()
+
+            async def virtual_user():
+                for _ in range(iterations):
+                    for name in scenarios:
+                        try:
+                            await SCENARIOS[name](client, recorder, state)
+                        except Exception:
+                            # Already counted as an error; keep the user going
+                            pass
+
+            started = time.perf_counter()
+            await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+    finally:
+        await app.router.shutdown()
+
+    result = summarize(recorder, elapsed)
+    result["config"] = {"scenarios": scenarios, "concurrency": concurrency, "iterations": iterations}
+    return result
+
+def compare_with_baseline(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Return a message for every endpoint whose p95 or error count got worse than the baseline allows."""
+    regressions = []
+    for name, current in result["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        limit = previous["p95_ms"] * (1 + tolerance)
+        if current["p95_ms"] > limit:
+            regressions.append(f"{name}: p95 {current['p95_ms']:.1f}ms > {limit:.1f}ms (baseline {previous['p95_ms']:.1f}ms)")
+        if current["errors"] > previous["errors"]:
+            regressions.append(f"{name}: {current['errors']} errors (baseline {previous['errors']})")
+    return regressions
+
+def print_report(result: dict):
+    print(f"\n{'endpoint':40s} {'reqs':>6s} {'err':>4s} {'rps':>8s} {'p50':>8s} {'p95':>8s} {'p99':>8s}")
+    print("-" * 88)
+    for name, stats in result["endpoints"].items():
+        print(f"{name:40s} {stats['requests']:6d} {stats['errors']:4d} {stats['rps']:8.1f} "
+              f"{stats['p50_ms']:7.1f}ms {stats['p95_ms']:7.1f}ms {stats['p99_ms']:7.1f}ms")
+    print("-" * 88)
+    print(f"{result['total_requests']} requests in {result['elapsed_seconds']:.2f}s ({result['total_rps']:.1f} req/s)\n")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="In-process load test for the E-Cycle API")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma separated: " + ", ".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=10, help="Virtual users running in parallel")
+    parser.add_argument("--iterations", type=int, default=5, help="Scenario rounds per virtual user")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 slowdown vs baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    # Run against a scratch database and uploads directory, never the real ones
+    workdir = tempfile.mkdtemp(prefix="ecycle-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.chdir(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+
+    result = asyncio.run(run_load_test(scenarios, args.concurrency, args.iterations))
+    print_report(result)
+
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {output}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Per-row cost of encoding list responses.
+
+Compares FastAPI's regular path for a list endpoint (validate every row
+against response_model, jsonable_encoder, stdlib json) with the
+SchemaSerializer + orjson path in app.core.responses, on in-memory rows so
+the database is not part of the measurement. Run from the backend directory:
+
+    python -m benchmarks.serialization --rows 1000 --repeat 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def build_rows(count: int):
+    from app.core.database import Classification, MarketplaceItem
+
+    now = datetime(2024, 1, 1)
+    marketplace_items = [
+        MarketplaceItem(
+            id=i, user_id=1, classification_id=i, title=f"Used phone {i}", brand="Brand", model=f"Model {i}",
+            description="Lightly used, original box and charger included", price=10000.0 + i, original_price=15000.0,
+            category_id=1, images=[f"https://images.example.com/{i}.jpg"], image_derivatives=[{}],
+            specifications={"RAM": "8GB", "Storage": "128GB", "Color": "Black"}, warranty_info="6 months",
+            seller_name="Seller", seller_rating=4.5, is_selling=True, status="available",
+            created_at=now + timedelta(minutes=i),
+        )
+        for i in range(count)
+    ]
+    classifications = [
+        Classification(
+            id=i, user_id=1, item_name=f"Old laptop {i}", description="Battery does not charge",
+            condition="dead", category="disposal", image_path=None, image_derivatives={}, created_at=now + timedelta(minutes=i),
+        )
+        for i in range(count)
+    ]
+    return marketplace_items, classifications
+
+async def regular_path(rows, schema) -> bytes:
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    field = create_response_field(name="Response", type_=List[schema])
+    content = await serialize_response(field=field, response_content=rows, is_coroutine=True)
+    return JSONResponse(content).body
+
+def time_per_row(func, rows, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(rows)
+    return (time.perf_counter() - started) / (repeat * len(rows))
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Per-row cost of list response encoding")
+    parser.add_argument("--rows", type=int, default=1000, help="Rows per response")
+    parser.add_argument("--repeat", type=int, default=20, help="Responses encoded per measurement")
+    args = parser.parse_args(argv)
+
+    # Importing the app modules needs a database URL; never touch the real one
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='ecycle-bench-'), 'bench.db')}")
+    sys.path.insert(0, BACKEND_DIR)
+    from app.api.classify import classification_serializer
+    from app.api.marketplace import MarketplaceItemResponse, marketplace_item_serializer
+    from app.schemas.classify import ClassificationResponse
+
+    marketplace_items, classifications = build_rows(args.rows)
+    cases = [
+        ("marketplace items", marketplace_items, MarketplaceItemResponse, marketplace_item_serializer),
+        ("classifications", classifications, ClassificationResponse, classification_serializer),
+    ]
+
+    print(f"\n{'schema':20s} {'regular':>12s} {'fast':>12s} {'speedup':>8s}   ({args.rows} rows x {args.repeat})")
+    print("-" * 60)
+    for name, rows, schema, serializer in cases:
+        regular = time_per_row(lambda batch: asyncio.run(regular_path(batch, schema)), rows, args.repeat)
+        fast = time_per_row(serializer.dumps, rows, args.repeat)
+        print(f"{name:20s} {regular * 1e6:9.2f} us {fast * 1e6:9.2f} us {regular / fast:7.1f}x")
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,23 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from app.api import auth, classify, disposal, donate, marketplace, repair, admin
-from app.core.database import create_tables, engine
+from app.api import auth, classify, disposal, donate, marketplace, repair, admin, me
+from app.core.database import create_tables, engine, async_engine
+from app.core.migrations import run_migrations, RUN_MIGRATIONS_ON_STARTUP
+from app.core.security import shutdown_hash_executor
+from app.services.images import shutdown_image_executor
+from app.services.receipts import shutdown_receipt_executor
+from app.services.search import refresh_static_search_index
+from app.services.suggestions import get_model
+from app.services.uploads import UploadSizeLimitMiddleware, UPLOAD_DIR
 from sqlalchemy import text
 import os
 
 app = FastAPI(title="E-Cycle API", version="1.0.0")
 
+# Added before CORS so oversized-upload rejections still carry CORS headers
+app.add_middleware(UploadSizeLimitMiddleware, path_prefixes=["/classify/upload-image", "/classify/batch"])
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -20,11 +30,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
 
 # Create uploads directory if it doesn't exist
-os.makedirs("uploads", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
 
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(classify.router, prefix="/classify", tags=["classify"])
@@ -33,6 +44,7 @@ app.include_router(donate.router, prefix="/donate", tags=["donate"])
 app.include_router(marketplace.router, prefix="/marketplace", tags=["marketplace"])
 app.include_router(repair.router, prefix="/repair", tags=["repair"])
 app.include_router(admin.router, prefix="/admin", tags=["admin"])
+app.include_router(me.router, prefix="/me", tags=["me"])
 
 @app.on_event("startup")
 async def startup_event():
@@ -41,16 +53,30 @@ async def startup_event():
             conn.execute(text("SELECT 1"))
         print("\n" + "="*50)
         print("[SUCCESS] Database connected successfully!")
-        print("[SUCCESS] Database: ecycle.db")
+        print(f"[SUCCESS] Database: {engine.url.render_as_string(hide_password=True)}")
         print("="*50 + "\n")
         create_tables()
         print("[SUCCESS] Database tables created/verified\n")
+        if RUN_MIGRATIONS_ON_STARTUP:
+            run_migrations()
+            with engine.begin() as conn:
+                refresh_static_search_index(conn)
+            print("[SUCCESS] Database migrations applied\n")
     except Exception as e:
         print("\n" + "="*50)
         print("[ERROR] Database connection failed!")
         print(f"[ERROR] Error: {str(e)}")
         print("="*50 + "\n")
         raise
+    # Load the suggestion model now rather than on the first /classify/suggest request
+    get_model()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_hash_executor()
+    shutdown_image_executor()
+    shutdown_receipt_executor()
+    await async_engine.dispose()
 
 @app.get("/")
 async def root():
@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+
+# Settings are read at import time, so point everything at a scratch directory first
+TEST_DIR = tempfile.mkdtemp(prefix="ecycle-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'ecycle.db')}"
+os.environ["UPLOAD_DIR"] = os.path.join(TEST_DIR, "uploads")
+os.environ["RECEIPT_DIR"] = os.path.join(TEST_DIR, "receipts")
+os.environ["SUGGEST_MODEL_PATH"] = os.path.join(TEST_DIR, "models", "suggestions.npz")
+os.environ["PASSWORD_HASH_ITERATIONS"] = "1000"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import itertools
+
+import pytest
+from fastapi.testclient import TestClient
+
+_user_numbers = itertools.count(1)
+
+@pytest.fixture(scope="session")
+def client():
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def make_user(client):
+    """Register a new user and return their Authorization headers."""
+    def make_user():
+        number = next(_user_numbers)
+        email = f"user{number}@example.com"
+        response = client.post("/auth/register", json={
+            "email": email, "username": f"user{number}", "password": "secret", "full_name": f"User {number}"
+        })
+        assert response.status_code == 200, response.text
+        token = client.post("/auth/login", json={"email": email, "password": "secret"}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+    return make_user
+
+@pytest.fixture
+def admin_headers(client):
+    client.post("/admin/init-admin")
+    token = client.post("/auth/login", json={"email": "admin@ecycle.com", "password": "admin123"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def classification(client, make_user):
+    headers = make_user()
+    response = client.post("/classify/", json={
+        "item_name": "Old phone", "description": "Samsung Galaxy phone", "condition": "working", "category": "marketplace"
+    }, headers=headers)
+    assert response.status_code == 200, response.text
+    return headers, response.json()
@@ -0,0 +1,29 @@
+from app.services.user_export import prefix_upper_bound
+
+def register(client, username):
+    response = client.post("/auth/register", json={
+        "email": f"{username}@example.org", "username": username, "password": "secret", "full_name": username
+    })
+    assert response.status_code == 200, response.text
+
+def test_prefix_upper_bound():
+    assert prefix_upper_bound("ab") == "ac"
+    assert prefix_upper_bound("a\U0010ffff") == "b"
+    assert prefix_upper_bound("\U0010ffff") is None
+
+def test_user_listing_prefix_is_literal(client, admin_headers):
+    for username in ("pre_fix", "preXfix", "pre%", "prf"):
+        register(client, username)
+
+    def listed(prefix):
+        response = client.get("/admin/users", params={"prefix": prefix}, headers=admin_headers)
+        assert response.status_code == 200, response.text
+        return sorted(user["username"] for user in response.json())
+
+    assert listed("pre_") == ["pre_fix"]
+    assert listed("pre%") == ["pre%"]
+    assert listed("pre") == ["pre%", "preXfix", "pre_fix"]
+
+    exported = client.get("/admin/users/export", params={"prefix": "pre_", "format": "ndjson"}, headers=admin_headers)
+    lines = exported.text.splitlines()
+    assert len(lines) == 1 and '"username":"pre_fix"' in lines[0]
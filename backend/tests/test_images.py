@@ -0,0 +1,112 @@
+import io
+import os
+import sqlite3
+
+from PIL import Image
+from sqlalchemy import text
+
+from app.core.database import create_db_engine
+from app.core.migrations import run_migrations
+from app.services.uploads import UPLOAD_DIR
+from tests.test_migrations import BASELINE_SCHEMA
+
+def jpeg_bytes(color=(200, 30, 30), size=(640, 480)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+def test_upload_records_derivatives(client, classification):
+    headers, created = classification
+    assert created["image_derivatives"] == {}
+
+    response = client.post(
+        f"/classify/upload-image/{created['id']}",
+        files={"file": ("photo.jpg", jpeg_bytes(), "image/jpeg")},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+
+    # The background task has run by the time TestClient returns; the list reads the stored URLs
+    listed = {row["id"]: row for row in client.get("/classify/", headers=headers).json()}
+    derivatives = listed[created["id"]]["image_derivatives"]
+    assert set(derivatives) == {"thumbnail", "medium"}
+    thumbnail = derivatives["thumbnail"]["webp"]
+    assert client.get(thumbnail).status_code == 200
+
+    image_url = "/uploads/" + os.path.relpath(response.json()["path"], UPLOAD_DIR)
+    item = client.post("/marketplace/", json={
+        "classification_id": created["id"], "title": "Phone", "brand": "Samsung", "model": "S10",
+        "description": "Works", "price": 100, "category_id": 1,
+        "images": [image_url, "https://images.example.com/external.jpg"],
+    }, headers=headers)
+    assert item.status_code == 200, item.text
+    assert item.json()["image_derivatives"] == [derivatives, {}]
+
+def test_migration_backfills_derivatives_from_disk(tmp_path):
+    stem = os.path.join(UPLOAD_DIR, "ab", "cd", "e" * 64)
+    os.makedirs(os.path.dirname(stem), exist_ok=True)
+    for size in ("thumbnail", "medium"):
+        for image_format in ("webp", "jpeg"):
+            open(f"{stem}_{size}.{image_format}", "wb").close()
+
+    connection = sqlite3.connect(tmp_path / "baseline.db")
+    connection.executescript(BASELINE_SCHEMA)
+    connection.execute(
+        "INSERT INTO classifications (id, user_id, item_name, image_path) VALUES (1, 1, 'with thumbnails', ?), (2, 1, 'no image', NULL)",
+        (f"{stem}.jpg",),
+    )
+    connection.execute(
+        "INSERT INTO marketplace_items (id, user_id, title, images) VALUES (1, 1, 'listing', ?)",
+        (f'["/uploads/ab/cd/{"e" * 64}.jpg", "https://images.example.com/x.jpg", "/uploads/ab/cd/../cd/{"e" * 64}.jpg"]',),
+    )
+    connection.commit()
+    connection.close()
+
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    run_migrations(bind=engine)
+    with engine.connect() as conn:
+        classifications = dict(conn.execute(text("SELECT id, image_derivatives FROM classifications")).all())
+        listing = conn.execute(text("SELECT image_derivatives FROM marketplace_items WHERE id = 1")).scalar()
+    expected_thumbnail = f'"/uploads/ab/cd/{"e" * 64}_thumbnail.webp"'
+    assert expected_thumbnail in classifications[1]
+    assert classifications[2] == "{}"
+    assert expected_thumbnail in listing and listing.endswith(", {}, {}]")
+
+def create_listing(client, headers, classification_id, images):
+    return client.post("/marketplace/", json={
+        "classification_id": classification_id, "title": "Phone", "brand": "Samsung", "model": "S10",
+        "description": "Works", "price": 100, "category_id": 1, "images": images,
+    }, headers=headers)
+
+def test_listing_images_outside_content_storage_are_never_opened(client, classification, tmp_path):
+    headers, created = classification
+    outside = tmp_path / "x.jpg"
+    outside.write_bytes(jpeg_bytes())
+    escaping = "/uploads/" + os.path.relpath(outside, UPLOAD_DIR)
+    assert ".." in escaping
+
+    response = create_listing(client, headers, created["id"], [escaping, "/uploads/tmp/partial.jpg"])
+    assert response.status_code == 200, response.text
+    assert response.json()["image_derivatives"] == [{}, {}]
+    assert sorted(os.listdir(tmp_path)) == ["x.jpg"]
+
+def test_listing_derivatives_are_rendered_in_the_background(client, classification):
+    headers, created = classification
+    upload = client.post(
+        f"/classify/upload-image/{created['id']}",
+        files={"file": ("photo.jpg", jpeg_bytes(color=(10, 120, 240)), "image/jpeg")},
+        headers=headers,
+    ).json()
+    stem = os.path.splitext(upload["path"])[0]
+    for size in ("thumbnail", "medium"):
+        for image_format in ("webp", "jpeg"):
+            os.remove(f"{stem}_{size}.{image_format}")
+
+    image_url = "/uploads/" + os.path.relpath(upload["path"], UPLOAD_DIR)
+    response = create_listing(client, headers, created["id"], [image_url])
+    assert response.status_code == 200, response.text
+    # Not rendered in the request; the background task has run by the time TestClient returns
+    assert response.json()["image_derivatives"] == [{}]
+    listed = {item["id"]: item for item in client.get("/marketplace/my-items", headers=headers).json()}
+    derivatives = listed[response.json()["id"]]["image_derivatives"]
+    assert client.get(derivatives[0]["medium"]["jpeg"]).status_code == 200
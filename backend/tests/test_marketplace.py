@@ -0,0 +1,20 @@
+from app.core.pagination import encode_cursor
+from app.static_products import STATIC_PRODUCTS_CREATED_AT
+
+def test_newest_cursor_with_utc_offset(client):
+    first_page = client.get("/marketplace/", params={"limit": 5})
+    assert first_page.status_code == 200
+
+    # Same instant as the static products' created_at, written with an offset
+    shifted = STATIC_PRODUCTS_CREATED_AT.replace(hour=5, minute=30).isoformat() + "+05:30"
+    cursor = encode_cursor({"sort": "newest", "value": shifted, "source": 0, "id": 0})
+    response = client.get("/marketplace/", params={"cursor": cursor, "limit": 5})
+    assert response.status_code == 200, response.text
+    naive = encode_cursor({"sort": "newest", "value": STATIC_PRODUCTS_CREATED_AT.isoformat(), "source": 0, "id": 0})
+    assert response.json() == client.get("/marketplace/", params={"cursor": naive, "limit": 5}).json()
+
+def test_unparseable_cursor_is_rejected(client):
+    cursor = encode_cursor({"sort": "newest", "value": "yesterday", "source": 0, "id": 0})
+    response = client.get("/marketplace/", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,219 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import inspect, select, text
+from sqlalchemy.dialects import sqlite
+
+from app.core.database import MarketplaceItem, create_db_engine, marketplace_discount, spec_number
+from app.core.migrations import MIGRATIONS, get_current_version, run_migrations
+
+# Schema created by the first release (create_all before any migration existed)
+BASELINE_SCHEMA = """
+    CREATE TABLE classifications (
+        id INTEGER NOT NULL,
+        user_id INTEGER,
+        item_name VARCHAR,
+        description TEXT,
+        condition VARCHAR,
+        image_path VARCHAR,
+        category VARCHAR,
+        created_at DATETIME,
+        PRIMARY KEY (id)
+    );
+    CREATE TABLE disposals (
+        id INTEGER NOT NULL,
+        user_id INTEGER,
+        classification_id INTEGER,
+        disposal_method VARCHAR,
+        pickup_date VARCHAR,
+        pickup_location TEXT,
+        vendor_filter VARCHAR,
+        selected_vendor VARCHAR,
+        status VARCHAR,
+        created_at DATETIME,
+        PRIMARY KEY (id)
+    );
+    CREATE TABLE donations (
+        id INTEGER NOT NULL,
+        user_id INTEGER,
+        classification_id INTEGER,
+        location TEXT,
+        organization VARCHAR,
+        status VARCHAR,
+        created_at DATETIME,
+        PRIMARY KEY (id)
+    );
+    CREATE TABLE marketplace_items (
+        id INTEGER NOT NULL,
+        user_id INTEGER,
+        classification_id INTEGER,
+        title VARCHAR,
+        brand VARCHAR,
+        model VARCHAR,
+        description TEXT,
+        price FLOAT,
+        original_price FLOAT,
+        category_id INTEGER,
+        images TEXT,
+        specifications TEXT,
+        warranty_info VARCHAR,
+        seller_name VARCHAR,
+        seller_rating FLOAT,
+        is_selling BOOLEAN,
+        status VARCHAR,
+        created_at DATETIME,
+        PRIMARY KEY (id)
+    );
+    CREATE TABLE product_categories (
+        id INTEGER NOT NULL,
+        name VARCHAR,
+        icon VARCHAR,
+        created_at DATETIME,
+        PRIMARY KEY (id)
+    );
+    CREATE TABLE purchases (
+        id INTEGER NOT NULL,
+        user_id INTEGER,
+        marketplace_item_id INTEGER,
+        purchase_price FLOAT,
+        shipping_address TEXT,
+        phone_number VARCHAR,
+        payment_method VARCHAR,
+        status VARCHAR,
+        receipt_generated BOOLEAN,
+        created_at DATETIME,
+        PRIMARY KEY (id)
+    );
+    CREATE TABLE repair_requests (
+        id INTEGER NOT NULL,
+        user_id INTEGER,
+        item_name VARCHAR,
+        description TEXT,
+        image_path VARCHAR,
+        repair_type VARCHAR,
+        status VARCHAR,
+        created_at DATETIME,
+        PRIMARY KEY (id)
+    );
+    CREATE TABLE users (
+        id INTEGER NOT NULL,
+        email VARCHAR,
+        username VARCHAR,
+        hashed_password VARCHAR,
+        full_name VARCHAR,
+        phone VARCHAR,
+        address TEXT,
+        is_admin BOOLEAN,
+        created_at DATETIME,
+        PRIMARY KEY (id)
+    );
+    CREATE INDEX ix_classifications_id ON classifications (id);
+    CREATE INDEX ix_disposals_id ON disposals (id);
+    CREATE INDEX ix_donations_id ON donations (id);
+    CREATE INDEX ix_marketplace_items_id ON marketplace_items (id);
+    CREATE INDEX ix_product_categories_id ON product_categories (id);
+    CREATE INDEX ix_purchases_id ON purchases (id);
+    CREATE INDEX ix_repair_requests_id ON repair_requests (id);
+    CREATE UNIQUE INDEX ix_users_email ON users (email);
+    CREATE INDEX ix_users_id ON users (id);
+    CREATE UNIQUE INDEX ix_users_username ON users (username);
+"""
+
+BASELINE_ROWS = """
+    INSERT INTO users (id, email, username, hashed_password, full_name, is_admin, created_at)
+    VALUES (1, 'old@example.com', 'old', 'x', 'Old User', 0, '2024-01-02 10:00:00');
+    INSERT INTO classifications (id, user_id, item_name, description, condition, category, created_at)
+    VALUES (1, 1, 'Old laptop', 'ThinkPad', 'working', 'marketplace', '2024-01-02 10:00:00');
+    INSERT INTO disposals (id, user_id, classification_id, disposal_method, vendor_filter, selected_vendor, status, created_at)
+    VALUES (1, 1, 1, 'pickup', 'computers', 'TechRecycle Pro', 'pending', '2024-01-02 10:00:00');
+    INSERT INTO marketplace_items (id, user_id, classification_id, title, brand, model, description, price, original_price,
+                                   category_id, images, specifications, seller_rating, is_selling, status, created_at)
+    VALUES (1, 1, 1, 'ThinkPad T480', 'Lenovo', 'T480', 'Works fine', 300.0, 1000.0,
+            2, NULL, '{"RAM": "16GB"}', 0.0, 1, 'sold', '2024-01-02 10:00:00');
+    INSERT INTO purchases (id, user_id, marketplace_item_id, purchase_price, status, receipt_generated, created_at)
+    VALUES (1, 1, 1, 300.0, 'completed', 0, '2024-01-03 12:00:00');
+"""
+
+def make_engine(tmp_path, name):
+    return create_db_engine(f"sqlite:///{tmp_path / name}")
+
+def create_baseline(tmp_path, name="baseline.db", rows=BASELINE_ROWS):
+    connection = sqlite3.connect(tmp_path / name)
+    connection.executescript(BASELINE_SCHEMA + rows)
+    connection.close()
+    return make_engine(tmp_path, name)
+
+def schema_of(engine):
+    """Columns and index names per table, plus triggers."""
+    with engine.connect() as conn:
+        inspector = inspect(conn)
+        tables = {
+            table: {column["name"] for column in inspector.get_columns(table)}
+            for table in inspector.get_table_names()
+        }
+        indexes = {
+            (row[0], row[1]) for row in conn.execute(text(
+                "SELECT tbl_name, name FROM sqlite_master WHERE type = 'index' AND name NOT LIKE 'sqlite_autoindex%'"
+            ))
+        }
+        triggers = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'"))}
+    return tables, indexes, triggers
+
+def test_migrations_are_numbered_in_order():
+    versions = [migration.version for migration in MIGRATIONS]
+    assert versions == list(range(1, len(MIGRATIONS) + 1))
+
+def test_empty_database_migrates_to_head(tmp_path):
+    engine = make_engine(tmp_path, "empty.db")
+    assert run_migrations(bind=engine) == [migration.version for migration in MIGRATIONS]
+    assert get_current_version(engine) == MIGRATIONS[-1].version
+    assert run_migrations(bind=engine) == []
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM vendors")).scalar() > 0
+
+def test_baseline_database_migrates_to_head(tmp_path):
+    engine = create_baseline(tmp_path)
+    assert run_migrations(bind=engine) == [migration.version for migration in MIGRATIONS]
+
+    fresh = make_engine(tmp_path, "fresh.db")
+    run_migrations(bind=fresh)
+    # An upgraded database ends up with the same tables, columns, indexes and triggers as a new one
+    assert schema_of(engine) == schema_of(fresh)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT images FROM marketplace_items WHERE id = 1")).scalar() == "[]"
+        stats = dict(conn.execute(text(
+            "SELECT metric || ':' || key, count FROM stat_counters WHERE metric IN ('purchases_by_day', 'marketplace_items_by_category')"
+        )).all())
+        assert stats == {"purchases_by_day:2024-01-03": 1, "marketplace_items_by_category:2": 1}
+        matches = conn.execute(text("SELECT rowid FROM marketplace_search WHERE marketplace_search MATCH 'thinkpad'")).all()
+        assert [row[0] for row in matches] == [1]
+        plan = " ".join(str(row) for row in conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM disposals WHERE user_id = 1 ORDER BY created_at DESC"
+        )))
+        assert "ix_disposals_user_id_created_at" in plan
+
+@pytest.mark.parametrize("stop_at", range(1, len(MIGRATIONS)))
+def test_baseline_database_migrates_in_steps(tmp_path, stop_at):
+    engine = create_baseline(tmp_path)
+    assert run_migrations(bind=engine, target=stop_at) == list(range(1, stop_at + 1))
+    assert run_migrations(bind=engine) == list(range(stop_at + 1, len(MIGRATIONS) + 1))
+
+def test_expression_indexes_match_query_expressions(tmp_path):
+    # Migrations freeze the index SQL; queries still build it from the models, so the two must agree.
+    # No rows, so ANALYZE doesn't steer the planner to a scan of a one-row table.
+    engine = create_baseline(tmp_path, rows="")
+    run_migrations(bind=engine)
+    queries = {
+        "ix_marketplace_items_status_discount":
+            select(MarketplaceItem.id).where(MarketplaceItem.status == "available").order_by(marketplace_discount.desc()),
+        "ix_marketplace_items_spec_ram":
+            select(MarketplaceItem.id).where(MarketplaceItem.status == "available", spec_number("RAM") >= 8),
+        "ix_marketplace_items_spec_storage":
+            select(MarketplaceItem.id).where(MarketplaceItem.status == "available", spec_number("Storage") >= 256),
+    }
+    with engine.connect() as conn:
+        for index_name, query in queries.items():
+            sql = str(query.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+            plan = " ".join(row[3] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+            assert index_name in plan
@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from app.services import pickups
+
+VENDOR = {"name": "Slot Vendor", "location": "Depot", "latitude": 12.95, "longitude": 77.6, "accepts": ["slot-test"],
+          "rating": 4.0, "pickup": True, "daily_capacity": 3}
+
+def book(client, headers, vendor_id, day):
+    classification = client.post("/classify/", json={
+        "item_name": "Fridge", "description": "Broken", "condition": "dead", "category": "disposal"
+    }, headers=headers).json()
+    return client.post("/disposal/", json={
+        "classification_id": classification["id"], "disposal_method": "pickup", "pickup_date": day.isoformat(),
+        "vendor_filter": "slot-test", "vendor_id": vendor_id, "pickup_area": "560001",
+    }, headers=headers)
+
+def test_concurrent_bookings_respect_capacity(client, make_user, admin_headers):
+    vendor = client.post("/admin/vendors", json=VENDOR, headers=admin_headers).json()
+    day = pickups.bookable_days()[0] + timedelta(days=2)
+    users = [make_user() for _ in range(8)]
+    with ThreadPoolExecutor(len(users)) as pool:
+        responses = list(pool.map(lambda headers: book(client, headers, vendor["id"], day), users))
+
+    assert sorted(response.status_code for response in responses) == [200] * 3 + [409] * 5
+    assert len({response.json()["pickup_slot_id"] for response in responses if response.status_code == 200}) == 1
+    slots = client.get("/disposal/slots", params={
+        "vendor_id": vendor["id"], "area": "560001", "start_date": day.isoformat(), "days": 1
+    }).json()
+    assert slots == [{"day": day.isoformat(), "capacity": 3, "booked": 3, "available": 0, "closed": False}]
+
+def test_slot_etag_changes_with_the_day(client, admin_headers, monkeypatch):
+    vendor = client.post("/admin/vendors", json=VENDOR, headers=admin_headers).json()
+    params = {"vendor_id": vendor["id"], "area": "560001"}
+    first = client.get("/disposal/slots", params=params)
+    etag = first.headers["etag"]
+    assert client.get("/disposal/slots", params=params, headers={"If-None-Match": etag}).status_code == 304
+
+    today, last_day = pickups.bookable_days()
+    monkeypatch.setattr(pickups, "bookable_days", lambda: (today + timedelta(days=1), last_day + timedelta(days=1)))
+    response = client.get("/disposal/slots", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+def test_booking_changes_slot_etag(client, make_user, admin_headers):
+    vendor = client.post("/admin/vendors", json=VENDOR, headers=admin_headers).json()
+    day = pickups.bookable_days()[0] + timedelta(days=1)
+    params = {"vendor_id": vendor["id"], "area": "560001", "start_date": day.isoformat(), "days": 1}
+    etag = client.get("/disposal/slots", params=params).headers["etag"]
+
+    assert book(client, make_user(), vendor["id"], day).status_code == 200
+    response = client.get("/disposal/slots", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()[0]["booked"] == 1
+
+    assert client.get("/disposal/slots", params=params, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+import pytest
+
+from app.services.receipts import RECEIPT_DIR
+
+PURCHASE = {"shipping_address": "1 Main St", "phone_number": "0123456789", "payment_method": "cod"}
+
+@pytest.fixture
+def listing(client, classification):
+    headers, created = classification
+    response = client.post("/marketplace/", json={
+        "classification_id": created["id"], "title": "Phone", "brand": "Samsung", "model": "S10",
+        "description": "Works", "price": 100, "category_id": 1, "images": [],
+    }, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def purchase(client, item_id, headers):
+    return client.post("/marketplace/purchase", json={"marketplace_item_id": item_id, **PURCHASE}, headers=headers)
+
+def test_concurrent_purchases_sell_item_once(client, make_user, listing):
+    buyers = [make_user() for _ in range(6)]
+    # TestClient runs the app on one event loop, so requests from these threads interleave there
+    with ThreadPoolExecutor(len(buyers)) as pool:
+        responses = list(pool.map(lambda headers: purchase(client, listing["id"], headers), buyers))
+
+    assert sorted(response.status_code for response in responses) == [200] + [404] * (len(buyers) - 1)
+    purchases = [client.get("/me/dashboard", headers=headers).json()["purchases"] for headers in buyers]
+    assert sum(section["count"] for section in purchases) == 1
+
+def test_purchase_replay_with_idempotency_key(client, make_user, listing):
+    headers = {**make_user(), "Idempotency-Key": "order-1"}
+    with ThreadPoolExecutor(4) as pool:
+        responses = list(pool.map(lambda _: purchase(client, listing["id"], headers), range(4)))
+    responses.append(purchase(client, listing["id"], headers))
+
+    assert [response.status_code for response in responses] == [200] * 5
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert client.get("/me/dashboard", headers=headers).json()["purchases"]["count"] == 1
+
+    changed = client.post("/marketplace/purchase", json={
+        "marketplace_item_id": listing["id"], **PURCHASE, "shipping_address": "2 Main St"
+    }, headers=headers)
+    assert changed.status_code == 422
+
+def test_missing_receipt_renders_requested_format_only(client, make_user, listing):
+    headers = make_user()
+    bought = purchase(client, listing["id"], headers).json()
+    user_dir = os.path.join(RECEIPT_DIR, str(bought["user_id"]))
+    for name in os.listdir(user_dir):
+        os.remove(os.path.join(user_dir, name))
+
+    response = client.get(f"/marketplace/receipt/{bought['id']}?format=txt", headers=headers)
+    assert response.status_code == 200, response.text
+    assert f"{bought['id']}" in response.text
+    assert os.listdir(user_dir) == [f"{bought['id']}.txt"]
@@ -0,0 +1,37 @@
+import io
+import zipfile
+
+from tests.test_purchases import PURCHASE, purchase
+
+def create_listing(client, headers, title):
+    classification = client.post("/classify/", json={
+        "item_name": title, "description": "Used", "condition": "working", "category": "marketplace"
+    }, headers=headers).json()
+    response = client.post("/marketplace/", json={
+        "classification_id": classification["id"], "title": title, "brand": "Dell", "model": "XPS",
+        "description": "Works", "price": 250, "category_id": 2, "images": [],
+    }, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_receipt_export_streams_seller_receipts(client, make_user, admin_headers):
+    seller = make_user()
+    listings = [create_listing(client, seller, title) for title in ("Laptop A", "Laptop B")]
+    buyer = make_user()
+    purchases = [purchase(client, listing["id"], buyer).json() for listing in listings]
+    other = purchase(client, create_listing(client, make_user(), "Laptop C")["id"], buyer).json()
+
+    response = client.get(
+        "/admin/receipts/export", params={"seller": listings[0]["seller_name"], "format": "txt"}, headers=admin_headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/zip"
+
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    names = archive.namelist()
+    assert [name.rsplit("/", 1)[1] for name in names] == [
+        f"ECycle_Receipt_{row['id']:06d}.txt" for row in purchases
+    ]
+    assert all(f"{other['id']:06d}" not in name for name in names)
+    assert "Laptop A" in archive.read(names[0]).decode()
+    assert PURCHASE["shipping_address"] in archive.read(names[1]).decode()
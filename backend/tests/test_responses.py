@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from app.api.marketplace import marketplace_item_serializer
+from app.core.database import MarketplaceItem
+
+def test_serializer_validates_rows():
+    row = MarketplaceItem(
+        id=1, user_id=1, classification_id=1, title="Phone", brand="Samsung", model="S10",
+        description="Works", price="100", original_price=None, category_id=1, images=[], image_derivatives=[],
+        specifications={}, warranty_info=None, seller_name="Seller", seller_rating=None, is_selling=True,
+        status="available", created_at=datetime(2024, 1, 1),
+    )
+    data = marketplace_item_serializer.to_dict(row)
+    assert data["seller_rating"] == 0.0
+    assert data["price"] == 100.0
+    assert marketplace_item_serializer.dumps([row]).startswith(b'[{"id":1,')
+
+def test_fast_path_matches_response_model(client, classification, admin_headers, monkeypatch):
+    from app.api import me
+    from app.core import responses
+
+    headers, created = classification
+    for path, body in [
+        ("/disposal/", {"disposal_method": "dropoff", "vendor_filter": "phones"}),
+        ("/donate/", {"location": "Downtown", "organization": "Goodwill"}),
+        ("/marketplace/", {"title": "Phone", "brand": "Samsung", "model": "S10", "description": "Works",
+                           "price": 100, "category_id": 1, "images": []}),
+    ]:
+        response = client.post(path, json={"classification_id": created["id"], **body}, headers=headers)
+        assert response.status_code == 200, response.text
+    endpoints = [
+        ("/classify/", headers), ("/disposal/", headers), ("/donate/", headers),
+        ("/marketplace/my-items", headers), ("/marketplace/?limit=20", None),
+        ("/admin/users?limit=20", admin_headers), ("/me/dashboard", headers),
+    ]
+
+    def fetch(fast: bool):
+        monkeypatch.setattr(responses, "FAST_JSON_RESPONSES", fast)
+        monkeypatch.setattr(me, "FAST_JSON_RESPONSES", fast)
+        results = []
+        for path, request_headers in endpoints:
+            response = client.get(path, headers=request_headers)
+            assert response.status_code == 200, (path, response.text)
+            results.append(response.json())
+        return results
+
+    regular = fetch(False)
+    assert all(regular[:5])
+    assert fetch(True) == regular
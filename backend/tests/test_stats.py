@@ -0,0 +1,48 @@
+from sqlalchemy import func, select
+
+from app.core.database import StatCounter, StatDelta, engine
+from app.services import stats
+
+def counter(metric, key):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(StatCounter.count).where(StatCounter.metric == metric, StatCounter.key == key)
+        ).scalar() or 0
+
+def pending_deltas():
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(StatDelta)).scalar()
+
+def test_writes_append_deltas_and_reads_fold_them(client, make_user, admin_headers):
+    before = client.get("/admin/stats", headers=admin_headers).json()["classifications_by_condition"].get("repairable", 0)
+    assert pending_deltas() == 0
+
+    headers = make_user()
+    for name in ("Radio", "Kettle"):
+        response = client.post("/classify/", json={
+            "item_name": name, "description": "Needs a fix", "condition": "repairable", "category": "repair"
+        }, headers=headers)
+        assert response.status_code == 200, response.text
+    # The request transactions only appended deltas
+    assert pending_deltas() == 4
+    assert counter("classifications_by_condition", "repairable") == before
+
+    stats_response = client.get("/admin/stats", headers=admin_headers).json()
+    assert stats_response["classifications_by_condition"]["repairable"] == before + 2
+    assert pending_deltas() == 0
+    assert counter("classifications_by_condition", "repairable") == before + 2
+
+def test_fold_in_batches(monkeypatch):
+    monkeypatch.setattr(stats, "FOLD_BATCH_SIZE", 2)
+    before = counter("purchases_by_day", "1999-12-31")
+    with engine.begin() as conn:
+        stats.record_deltas(conn, {("purchases_by_day", "1999-12-31"): [1, 10.0]})
+        stats.record_deltas(conn, {("purchases_by_day", "1999-12-31"): [2, 5.5]})
+        stats.record_deltas(conn, {("purchases_by_day", "1999-12-31"): [-1, -10.0]})
+    with engine.begin() as conn:
+        assert stats.fold_stat_deltas(conn) == 3
+    assert pending_deltas() == 0
+    assert counter("purchases_by_day", "1999-12-31") == before + 2
+    with engine.begin() as conn:
+        stats.rebuild_stats(conn)
+    assert counter("purchases_by_day", "1999-12-31") == 0
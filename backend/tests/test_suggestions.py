@@ -0,0 +1,26 @@
+import asyncio
+
+import pytest
+
+from app.services import suggestions
+
+def test_model_is_loaded_at_startup(client):
+    assert suggestions._model is not None
+
+def test_suggest_scores_off_the_event_loop(client, make_user, monkeypatch):
+    calls = []
+    original = suggestions.SuggestionModel.suggest
+    def suggest(model, items, top_k=3):
+        # Only the event loop's own thread has a running loop
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        calls.append(len(items))
+        return original(model, items, top_k)
+    monkeypatch.setattr(suggestions.SuggestionModel, "suggest", suggest)
+
+    response = client.post("/classify/suggest", json={"items": [
+        {"item_name": "Old laptop", "description": "Dell laptop, battery dead", "condition": "dead"}
+    ]}, headers=make_user())
+    assert response.status_code == 200, response.text
+    assert len(response.json()["suggestions"]) == 1
+    assert calls == [1]
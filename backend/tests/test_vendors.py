@@ -0,0 +1,26 @@
+import pytest
+
+VENDOR = {"name": "Test Vendor", "location": "Depot", "latitude": 12.95, "longitude": 77.6, "accepts": ["tv-test"],
+          "rating": 4.0, "pickup": True, "daily_capacity": 3}
+
+def test_seeded_vendors_match_the_old_directory(client):
+    for vendor_type, names in [
+        ("batteries", {"EcoBattery Recycling", "Green Power Solutions"}),
+        ("computers", {"TechRecycle Pro", "Digital Waste Management"}),
+        ("appliances", {"Home Appliance Recyclers", "White Goods Disposal"}),
+        ("phones", {"Mobile Recycle Hub", "Phone Disposal Service"}),
+    ]:
+        response = client.get("/disposal/vendors", params={"vendor_type": vendor_type})
+        assert {vendor["name"] for vendor in response.json()} == names
+
+@pytest.mark.parametrize("field", ["name", "latitude", "longitude", "accepts", "rating", "pickup", "daily_capacity", "is_active"])
+def test_vendor_update_rejects_null(client, admin_headers, field):
+    vendor = client.post("/admin/vendors", json=VENDOR, headers=admin_headers).json()
+    response = client.put(f"/admin/vendors/{vendor['id']}", json={field: None}, headers=admin_headers)
+    assert response.status_code == 422, response.text
+
+def test_vendor_update_applies_sent_fields(client, admin_headers):
+    vendor = client.post("/admin/vendors", json=VENDOR, headers=admin_headers).json()
+    response = client.put(f"/admin/vendors/{vendor['id']}", json={"location": None, "daily_capacity": 5}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert response.json() == {**vendor, "location": None, "daily_capacity": 5}
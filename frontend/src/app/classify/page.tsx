@@ -18,6 +18,7 @@ export default function ClassifyPage() {
   const [image, setImage] = useState<File | null>(null);
   const [imagePreview, setImagePreview] = useState<string>('');
   const [loading, setLoading] = useState(false);
+  const [suggesting, setSuggesting] = useState(false);
   const router = useRouter();
 
   const conditions = [
@@ -69,6 +70,29 @@ export default function ClassifyPage() {
     }
   };
 
+  const handleSuggest = async () => {
+    if (!formData.item_name) {
+      toast.error('Enter the item name first');
+      return;
+    }
+    setSuggesting(true);
+    try {
+      const response = await apiClient.suggestClassifications([{
+        item_name: formData.item_name,
+        description: formData.description,
+        condition: formData.condition,
+      }], 1);
+      const suggestion = response.data.suggestions[0]?.categories[0];
+      if (suggestion) {
+        setFormData({ ...formData, category: suggestion.category });
+      }
+    } catch (error: any) {
+      toast.error(getErrorMessage(error) || 'Could not suggest a category');
+    } finally {
+      setSuggesting(false);
+    }
+  };
+
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
     
@@ -240,9 +264,19 @@ export default function ClassifyPage() {
 
               {/* Category Selection */}
               <div>
-                <label className="block text-sm font-medium text-gray-700 dark:text-gray-300 mb-4">
-                  What would you like to do with this item?
-                </label>
+                <div className="flex items-center justify-between mb-4">
+                  <label className="block text-sm font-medium text-gray-700 dark:text-gray-300">
+                    What would you like to do with this item?
+                  </label>
+                  <button
+                    type="button"
+                    onClick={handleSuggest}
+                    disabled={suggesting}
+                    className="text-sm font-medium text-primary-600 hover:text-primary-700 disabled:opacity-50"
+                  >
+                    {suggesting ? 'Suggesting...' : 'Suggest for me'}
+                  </button>
+                </div>
                 <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
                   {categories.map((category) => (
                     <label
@@ -8,13 +8,15 @@ import { apiClient } from '@/lib/api';
 import { getErrorMessage } from '@/lib/errorHandler';
 import toast from 'react-hot-toast';
 import { useAuth } from '@/hooks/useAuth';
-import { Classification, Disposal, Donation, MarketplaceItem } from '@/types';
+import { Classification, DashboardData, Disposal, Donation, MarketplaceItem } from '@/types';
 
 export default function DashboardPage() {
   const [classifications, setClassifications] = useState<Classification[]>([]);
   const [disposals, setDisposals] = useState<Disposal[]>([]);
   const [donations, setDonations] = useState<Donation[]>([]);
   const [marketplaceItems, setMarketplaceItems] = useState<MarketplaceItem[]>([]);
+  const [counts, setCounts] = useState({ classifications: 0, disposals: 0, donations: 0, marketplaceItems: 0 });
+  const [classificationNames, setClassificationNames] = useState<Record<number, string>>({});
   const [selectedItem, setSelectedItem] = useState<Classification | null>(null);
   const [showModal, setShowModal] = useState(false);
   const [loading, setLoading] = useState(true);
@@ -33,26 +35,18 @@ export default function DashboardPage() {
   const loadDashboardData = async () => {
     setLoading(true);
     try {
-      const results = await Promise.allSettled([
-        apiClient.getClassifications(),
-        apiClient.getDisposals(),
-        apiClient.getDonations(),
-        apiClient.getMyMarketplaceItems(),
-      ]);
-
-      if (results[0].status === 'fulfilled') {
-        setClassifications(results[0].value.data || []);
-      }
-      if (results[1].status === 'fulfilled') {
-        setDisposals(results[1].value.data || []);
-      }
-      if (results[2].status === 'fulfilled') {
-        setDonations(results[2].value.data || []);
-      }
-      if (results[3].status === 'fulfilled') {
-        setMarketplaceItems(results[3].value.data || []);
-      }
-
+      const { data }: { data: DashboardData } = await apiClient.getDashboard();
+      setClassifications(data.classifications.items);
+      setDisposals(data.disposals.items);
+      setDonations(data.donations.items);
+      setMarketplaceItems(data.marketplace_items.items);
+      setCounts({
+        classifications: data.classifications.count,
+        disposals: data.disposals.count,
+        donations: data.donations.count,
+        marketplaceItems: data.marketplace_items.count,
+      });
+      setClassificationNames(data.classification_names || {});
     } catch (error: any) {
       console.error('Dashboard load error:', error);
     } finally {
@@ -62,7 +56,7 @@ export default function DashboardPage() {
 
   const getClassificationName = (classificationId: number) => {
     const classification = classifications.find(c => c.id === classificationId);
-    return classification ? classification.item_name : 'Unknown Item';
+    return classification ? classification.item_name : classificationNames[classificationId] || 'Unknown Item';
   };
 
   const formatDate = (dateString: string) => {
@@ -166,7 +160,7 @@ export default function DashboardPage() {
                     Items Classified
                   </p>
                   <p className="text-2xl font-semibold text-gray-900 dark:text-white">
-                    {classifications.length}
+                    {counts.classifications}
                   </p>
                 </div>
               </div>
@@ -182,7 +176,7 @@ export default function DashboardPage() {
                     Disposals Scheduled
                   </p>
                   <p className="text-2xl font-semibold text-gray-900 dark:text-white">
-                    {disposals.length}
+                    {counts.disposals}
                   </p>
                 </div>
               </div>
@@ -198,7 +192,7 @@ export default function DashboardPage() {
                     Items Donated
                   </p>
                   <p className="text-2xl font-semibold text-gray-900 dark:text-white">
-                    {donations.length}
+                    {counts.donations}
                   </p>
                 </div>
               </div>
@@ -214,7 +208,7 @@ export default function DashboardPage() {
                     Marketplace Items
                   </p>
                   <p className="text-2xl font-semibold text-gray-900 dark:text-white">
-                    {marketplaceItems.length}
+                    {counts.marketplaceItems}
                   </p>
                 </div>
               </div>
@@ -18,11 +18,13 @@ export default function DisposalPage() {
     disposal_method: 'pickup',
     pickup_date: '',
     pickup_location: '',
+    pickup_area: '',
     vendor_filter: 'computers',
   });
   const [selectedVendor, setSelectedVendor] = useState<string>('');
   const [loading, setLoading] = useState(false);
   const [loadingVendors, setLoadingVendors] = useState(false);
+  const [position, setPosition] = useState<{ latitude: number; longitude: number } | undefined>();
   
   const { user } = useAuth();
   const router = useRouter();
@@ -43,11 +45,19 @@ export default function DisposalPage() {
     }
   }, [classificationId]);
 
+  useEffect(() => {
+    // Nearest vendors when the browser shares a location, best rated otherwise
+    navigator.geolocation?.getCurrentPosition(
+      ({ coords }) => setPosition({ latitude: coords.latitude, longitude: coords.longitude }),
+      () => undefined
+    );
+  }, []);
+
   useEffect(() => {
     if (formData.vendor_filter) {
       loadVendors();
     }
-  }, [formData.vendor_filter]);
+  }, [formData.vendor_filter, position]);
 
   const loadClassifications = async () => {
     try {
@@ -61,7 +71,7 @@ export default function DisposalPage() {
   const loadVendors = async () => {
     setLoadingVendors(true);
     try {
-      const response = await apiClient.getVendors(formData.vendor_filter);
+      const response = await apiClient.getVendors(formData.vendor_filter, position);
       setVendors(response.data);
     } catch (error: any) {
       toast.error(getErrorMessage(error) || 'Failed to load vendors');
@@ -92,8 +102,16 @@ export default function DisposalPage() {
         toast.error('Please provide pickup location');
         return;
       }
+      if (!formData.pickup_area?.trim()) {
+        toast.error('Please provide your area or PIN code');
+        return;
+      }
     }
 
+    // Pickups with a pickup vendor book one of its slots for the area and day
+    const vendor = vendors.find((v) => v.name === selectedVendor);
+    const bookPickup = formData.disposal_method === 'pickup' && vendor?.pickup;
+
     setLoading(true);
     try {
       const disposalData = {
@@ -102,7 +120,9 @@ export default function DisposalPage() {
         pickup_date: formData.pickup_date || null,
         pickup_location: formData.pickup_location || null,
         vendor_filter: formData.vendor_filter,
-        selected_vendor: selectedVendor
+        selected_vendor: selectedVendor,
+        vendor_id: bookPickup ? vendor.id : null,
+        pickup_area: bookPickup ? formData.pickup_area : null
       };
       console.log('Sending disposal data:', disposalData);
       const response = await apiClient.createDisposal(disposalData);
@@ -243,6 +263,21 @@ export default function DisposalPage() {
                     />
                   </div>
 
+                  <div>
+                    <label className="block text-sm font-medium text-gray-700 dark:text-gray-300 mb-2">
+                      Area / PIN Code
+                    </label>
+                    <input
+                      type="text"
+                      required
+                      maxLength={255}
+                      className="w-full px-3 py-2 border border-gray-300 dark:border-gray-600 rounded-lg focus:outline-none focus:ring-2 focus:ring-primary-500 focus:border-primary-500 bg-white dark:bg-gray-800 text-gray-900 dark:text-white"
+                      placeholder="e.g. 560034"
+                      value={formData.pickup_area}
+                      onChange={(e) => setFormData({ ...formData, pickup_area: e.target.value })}
+                    />
+                  </div>
+
                   <div>
                     <label className="block text-sm font-medium text-gray-700 dark:text-gray-300 mb-2">
                       Pickup Location
@@ -319,6 +354,7 @@ export default function DisposalPage() {
                         <div className="flex items-center text-sm text-gray-600 dark:text-gray-400 mb-2">
                           <MapPin className="h-4 w-4 mr-1" />
                           {vendor.location}
+                          {vendor.distance_km != null && ` · ${vendor.distance_km} km`}
                         </div>
                         <div className="flex items-center justify-between">
                           {vendor.pickup && (
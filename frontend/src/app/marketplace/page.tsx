@@ -25,6 +25,8 @@ export default function MarketplacePage() {
   const [searchTerm, setSearchTerm] = useState('');
   const [loading, setLoading] = useState(false);
   const [loadingItems, setLoadingItems] = useState(false);
+  // One key per checkout, so retrying a failed request cannot buy twice
+  const [purchaseKey, setPurchaseKey] = useState('');
   const [purchaseLoading, setPurchaseLoading] = useState(false);
   const [selectedItem, setSelectedItem] = useState<MarketplaceItem | null>(null);
   const [showPurchaseModal, setShowPurchaseModal] = useState(false);
@@ -109,13 +111,14 @@ export default function MarketplacePage() {
       return;
     }
     setSelectedItem(item);
+    setPurchaseKey(crypto.randomUUID());
     setShowPurchaseModal(true);
   };
 
   const handlePurchase = async (purchaseData: PurchaseFormData) => {
     setPurchaseLoading(true);
     try {
-      const response = await apiClient.purchaseItem(purchaseData);
+      const response = await apiClient.purchaseItem(purchaseData, purchaseKey);
       
       // Generate order details
       const orderDetails = {
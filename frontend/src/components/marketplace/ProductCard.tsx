@@ -2,6 +2,7 @@
 
 import { Star, ShoppingCart, Heart, Truck, Shield, Award } from 'lucide-react';
 import { MarketplaceItem } from '@/types';
+import { API_BASE_URL } from '@/lib/api';
 
 interface ProductCardProps {
   item: MarketplaceItem;
@@ -11,6 +12,7 @@ interface ProductCardProps {
 export default function ProductCard({ item, onBuyClick }: ProductCardProps) {
   const discount = item.original_price ? Math.round(((item.original_price - item.price) / item.original_price) * 100) : 0;
   const savings = item.original_price ? (item.original_price - item.price).toFixed(2) : 0;
+  const thumbnail = item.image_derivatives?.[0]?.thumbnail;
 
   return (
     <div className="bg-white dark:bg-gray-800 rounded-xl shadow-sm border border-gray-200 dark:border-gray-700 hover:shadow-lg hover:border-blue-300 dark:hover:border-blue-600 transition-all duration-300 overflow-hidden group">
@@ -18,11 +20,15 @@ export default function ProductCard({ item, onBuyClick }: ProductCardProps) {
       <div className="relative">
         <div className="aspect-square bg-gradient-to-br from-gray-50 to-gray-100 dark:from-gray-700 dark:to-gray-800 flex items-center justify-center overflow-hidden">
           {item.images && item.images.length > 0 ? (
-            <img 
-              src={item.images[0]} 
-              alt={item.title} 
-              className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300" 
-            />
+            <picture className="w-full h-full">
+              {thumbnail && <source srcSet={`${API_BASE_URL}${thumbnail.webp}`} type="image/webp" />}
+              <img 
+                src={thumbnail ? `${API_BASE_URL}${thumbnail.jpeg}` : item.images[0]} 
+                alt={item.title} 
+                loading="lazy"
+                className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300" 
+              />
+            </picture>
           ) : (
             <div className="text-gray-400 text-6xl">📱</div>
           )}
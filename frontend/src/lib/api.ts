@@ -1,7 +1,7 @@
 import axios from 'axios';
 import Cookies from 'js-cookie';
 
-const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
+export const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
 const api = axios.create({
   baseURL: API_BASE_URL,
@@ -70,6 +70,7 @@ export const apiClient = {
   },
   getCurrentUser: () => api.get('/auth/me'),
   refreshToken: (refreshToken: string) => api.post('/auth/refresh', { refresh_token: refreshToken }),
+  getDashboard: (limit?: number) => api.get('/me/dashboard', limit !== undefined ? { params: { limit } } : undefined),
 
   // Classifications
   createClassification: (data: any) => api.post('/classify/', data),
@@ -82,6 +83,17 @@ export const apiClient = {
     });
   },
 
+  suggestClassifications: (items: { item_name: string; description?: string; condition?: string }[], topK?: number) =>
+    api.post('/classify/suggest', { items }, topK !== undefined ? { params: { top_k: topK } } : undefined),
+  importClassifications: (file: File, format?: 'csv' | 'ndjson') => {
+    const formData = new FormData();
+    formData.append('file', file);
+    return api.post('/classify/batch', formData, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+      params: format ? { format } : undefined
+    });
+  },
+
   // Disposal
   createDisposal: async (data: any) => {
     console.log('API: Creating disposal with data:', data);
@@ -95,7 +107,10 @@ export const apiClient = {
     }
   },
   getDisposals: () => api.get('/disposal/'),
-  getVendors: (vendorType: string) => api.get(`/disposal/vendors?vendor_type=${vendorType}`),
+  getVendors: (vendorType: string, position?: { latitude: number; longitude: number }) =>
+    api.get('/disposal/vendors', { params: { vendor_type: vendorType, ...position } }),
+  getPickupSlots: (vendorId: number, area: string, startDate?: string, days?: number) =>
+    api.get('/disposal/slots', { params: { vendor_id: vendorId, area, start_date: startDate, days } }),
 
   // Donations
   createDonation: (data: any) => api.post('/donate/', data),
@@ -113,7 +128,8 @@ export const apiClient = {
   },
   getMyMarketplaceItems: () => api.get('/marketplace/my-items'),
   getCategories: () => api.get('/marketplace/categories'),
-  purchaseItem: (purchaseData: any) => api.post('/marketplace/purchase', purchaseData),
+  purchaseItem: (purchaseData: any, idempotencyKey?: string) =>
+    api.post('/marketplace/purchase', purchaseData, idempotencyKey ? { headers: { 'Idempotency-Key': idempotencyKey } } : undefined),
   downloadReceipt: (purchaseId: number) => api.get(`/marketplace/receipt/${purchaseId}`, { responseType: 'blob' }),
 
   // Repair
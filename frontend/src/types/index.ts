@@ -9,6 +9,8 @@ export interface User {
   created_at: string;
 }
 
+export type ImageDerivatives = Partial<Record<'thumbnail' | 'medium', { webp: string; jpeg: string }>>;
+
 export interface Classification {
   id: number;
   user_id: number;
@@ -16,6 +18,7 @@ export interface Classification {
   description: string;
   condition: 'working' | 'dead' | 'unknown';
   image_path?: string;
+  image_derivatives?: ImageDerivatives;
   category: 'disposal' | 'donate' | 'marketplace' | 'repair';
   created_at: string;
 }
@@ -28,6 +31,10 @@ export interface Disposal {
   pickup_date?: string;
   pickup_location?: string;
   vendor_filter: string;
+  selected_vendor?: string;
+  vendor_id?: number;
+  pickup_area?: string;
+  pickup_slot_id?: number;
   status: string;
   created_at: string;
 }
@@ -54,6 +61,7 @@ export interface MarketplaceItem {
   original_price?: number;
   category_id: number;
   images: string[];
+  image_derivatives?: ImageDerivatives[];
   specifications: Record<string, string>;
   warranty_info?: string;
   seller_name: string;
@@ -86,10 +94,16 @@ export interface AuthTokens {
 }
 
 export interface Vendor {
+  id: number;
   name: string;
   location: string;
+  latitude: number;
+  longitude: number;
+  accepts: string[];
   rating: number;
   pickup: boolean;
+  daily_capacity: number;
+  distance_km?: number | null;
 }
 
 export interface DonationOrganization {
@@ -117,6 +131,16 @@ export interface DisposalCreate {
   pickup_location?: string;
   vendor_filter: string;
   selected_vendor?: string;
+  vendor_id?: number;
+  pickup_area?: string;
+}
+
+export interface PickupSlotAvailability {
+  day: string;
+  capacity: number;
+  booked: number;
+  available: number;
+  closed: boolean;
 }
 
 export interface DonationCreate {
@@ -162,6 +186,20 @@ export interface Purchase {
   created_at: string;
 }
 
+export interface DashboardSection<T> {
+  items: T[];
+  count: number;
+}
+
+export interface DashboardData {
+  classifications: DashboardSection<Classification>;
+  disposals: DashboardSection<Disposal>;
+  donations: DashboardSection<Donation>;
+  marketplace_items: DashboardSection<MarketplaceItem>;
+  purchases: DashboardSection<Purchase>;
+  classification_names: Record<number, string>;
+}
+
 export interface ProductCategory {
   id: number;
   name: string;